@@ -0,0 +1,219 @@
+import hashlib
+import json
+
+from cache_utils import cached
+from db_utils import AGGREGATE_TABLE, FACT_TABLE, borrow_connection, get_data_version, in_filter, query_all
+from server_utils import compress_response
+
+API_URL = '/api/v1'
+# Clients and proxies may reuse a response this long before revalidating it with its
+# ETag, so an ingested batch shows up in the API within this many seconds.
+API_MAX_AGE = 60
+# Query parameters the resources accept, with the type each value is normalized to.
+# "all" or leaving a parameter out means no filter; sku may be repeated.
+API_FILTERS = {'year': int, 'month': int, 'category': str.lower, 'sku': str, 'limit': int}
+LIST_FILTERS = {'sku'}
+# Column each filter restricts, in the aggregate (a) and in the fact table joined with its items (f, i).
+AGGREGATE_COLUMNS = {'year': 'a.Year', 'month': 'a.Month', 'category': 'LOWER(a.Category)', 'sku': 'a.SKU'}
+FACT_COLUMNS = {'year': 'f.Year', 'month': 'f.Month', 'category': 'LOWER(i.Category)', 'sku': 'i.SKU'}
+
+# ETags change with the data version, the filters and this file, so a deploy that
+# changes a response's shape does not answer 304 to clients holding the old one.
+with open(__file__, 'rb') as _f:
+    _SOURCE_TAG = hashlib.sha1(_f.read()).hexdigest()[:8]
+
+
+def _where(conn, filters, columns):
+    clauses, params = [], []
+    for name, column in columns.items():
+        value = filters.get(name)
+        if value is None:
+            continue
+        if name in LIST_FILTERS:
+            clause, clause_params = in_filter(conn, column, value)
+        else:
+            clause, clause_params = f' AND {column} = ?', [value]
+        clauses.append(clause)
+        params.extend(clause_params)
+    return ''.join(clauses), params
+
+
+def _records(names, rows):
+    return [dict(zip(names, row)) for row in rows]
+
+
+@cached
+def get_consumption(**filters):
+    """Issued quantity per category, or per SKU within one category, as on the Operations page."""
+    keys = ['Category', 'SKU'] if filters.get('category') else ['Category']
+    group = ', '.join(f'a.{key}' for key in keys)
+    with borrow_connection() as conn:
+        where, params = _where(conn, filters, AGGREGATE_COLUMNS)
+        rows = query_all(f'''
+            SELECT {group}, SUM(a.IssuedQty) AS IssuedQty
+            FROM {AGGREGATE_TABLE} a
+            WHERE 1=1{where}
+            GROUP BY {group}
+            ORDER BY IssuedQty DESC, {group}
+        ''', params, conn)
+    return _records(keys + ['IssuedQty'], rows)
+
+
+@cached
+def get_sku_ranking(**filters):
+    """SKUs ranked by requested quantity, highest first."""
+    with borrow_connection() as conn:
+        where, params = _where(conn, filters, AGGREGATE_COLUMNS)
+        query = f'''
+            SELECT a.Category, a.SKU, SUM(a.RequestedQty) AS RequestedQty
+            FROM {AGGREGATE_TABLE} a
+            WHERE 1=1{where}
+            GROUP BY a.Category, a.SKU
+            ORDER BY RequestedQty DESC, a.Category, a.SKU
+        '''
+        if filters.get('limit') is not None:
+            query += ' LIMIT ?'
+            params.append(filters['limit'])
+        rows = query_all(query, params, conn)
+    return [{'Rank': rank, **row} for rank, row in enumerate(_records(['Category', 'SKU', 'RequestedQty'], rows), 1)]
+
+
+@cached
+def get_stockout_risk(**filters):
+    """Stockout events per category, or per SKU within one category, as on the Planning page."""
+    keys = ['Category', 'SKU'] if filters.get('category') else ['Category']
+    group = ', '.join(f'a.{key}' for key in keys)
+    with borrow_connection() as conn:
+        where, params = _where(conn, filters, AGGREGATE_COLUMNS)
+        rows = query_all(f'''
+            SELECT {group}, SUM(a.StockoutEvents) AS StockoutEvents
+            FROM {AGGREGATE_TABLE} a
+            WHERE 1=1{where}
+            GROUP BY {group}
+            HAVING StockoutEvents > 0
+            ORDER BY StockoutEvents DESC, {group}
+        ''', params, conn)
+    return _records(keys + ['StockoutEvents'], rows)
+
+
+@cached
+def get_forecast_accuracy(**filters):
+    """Mean absolute and mean demand forecast error, with forecast and requested totals."""
+    with borrow_connection() as conn:
+        where, params = _where(conn, filters, FACT_COLUMNS)
+        rows = query_all(f'''
+            SELECT COUNT(*), AVG(ABS(f.ForecastError_Demand)), AVG(f.ForecastError_Demand),
+                COALESCE(SUM(f.ForecastQty), 0), COALESCE(SUM(f.RequestedQty), 0)
+            FROM {FACT_TABLE} f
+            JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+            WHERE 1=1{where}
+        ''', params, conn)
+    return _records(['Rows', 'MeanAbsoluteError', 'MeanError', 'ForecastQty', 'RequestedQty'], rows)
+
+
+@cached
+def get_section_requests(**filters):
+    """Requested quantity per section, category and SKU, as on the Operations page."""
+    with borrow_connection() as conn:
+        where, params = _where(conn, filters, FACT_COLUMNS)
+        rows = query_all(f'''
+            SELECT s.Section, i.Category, i.SKU, COALESCE(SUM(f.RequestedQty), 0) AS RequestedQty
+            FROM {FACT_TABLE} f
+            JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+            JOIN Section_Dimension s ON f.SectionKey = s.SectionKey
+            WHERE 1=1{where}
+            GROUP BY s.Section, i.Category, i.SKU
+            ORDER BY RequestedQty DESC, s.Section, i.Category, i.SKU
+        ''', params, conn)
+    return _records(['Section', 'Category', 'SKU', 'RequestedQty'], rows)
+
+
+# Each resource under API_URL: the function building its rows and the filters it accepts.
+API_RESOURCES = {
+    'consumption': (get_consumption, ('year', 'month', 'category')),
+    'sku-ranking': (get_sku_ranking, ('year', 'month', 'category', 'limit')),
+    'stockout-risk': (get_stockout_risk, ('year', 'category')),
+    'forecast-accuracy': (get_forecast_accuracy, ('year', 'month', 'category', 'sku')),
+    'section-requests': (get_section_requests, ('year', 'month', 'category', 'sku')),
+}
+
+
+def normalize_filters(resource, args):
+    """Return the resource's filters from query arguments, in one canonical form.
+
+    "all" values are dropped, the rest are converted with API_FILTERS and list
+    filters are sorted, so equivalent queries share one ETag and cache entry.
+    Raises ValueError naming the parameter for unknown, repeated or malformed ones.
+    """
+    accepted = API_RESOURCES[resource][1]
+    filters = {}
+    for name in sorted(set(args)):
+        if name not in accepted:
+            raise ValueError(f"{name}: not a filter of {resource}; expected one of {', '.join(accepted)}")
+        values = [value for value in args.getlist(name) if value != 'all']
+        if len(values) > 1 and name not in LIST_FILTERS:
+            raise ValueError(f'{name}: expected one value, got {values}')
+        try:
+            values = sorted({API_FILTERS[name](value) for value in values})
+        except ValueError:
+            raise ValueError(f'{name}: expected {API_FILTERS[name].__name__} values, got {values}') from None
+        if values:
+            filters[name] = values if name in LIST_FILTERS else values[0]
+    return filters
+
+
+def make_etag(resource, filters, version):
+    """Return the strong ETag of a resource's response for filters at a data version."""
+    canonical = json.dumps([resource, filters], sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(f'{_SOURCE_TAG} {canonical}'.encode('utf-8')).hexdigest()[:16]
+    return f'{version}-{digest}'
+
+
+def register_api(server):
+    """Add the read-only JSON API over the dashboards' aggregates to the Flask server.
+
+    GET /api/v1 lists the resources and their filters; GET /api/v1/<resource>?year=2022
+    returns {"resource", "version", "filters", "rows"}. Responses carry a strong
+    ETag and are answered 304 without querying anything when If-None-Match
+    holds it, so polling clients cost one version check per request.
+    """
+    from flask import Response, abort, jsonify, request
+
+    def cache_headers(response):
+        response.cache_control.public = True
+        response.cache_control.max_age = API_MAX_AGE
+        return response
+
+    @server.route(API_URL)
+    def api_index():
+        return cache_headers(jsonify({
+            'version': get_data_version(),
+            'resources': {
+                name: {'url': f'{API_URL}/{name}', 'filters': list(accepted)}
+                for name, (_, accepted) in API_RESOURCES.items()
+            },
+        }))
+
+    @server.route(f'{API_URL}/<resource>')
+    def api_resource(resource):
+        if resource not in API_RESOURCES:
+            abort(404)
+        try:
+            filters = normalize_filters(resource, request.args)
+        except ValueError as e:
+            return Response(f'{e}\n', 400, mimetype='text/plain')
+        version = get_data_version()
+        etag = make_etag(resource, filters, version)
+        # A strong ETag names one exact body, so a compressed response carries the coding in its tag.
+        for tag in (etag, f'{etag}-gzip', f'{etag}-br'):
+            if request.if_none_match.contains_weak(tag):
+                response = Response(status=304)
+                response.set_etag(tag)
+                return cache_headers(response)
+        func = API_RESOURCES[resource][0]
+        response = jsonify({'resource': resource, 'version': version, 'filters': filters, 'rows': func(**filters)})
+        # Compress here rather than after the request, so the tag can name the encoded body.
+        response = compress_response(response)
+        encoding = response.headers.get('Content-Encoding')
+        response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+        return cache_headers(response)
@@ -2,11 +2,24 @@ import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 from db_utils import import_csvs_to_sqlite
+from background_utils import make_background_manager, register_cached_results
+from asset_utils import build_assets
+from server_utils import register_asset_caching, register_compression, register_validation_layout, use_fast_json
+from trace_utils import register_tracing
+from figure_utils import register_payload_sizes
+from profile_utils import register_profiler
+from ingest_utils import register_ingest
+from export_utils import register_export
+from api_utils import register_api
 import_csvs_to_sqlite()
+build_assets()
+use_fast_json()
+background_manager = make_background_manager()
 
 app = dash.Dash(
     __name__,
     use_pages=True,
+    background_callback_manager=background_manager,
     external_stylesheets=[
         dbc.themes.FLATLY,
         "/assets/custom-theme.css",
@@ -15,10 +28,30 @@ app = dash.Dash(
 )
 
 server = app.server
+register_tracing(server)
+register_compression(server)
+register_validation_layout(app)
+register_payload_sizes(server)
+register_cached_results(app)
+register_asset_caching(server)
+register_profiler(server)
+register_ingest(server)
+register_export(server)
+register_api(server)
 
 app.layout = html.Div([
     dash.page_container
 ])
 
+
+def warm_up():
+    """Render every page once so its default view is in the shared cache before workers start."""
+    # Run Dash's first-request setup here, so worker threads do not race to build its callback map.
+    server.test_client().get("/_dash-dependencies")
+    for page in dash.page_registry.values():
+        if callable(page["layout"]):
+            page["layout"]()
+
 if __name__ == "__main__":
+    background_manager.start_job_launcher()
     app.run(debug=True)
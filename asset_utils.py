@@ -0,0 +1,180 @@
+import contextlib
+import hashlib
+import json
+import os
+
+from dash import html
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent builds are not serialized
+    fcntl = None
+
+try:
+    from PIL import Image, features
+except ImportError:  # pages fall back to the original files
+    Image = None
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), 'assets')
+# Generated variants live under assets/ so Dash serves them; their names change with their content.
+BUILD_DIR = os.path.join(ASSETS_DIR, 'build')
+BUILD_URL = '/assets/build/'
+MANIFEST_PATH = os.path.join(BUILD_DIR, 'manifest.json')
+# Held while building, so processes started side by side take turns instead of
+# deleting each other's files half-written.
+BUILD_LOCK_NAME = '.build.lock'
+
+# Widths to generate per source image, sized to how the pages display them.
+# Variants wider than the source are skipped.
+HERO_WIDTHS = (640, 1024, 1600, 2560)
+LOGO_WIDTHS = (120, 240, 480)
+PROFILE_WIDTHS = (260, 520, 780)
+IMAGE_WIDTHS = {
+    'kwek.jpg': HERO_WIDTHS,
+    'oblation.png': HERO_WIDTHS,
+    'pegaraw.jpg': HERO_WIDTHS,
+    'gate.jpg': HERO_WIDTHS,
+    'hero-bg.jpg': HERO_WIDTHS,
+    'upmo.png': LOGO_WIDTHS,
+    'UPLB.png': LOGO_WIDTHS,
+    'profile/evangelista.jpg': PROFILE_WIDTHS,
+    'profile/faustino.jpg': PROFILE_WIDTHS,
+    'profile/manese.jpg': PROFILE_WIDTHS,
+    'profile/puerto.jpg': PROFILE_WIDTHS,
+}
+# Most preferred first; the last format is also used for the plain <img> fallback.
+IMAGE_FORMATS = ('avif', 'webp')
+IMAGE_QUALITY = {'avif': 50, 'webp': 75}
+
+_manifest = None
+
+
+def _variant_name(name, width, fmt, digest):
+    stem = os.path.splitext(name)[0].replace('/', '-')
+    return f'{stem}-{width}.{digest}.{fmt}'
+
+
+@contextlib.contextmanager
+def _build_lock(build_dir):
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(build_dir, BUILD_LOCK_NAME), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def build_assets(images=IMAGE_WIDTHS, build_dir=BUILD_DIR):
+    """Write resized, fingerprinted variants of each image and return the manifest.
+
+    Variants whose fingerprinted file already exists are not re-encoded, and files
+    left over from older builds are removed. Builds in other processes wait for
+    this one, then find its variants already written.
+    """
+    global _manifest
+    if Image is None:
+        return {}
+    os.makedirs(build_dir, exist_ok=True)
+    with _build_lock(build_dir):
+        manifest = _build_variants(images, build_dir)
+    _manifest = manifest
+    return manifest
+
+
+def _build_variants(images, build_dir):
+    formats = [fmt for fmt in IMAGE_FORMATS if features.check(fmt)]
+    manifest = {}
+    for name, widths in images.items():
+        path = os.path.join(ASSETS_DIR, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            source_hash = hashlib.sha1(f.read()).hexdigest()
+        with Image.open(path) as source:
+            source_width, source_height = source.size
+        image = None
+        entry = {}
+        targets = [w for w in widths if w < source_width] + [min(max(widths), source_width)]
+        for fmt in formats:
+            variants = []
+            for width in sorted(set(targets)):
+                settings = f'{source_hash}:{width}:{fmt}:{IMAGE_QUALITY[fmt]}'
+                digest = hashlib.sha1(settings.encode('utf-8')).hexdigest()[:10]
+                filename = _variant_name(name, width, fmt, digest)
+                target = os.path.join(build_dir, filename)
+                if not os.path.exists(target):
+                    if image is None:
+                        with Image.open(path) as source:
+                            has_alpha = source.mode in ('RGBA', 'LA') or 'transparency' in source.info
+                            image = source.convert('RGBA' if has_alpha else 'RGB')
+                    height = round(source_height * width / source_width)
+                    resized = image.resize((width, height), Image.LANCZOS)
+                    # Write then rename, so a concurrent worker never serves a partial file.
+                    tmp = f'{target}.{os.getpid()}.tmp'
+                    resized.save(tmp, format=fmt.upper(), quality=IMAGE_QUALITY[fmt])
+                    os.replace(tmp, target)
+                variants.append([width, filename])
+            entry[fmt] = variants
+        manifest[name] = entry
+    keep = {filename for entry in manifest.values() for fmt in formats for _, filename in entry[fmt]}
+    keep |= {os.path.basename(MANIFEST_PATH), BUILD_LOCK_NAME}
+    for filename in os.listdir(build_dir):
+        # Without a lock (on Windows) another build's .tmp file may still be in flight.
+        if filename not in keep and not filename.endswith('.tmp'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(build_dir, filename))
+    tmp = f'{MANIFEST_PATH}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+    return manifest
+
+
+def load_manifest():
+    """Return the manifest of built image variants, or an empty one if none were built."""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def srcset(name, fmt):
+    """Return the srcset string for the fmt variants of an asset, or None if it has none."""
+    variants = load_manifest().get(name, {}).get(fmt)
+    if not variants:
+        return None
+    return ', '.join(f'{BUILD_URL}{filename} {width}w' for width, filename in variants)
+
+
+def responsive_image(name, sizes, alt='', **kwargs):
+    """Return a <picture> serving the built variants of an asset, or a plain Img of the original.
+
+    sizes is the CSS width the image is displayed at (e.g. "100vw" or "120px"),
+    which the browser uses to pick the smallest sufficient variant.
+    """
+    entry = load_manifest().get(name)
+    if not entry or not entry.get(IMAGE_FORMATS[-1]):
+        return html.Img(src=f'/assets/{name}', alt=alt, **kwargs)
+    sources = [
+        html.Source(type=f'image/{fmt}', srcSet=srcset(name, fmt), sizes=sizes)
+        for fmt in IMAGE_FORMATS[:-1] if entry.get(fmt)
+    ]
+    fallback = IMAGE_FORMATS[-1]
+    largest = entry[fallback][-1][1]
+    return html.Picture(sources + [
+        html.Img(
+            src=f'{BUILD_URL}{largest}', srcSet=srcset(name, fallback), sizes=sizes, alt=alt, **kwargs
+        )
+    ])
+
+
+if __name__ == '__main__':
+    for asset, built in build_assets().items():
+        print(asset, ', '.join(f'{fmt}: {len(built[fmt])}' for fmt in IMAGE_FORMATS if fmt in built))
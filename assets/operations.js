@@ -0,0 +1,227 @@
+// Operations page filters, run in the browser over the aggregate that
+// pages/dashboards/operations.py ships into ops-aggregate-store. The figures
+// are built as the server builds them with plotly express; when there is no
+// aggregate to filter, the filters are handed to the server callbacks instead.
+(function () {
+    // As RANKING_COLOR, RANKING_MUTED_COLOR and SELECTED_SLICE_PULL in operations.py,
+    // and OTHER_LABEL in figure_utils.py.
+    var RANKING_COLOR = "#8D1436";
+    var RANKING_MUTED_COLOR = "#D9B3BE";
+    var SELECTED_SLICE_PULL = 0.1;
+    var RANKING_TOP_N = 5;
+    var OTHER_LABEL = "Other";
+
+    function isSet(value) {
+        return value !== null && value !== undefined && value !== "all";
+    }
+
+    function capitalize(text) {
+        return text.charAt(0).toUpperCase() + text.slice(1).toLowerCase();
+    }
+
+    // Issued and requested totals per item over the rows matching the filters.
+    function itemTotals(aggregate, year, month, category) {
+        var count = aggregate.items.length;
+        var totals = {issued: new Float64Array(count), requested: new Float64Array(count), seen: new Uint8Array(count)};
+        var inCategory = aggregate.items.map(function (item) {
+            return !isSet(category) || aggregate.categories[item[0]].toLowerCase() === category;
+        });
+        for (var row = 0; row < aggregate.item.length; row++) {
+            var item = aggregate.item[row];
+            if (!inCategory[item]
+                || (isSet(year) && aggregate.year[row] !== year)
+                || (isSet(month) && aggregate.month[row] !== month)) {
+                continue;
+            }
+            totals.issued[item] += aggregate.issued[row];
+            totals.requested[item] += aggregate.requested[row];
+            totals.seen[item] = 1;
+        }
+        return totals;
+    }
+
+    // Keep the maxSeries largest slices, in their order, and sum the rest into one "Other" slice.
+    function topNWithOther(slices, aggregate) {
+        if (slices.length <= aggregate.maxSeries) {
+            return slices;
+        }
+        var order = slices.map(function (slice, i) { return i; });
+        order.sort(function (a, b) { return slices[b].value - slices[a].value || a - b; });
+        var keep = new Set(order.slice(0, aggregate.maxSeries));
+        var kept = [], other = 0;
+        slices.forEach(function (slice, i) {
+            if (keep.has(i)) {
+                kept.push(slice);
+            } else {
+                other += slice.value;
+            }
+        });
+        kept.push({label: OTHER_LABEL, value: other});
+        return kept;
+    }
+
+    function consumptionFigure(aggregate, totals, category, selection, template) {
+        var slices = [];
+        if (isSet(category)) {
+            aggregate.items.forEach(function (item, i) {
+                if (totals.seen[i]) {
+                    slices.push({label: item[1], value: totals.issued[i]});
+                }
+            });
+            slices.sort(function (a, b) { return a.value - b.value; });
+            slices = topNWithOther(slices, aggregate);
+        } else {
+            var byCategory = {};
+            aggregate.items.forEach(function (item, i) {
+                if (totals.seen[i]) {
+                    var name = aggregate.categories[item[0]];
+                    byCategory[name] = (byCategory[name] || 0) + totals.issued[i];
+                }
+            });
+            slices = Object.keys(byCategory).map(function (name) { return {label: name, value: byCategory[name]}; });
+            slices.sort(function (a, b) { return a.value - b.value; });
+        }
+        var labelName = isSet(category) ? "SKU" : "Category";
+        var trace = {
+            type: "pie",
+            domain: {x: [0, 1], y: [0, 1]},
+            hovertemplate: labelName + "=%{label}<br>TotalIssuedQty=%{value}<extra></extra>",
+            labels: slices.map(function (slice) { return slice.label; }),
+            values: slices.map(function (slice) { return slice.value; }),
+            legendgroup: "",
+            name: "",
+            showlegend: true
+        };
+        if (selection) {
+            trace.pull = trace.labels.map(function (label) { return label === selection ? SELECTED_SLICE_PULL : 0; });
+        }
+        return {
+            data: [trace],
+            layout: {
+                template: template,
+                legend: {tracegroupgap: 0},
+                title: {text: isSet(category)
+                    ? "Material Consumption Rate by SKU in " + capitalize(category)
+                    : "Material Consumption Rate by Category"}
+            }
+        };
+    }
+
+    function rankingFigure(aggregate, totals, category, selection, template) {
+        // Picking a category slice narrows the ranking to it, as the category filter does.
+        var rankingCategory = isSet(category) ? category : (selection ? selection.toLowerCase() : null);
+        var bars = [];
+        aggregate.items.forEach(function (item, i) {
+            if (totals.seen[i] && (!rankingCategory || aggregate.categories[item[0]].toLowerCase() === rankingCategory)) {
+                bars.push({sku: item[1], value: totals.requested[i]});
+            }
+        });
+        bars.sort(function (a, b) { return b.value - a.value; });
+        if (!rankingCategory) {
+            bars = bars.slice(0, RANKING_TOP_N);
+        }
+        var values = bars.map(function (bar) { return bar.value; });
+        var color = RANKING_COLOR;
+        if (isSet(category) && selection) {
+            color = bars.map(function (bar) { return bar.sku === selection ? RANKING_COLOR : RANKING_MUTED_COLOR; });
+        }
+        return {
+            data: [{
+                type: "bar",
+                orientation: "h",
+                hovertemplate: "Total Requested Qty=%{text}<br>SKU=%{y}<extra></extra>",
+                legendgroup: "",
+                marker: {color: color, pattern: {shape: ""}},
+                name: "",
+                showlegend: false,
+                text: values,
+                textposition: "auto",
+                x: values,
+                xaxis: "x",
+                y: bars.map(function (bar) { return bar.sku; }),
+                yaxis: "y"
+            }],
+            layout: {
+                template: template,
+                xaxis: {anchor: "y", domain: [0, 1], title: {text: "Total Requested Qty"}},
+                yaxis: {anchor: "x", domain: [0, 1], title: {text: "SKU"}, type: "category"},
+                legend: {tracegroupgap: 0},
+                title: {text: rankingCategory
+                    ? "SKU Demand Ranking in " + capitalize(rankingCategory)
+                    : "Top " + RANKING_TOP_N + " SKUs Overall by Demand"},
+                barmode: "relative"
+            }
+        };
+    }
+
+    function totalIssuedText(totals) {
+        var total = 0;
+        totals.issued.forEach(function (value) { total += value; });
+        return total ? "Total Issued Qty: " + total.toLocaleString("en-US") : "No data available.";
+    }
+
+    // Whether a server result answers these filters, as asked for at this page's data version.
+    function sameFilters(a, b) {
+        return ["year", "month", "category", "selection", "version"].every(function (key) {
+            return (a[key] === undefined ? null : a[key]) === (b[key] === undefined ? null : b[key]);
+        });
+    }
+
+    function template(figure) {
+        return figure && figure.layout ? figure.layout.template : undefined;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        operations: {
+            // Ask the server for the aggregate unless this session already holds the current version.
+            requestAggregate: function (version, modified, stored, requested) {
+                if ((stored && stored.version === version) || requested === version) {
+                    return window.dash_clientside.no_update;
+                }
+                return version;
+            },
+
+            updateCharts: function (year, month, category, clickData, aggregate, selection, version, consumption, ranking) {
+                var noUpdate = window.dash_clientside.no_update;
+                var triggered = window.dash_clientside.callback_context.triggered.map(function (t) { return t.prop_id; });
+                if (triggered.indexOf("consumption-rate-chart.clickData") !== -1) {
+                    if (!clickData) {
+                        return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+                    }
+                    // Picking the picked slice again, or "Other", clears the selection.
+                    var label = clickData.points[0].label;
+                    selection = label === selection || label === OTHER_LABEL ? null : label;
+                } else if (triggered.indexOf("ops-aggregate-store.data") === -1) {
+                    selection = null;
+                }
+                // clickData is cleared so that picking the same slice again fires this callback.
+                // An aggregate of an older data version is filtered until its replacement lands
+                // and redraws the charts; only a page without one asks the server.
+                if (!aggregate || aggregate.fallback) {
+                    var filters = {year: year, month: month, category: category, selection: selection, version: version};
+                    return [noUpdate, noUpdate, noUpdate, selection, null, filters];
+                }
+                var totals = itemTotals(aggregate, year, month, category);
+                return [
+                    consumptionFigure(aggregate, totals, category, selection, template(consumption)),
+                    rankingFigure(aggregate, totals, category, selection, template(ranking)),
+                    totalIssuedText(totals),
+                    selection,
+                    null,
+                    noUpdate
+                ];
+            },
+
+            // Draw the server fallback results, except one asked for under filters that have since
+            // changed, or any once an aggregate has landed and the charts are filtered here again.
+            applyServerResult: function (charts, total, filters, aggregate) {
+                var noUpdate = window.dash_clientside.no_update;
+                function current(result) {
+                    return result && filters && sameFilters(result.filters, filters) && !(aggregate && !aggregate.fallback);
+                }
+                var figures = current(charts) ? charts.figures : [noUpdate, noUpdate];
+                return [figures[0], figures[1], current(total) ? total.total : noUpdate];
+            }
+        }
+    });
+})();
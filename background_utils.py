@@ -0,0 +1,186 @@
+import contextvars
+import hashlib
+import multiprocessing
+import os
+import signal
+import threading
+
+import flask
+from dash import DiskcacheManager, Output, callback
+
+from cache_utils import CACHE_DIR
+from db_utils import get_data_version
+from trace_utils import trace
+
+BACKGROUND_CACHE_DIR = os.path.join(CACHE_DIR, 'background')
+# How often the browser polls for a running job's progress and result, in milliseconds.
+POLL_INTERVAL_MS = 250
+# Finished results stay readable this long, so every client polling the same inputs receives them.
+BACKGROUND_RESULT_TTL_SECONDS = 300
+
+_progress = contextvars.ContextVar('progress', default=None)
+
+
+class _DiskcacheManager(DiskcacheManager):
+    """DiskcacheManager that keys results per callback and tolerates jobs exiting mid-poll."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._launcher = None
+
+    def build_cache_key(self, fn, args, cache_args_to_ignore, triggered):
+        # Dash keys results on the function source, which is the shared run adapter for
+        # every callback here; add the callback's name so equal inputs cannot collide.
+        key = super().build_cache_key(fn, args, cache_args_to_ignore, triggered)
+        return hashlib.sha256(f'{fn.__module__}.{fn.__qualname__}:{key}'.encode('utf-8')).hexdigest()
+
+    def get_result(self, key, job):
+        result = super().get_result(key, job)
+        if result is self.UNDEFINED and not self.job_running(job):
+            # The job may have stored its result and exited between the two checks;
+            # Dash would otherwise report it as cancelled.
+            result = super().get_result(key, job)
+        return result
+
+    def job_running(self, job):
+        import psutil
+        if not job:  # answered from the result cache, no job was started
+            return False
+        try:
+            return super().job_running(job)
+        except psutil.NoSuchProcess:
+            return False
+
+    def terminate_job(self, job):
+        import psutil
+        try:
+            super().terminate_job(job)
+        except psutil.NoSuchProcess:
+            pass
+
+    def start_job_launcher(self):
+        """Fork a single-threaded helper that starts this process's background jobs.
+
+        Dash forks a job from whichever request thread starts it. Under threaded
+        workers that child can inherit a SQLite lock another thread held mid-call
+        and hang forever. Call this while the process has no other threads yet
+        (gunicorn's post_fork, or before the dev server starts); jobs are then
+        forked from the helper instead.
+        """
+        conn, child_conn = multiprocessing.Pipe()
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            self._serve_jobs(child_conn)
+        child_conn.close()
+        self._launcher = (os.getpid(), conn, threading.Lock())
+
+    def _serve_jobs(self, conn):
+        # Drop the handlers inherited from the gunicorn master, and let the kernel reap finished jobs.
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGQUIT, signal.SIGUSR1,
+                       signal.SIGUSR2, signal.SIGWINCH, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, signal.SIG_DFL)
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        try:
+            while True:
+                try:
+                    registry_key, key, args, context = conn.recv()
+                except EOFError:  # the worker exited
+                    break
+                pid = os.fork()
+                if pid == 0:
+                    conn.close()
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    try:
+                        self.func_registry[registry_key](key, self._make_progress_key(key), args, context)
+                    finally:
+                        os._exit(0)
+                conn.send(pid)
+        finally:
+            os._exit(0)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        if flask.has_request_context() and self.result_ready(key):
+            # Leave it to answer_from_cache to return the stored result in this request.
+            flask.g.background_result_key = key
+            return None
+        launcher = self._launcher
+        if launcher is None or launcher[0] != os.getpid():
+            return super().call_job_fn(key, job_fn, args, context)
+        _, conn, lock = launcher
+        registry_key = next(k for k, fn in self.func_registry.items() if fn is job_fn)
+        try:
+            with lock:
+                conn.send((registry_key, key, args, context))
+                return conn.recv()
+        except (OSError, EOFError):
+            self._launcher = None
+            return super().call_job_fn(key, job_fn, args, context)
+
+
+def make_background_manager(cache_dir=BACKGROUND_CACHE_DIR):
+    """Return a background callback manager backed by a local disk cache and worker processes."""
+    import diskcache
+    # Without cache_by, the first poll to read a result deletes it, and a concurrent
+    # job with the same inputs then finishes with no update.
+    return _DiskcacheManager(
+        diskcache.Cache(cache_dir), cache_by=[get_data_version], expire=BACKGROUND_RESULT_TTL_SECONDS
+    )
+
+
+def register_cached_results(app):
+    """Answer a background callback in its first request when its result is already cached.
+
+    Otherwise the browser waits POLL_INTERVAL_MS for its first poll even on a hit.
+    Register after register_compression so the answer is still compressed.
+    """
+    @app.server.after_request
+    def answer_from_cache(response):
+        key = flask.g.pop('background_result_key', None)
+        if key is None or response.status_code != 200:
+            return response
+        # Replay the request as the browser's first poll; Dash then builds the response itself.
+        with app.server.test_request_context(
+            flask.request.path, method='POST', query_string={'cacheKey': key},
+            data=flask.request.get_data(), headers=list(flask.request.headers),
+        ):
+            return app.dispatch()
+
+
+def report_progress(done, total, label=""):
+    """Update the progress bar of the background callback running this code, if any."""
+    set_progress = _progress.get()
+    if set_progress is not None:
+        set_progress((int(done * 100 / total), label))
+
+
+def background_callback(*args, progress_id, **kwargs):
+    """Register func as a background callback that drives the dbc.Progress with progress_id.
+
+    The decorated function is returned unchanged so the layout can still call it
+    directly for the server-side initial render. When the user changes an input
+    while a job is running, Dash terminates the stale job before starting a new one.
+    """
+    def decorator(func):
+        def run(set_progress, *inputs):
+            token = _progress.set(set_progress)
+            try:
+                with trace(f'background {func.__name__}'):
+                    return func(*inputs)
+            finally:
+                _progress.reset(token)
+
+        run.__name__ = func.__name__
+        run.__qualname__ = func.__qualname__
+        run.__module__ = func.__module__
+        callback(
+            *args,
+            background=True,
+            interval=POLL_INTERVAL_MS,
+            progress=[Output(progress_id, "value"), Output(progress_id, "label")],
+            progress_default=[0, ""],
+            running=[(Output(progress_id, "style"), {"visibility": "visible"}, {"visibility": "hidden"})],
+            **kwargs
+        )(run)
+        return func
+    return decorator
@@ -0,0 +1,103 @@
+"""Image bytes fetched per page, before and after the responsive asset build.
+
+Run from the repository root:
+
+    python benchmarks/asset_benchmark.py
+
+"Before" is the original files each page referenced, revalidated on every
+repeat load. "After" is the variant a browser picks from the AVIF srcset for
+the given viewport, cached as immutable so repeat loads make no requests.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dash  # noqa: E402
+
+import app as dashboard_app  # noqa: E402
+from asset_utils import ASSETS_DIR, BUILD_DIR, BUILD_URL, load_manifest  # noqa: E402
+
+PAGES = ["/", "/about", "/inventory", "/operations", "/forecasting", "/planning"]
+VIEWPORT_WIDTH = 1440
+DEVICE_PIXEL_RATIOS = (1, 2)
+
+
+def walk(component):
+    yield component
+    if isinstance(component, dash.html.Picture):
+        return
+    children = getattr(component, "children", None)
+    if isinstance(children, (list, tuple)):
+        for child in children:
+            yield from walk(child)
+    elif children is not None and hasattr(children, "children"):
+        yield from walk(children)
+
+
+def page_images(layout):
+    """Return (srcset or None, sizes, original file) for each image on the page."""
+    by_file = {
+        filename: name
+        for name, entry in load_manifest().items()
+        for variants in entry.values()
+        for _, filename in variants
+    }
+    images = []
+    for component in walk(layout):
+        if isinstance(component, dash.html.Picture):
+            img = component.children[-1]
+            avif = next(c for c in component.children if getattr(c, "type", None) == "image/avif")
+            name = by_file[img.src[len(BUILD_URL):]]
+            images.append((avif.srcSet, img.sizes, name))
+        elif isinstance(component, dash.html.Img):
+            images.append((None, None, component.src[len("/assets/"):]))
+    return images
+
+
+def chosen_file(srcset, sizes, dpr):
+    needed = (VIEWPORT_WIDTH if sizes.endswith("vw") else int(sizes[:-2])) * dpr
+    candidates = sorted(
+        (int(width[:-1]), url[len(BUILD_URL):])
+        for url, width in (part.split() for part in srcset.split(", "))
+    )
+    return next((f for w, f in candidates if w >= needed), candidates[-1][1])
+
+
+def file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def main():
+    client = dashboard_app.server.test_client()
+    layouts = {page["path"]: page["layout"] for page in dash.page_registry.values()}
+    header = f"{'page':<14}{'images':>7}{'original':>11}" + "".join(
+        f"{f'avif @{dpr}x':>11}" for dpr in DEVICE_PIXEL_RATIOS
+    )
+    print(header)
+    totals = [0] * (2 + len(DEVICE_PIXEL_RATIOS))
+    for path in PAGES:
+        layout = layouts[path]() if callable(layouts[path]) else layouts[path]
+        images = page_images(layout)
+        row = [len(images), sum(file_size(os.path.join(ASSETS_DIR, name)) for _, _, name in images)]
+        for dpr in DEVICE_PIXEL_RATIOS:
+            row.append(sum(
+                file_size(os.path.join(BUILD_DIR, chosen_file(srcset, sizes, dpr))) if srcset
+                else file_size(os.path.join(ASSETS_DIR, name))
+                for srcset, sizes, name in images
+            ))
+        totals = [t + v for t, v in zip(totals, row)]
+        print(f"{path:<14}{row[0]:>7}" + "".join(f"{v:>11,}" for v in row[1:]))
+    print(f"{'total':<14}{totals[0]:>7}" + "".join(f"{v:>11,}" for v in totals[1:]))
+
+    variant = next(iter(load_manifest().values()))["avif"][0][1]
+    built = client.get(BUILD_URL + variant)
+    original = client.get("/assets/upmo.png")
+    print(f"original asset Cache-Control: {original.headers.get('Cache-Control')}")
+    print(f"built asset Cache-Control:    {built.headers.get('Cache-Control')}")
+    print(f"first load (viewport {VIEWPORT_WIDTH}px, 1x): {totals[1]:,} -> {totals[2]:,} bytes")
+    print(f"repeat load: {totals[0]} revalidation requests -> 0 requests, 0 bytes")
+
+
+if __name__ == "__main__":
+    main()
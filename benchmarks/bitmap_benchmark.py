@@ -0,0 +1,67 @@
+"""Inventory KPI filters: SQL IN lists versus bitmap intersection, as history grows.
+
+Run from the repository root after the app has built its database:
+
+    python benchmarks/bitmap_benchmark.py [--scales 1,10,50] [--repeats 20]
+
+The scaled databases are built as in partition_benchmark.py. Each query sums
+stock and stockouts per item for two years and three categories. "sql" filters
+with Year IN (...) and LOWER(Category) IN (...) as the Inventory page used to.
+"bitmap" ORs the per-value bitmaps, ANDs the two attributes and reduces the
+selected rows. Times are milliseconds per query. The last two columns give the
+bitmaps' size and the time to build them.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitmap_utils import BITMAP_SELECT, FactBitmaps  # noqa: E402
+from db_utils import FACT_TABLE  # noqa: E402
+from partition_benchmark import build_scaled_db  # noqa: E402
+
+YEARS = [2021, 2022]
+CATEGORIES = ["buildings", "office", "plumbing"]
+SQL_QUERY = f'''
+    SELECT f.ItemKey, COUNT(*), SUM(f.StockOnHand), SUM(CASE WHEN f.RequestedQty > f.StockOnHand THEN 1 ELSE 0 END)
+    FROM {FACT_TABLE} f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    WHERE f.Year IN (?, ?) AND LOWER(i.Category) IN (?, ?, ?)
+    GROUP BY f.ItemKey
+'''
+
+
+def ms_per_call(func, repeats):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1,10,50")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'fact rows':>10}{'sql':>10}{'bitmap':>10}{'KiB':>10}{'build ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (int(s) for s in args.scales.split(",")):
+            conn = build_scaled_db(os.path.join(tmp, f"scaled-{scale}.db"), scale)
+            started = time.perf_counter()
+            bitmaps = FactBitmaps(conn.execute(BITMAP_SELECT.format(where='')).fetchall())
+            build = (time.perf_counter() - started) * 1000
+            sql = ms_per_call(lambda: conn.execute(SQL_QUERY, YEARS + CATEGORIES).fetchall(), args.repeats)
+            bitmap = ms_per_call(
+                lambda: bitmaps.item_totals(bitmaps.select(Year=YEARS, Category=CATEGORIES)), args.repeats
+            )
+            conn.close()
+            print(f"{bitmaps.size:>10}{sql:>10.2f}{bitmap:>10.2f}{bitmaps.nbytes / 1024:>10.1f}{build:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
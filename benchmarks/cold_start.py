@@ -0,0 +1,92 @@
+"""Import-time report and time to first served request, checked against a budget.
+
+Run from the repository root:
+
+    python benchmarks/cold_start.py [--budget 1.5] [--top 15]
+
+The import report runs `python -X importtime -c "import app"` in a fresh
+interpreter. It lists the slowest top-level packages by cumulative import time
+and notes whether pandas, NumPy and plotly.express were loaded at all.
+Packages that requirements.txt does not pull in are marked "(dev only)".
+
+Time to first served request is measured from launching gunicorn with
+gunicorn.conf.py until GET / answers. That covers the interpreter, imports,
+data import check, asset build and cache warm-up. It is measured twice: with
+an empty dashboard cache in a temporary directory (a fresh deploy), then
+restarted on the cache the first run left behind (a restart or scale-out on the same disk). The warm
+restart must fit in --budget seconds, or the script exits with status 1.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import ROOT, sandbox_env, start_server  # noqa: E402
+
+HEAVY_MODULES = ["pandas", "numpy", "plotly.express"]
+# Pulled in by dash only when installed; requirements.txt does not install them.
+DEV_ONLY_PACKAGES = {"IPython", "prompt_toolkit", "jedi", "parso", "pygments", "traitlets"}
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_report():
+    """Return (total seconds, {top-level package: cumulative seconds}, heavy modules loaded)."""
+    code = "import sys, app; print(','.join(m for m in %r if m in sys.modules))" % (HEAVY_MODULES,)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    packages = {}
+    total = 0.0
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        cumulative, name = int(match.group(2)) / 1e6, match.group(4)
+        if name == "app":
+            total = cumulative
+        elif "." not in name:
+            packages[name] = max(packages.get(name, 0.0), cumulative)
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total, packages, loaded
+
+
+def first_request_seconds(env, port):
+    proc, seconds = start_server("tuned", port, 1, env)
+    proc.terminate()
+    proc.wait()
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=1.5, help="seconds allowed for a warm-cache restart")
+    parser.add_argument("--top", type=int, default=15, help="packages listed in the import report")
+    args = parser.parse_args()
+
+    total, packages, loaded = import_report()
+    print(f"import app: {total:.3f}s")
+    print(f"  {'package':<28}{'cumulative s':>14}")
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        note = " (dev only)" if name in DEV_ONLY_PACKAGES else ""
+        print(f"  {name + note:<28}{seconds:>14.3f}")
+    print(f"  heavy modules loaded at import: {', '.join(loaded) or 'none'}")
+
+    with tempfile.TemporaryDirectory() as root:
+        env = sandbox_env(root)
+        cold = first_request_seconds(env, 8780)
+        time.sleep(1)
+        warm = first_request_seconds(env, 8781)
+    print(f"first served request, empty cache: {cold:.2f}s")
+    print(f"first served request, warm cache:  {warm:.2f}s (budget {args.budget:.2f}s)")
+    if warm > args.budget:
+        print("over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Throughput of the default gunicorn setup against gunicorn.conf.py.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py [--seconds 20] [--clients 16] [--workers 2]
+
+Each setup is started on its own port with an empty dashboard cache in a
+temporary directory, on data built there too, so a running server's cache
+and data are never touched. Then
+--clients concurrent clients, each on a persistent connection, load the
+dashboards for --seconds: the index page, then the page-render callback of a
+random dashboard. Latencies are in milliseconds. "default" is
+`gunicorn app:server` with sync workers and no config. "tuned" uses the shipped
+gunicorn.conf.py. Both run the same number of workers.
+
+Set DASHBOARD_CACHE=0 to make every callback query SQLite, the case where one
+slow request would otherwise hold a whole sync worker.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ["/inventory", "/operations", "/forecasting", "/planning"]
+SETUPS = {
+    "default": ["--config", os.devnull],
+    "tuned": ["--config", os.path.join(ROOT, "gunicorn.conf.py")],
+}
+
+
+def sandbox_env(root, cache="cache"):
+    """Return env vars that run a server on data and a cache under root, building the data once."""
+    env = {
+        "DASHBOARD_DATA_DIR": os.path.join(root, "data"),
+        "DASHBOARD_CACHE_DIR": os.path.join(root, cache),
+        "DASHBOARD_TRACE_PATH": os.path.join(root, cache, "traces.jsonl"),
+    }
+    if not os.path.exists(os.path.join(env["DASHBOARD_DATA_DIR"], "CURRENT")):
+        subprocess.run([sys.executable, "-c", "import db_utils; db_utils.import_csvs_to_sqlite()"],
+                       cwd=ROOT, env=dict(os.environ, **env), check=True)
+    return env
+
+
+def start_server(name, port, workers, env):
+    """Start gunicorn with the given setup and sandbox_env; return it and its seconds to first response."""
+    env = dict(os.environ, **env, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    args = [sys.executable, "-m", "gunicorn", *SETUPS[name], "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers), "app:server"]
+    started = time.perf_counter()
+    proc = subprocess.Popen(args, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while True:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return proc, time.perf_counter() - started
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{name} server exited with {proc.returncode}")
+            time.sleep(0.05)
+
+
+def page_render_payload(base, path):
+    with urllib.request.urlopen(f"{base}/_dash-dependencies") as response:
+        deps = json.load(response)
+    dep = next(d for d in deps if "_pages_content" in d["output"])
+    outputs = [
+        {"id": o.rsplit(".", 1)[0], "property": o.rsplit(".", 1)[1]}
+        for o in dep["output"].strip(".").split("...")
+    ]
+    inputs = [
+        {"id": i["id"], "property": i["property"], "value": path if i["property"] == "pathname" else ""}
+        for i in dep["inputs"]
+    ]
+    return json.dumps({
+        "output": dep["output"],
+        "outputs": outputs,
+        "inputs": inputs,
+        "changedPropIds": ["_pages_location.pathname"],
+        "state": [],
+    }).encode("utf-8")
+
+
+def run_load(port, seconds, clients):
+    base = f"http://127.0.0.1:{port}"
+    payloads = {path: page_render_payload(base, path) for path in PAGES}
+    latencies = {"index": [], "render": []}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        # One persistent connection per client, as a browser tab keeps; http.client
+        # reconnects by itself when a sync worker closes it after each response.
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            path = rng.choice(PAGES)
+            requests = [
+                ("index", "GET", path, None, {}),
+                ("render", "POST", "/_dash-update-component", payloads[path],
+                 {"Content-Type": "application/json"}),
+            ]
+            for kind, method, url, body, headers in requests:
+                start = time.perf_counter()
+                try:
+                    try:
+                        conn.request(method, url, body=body, headers=headers)
+                        response = conn.getresponse()
+                    except http.client.RemoteDisconnected:
+                        # The worker was recycled while the connection sat idle; browsers retry too.
+                        conn.close()
+                        conn.request(method, url, body=body, headers=headers)
+                        response = conn.getresponse()
+                    response.read()
+                    if response.status != 200:
+                        raise OSError(f"HTTP {response.status}")
+                    with lock:
+                        latencies[kind].append(time.perf_counter() - start)
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    with lock:
+                        errors.append(e)
+                        if len(errors) <= 3:
+                            print(f"{kind}: {e!r}", file=sys.stderr)
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def percentile_ms(values, pct):
+    return statistics.quantiles(values, n=100)[pct - 1] * 1000 if len(values) > 1 else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'setup':<10}{'startup s':>10}{'requests':>10}{'req/s':>9}"
+          f"{'index p50':>11}{'index p99':>11}{'render p50':>12}{'render p99':>12}{'errors':>8}")
+    with tempfile.TemporaryDirectory() as root:
+        for port, name in enumerate(SETUPS, start=8765):
+            proc, startup = start_server(name, port, args.workers, sandbox_env(root, f"cache-{name}"))
+            try:
+                latencies, errors = run_load(port, args.seconds, args.clients)
+            finally:
+                proc.terminate()
+                proc.wait()
+            total = sum(len(values) for values in latencies.values())
+            print(f"{name:<10}{startup:>10.1f}{total:>10}{total / args.seconds:>9.1f}"
+                  f"{percentile_ms(latencies['index'], 50):>11.0f}{percentile_ms(latencies['index'], 99):>11.0f}"
+                  f"{percentile_ms(latencies['render'], 50):>12.0f}{percentile_ms(latencies['render'], 99):>12.0f}"
+                  f"{len(errors):>8}")
+
+
+if __name__ == "__main__":
+    main()
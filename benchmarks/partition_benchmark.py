@@ -0,0 +1,97 @@
+"""Year-filtered query time as history grows: joining Date_Dimension versus the fact table's own Year column.
+
+Run from the repository root after the app has built its database:
+
+    python benchmarks/partition_benchmark.py [--scales 1,10,50] [--repeats 20]
+
+For each scale the published database is copied and its history is extended
+backwards: scale 10 holds ten copies of the data, each shifted five years
+earlier, so the most recent years stay the same size while older history
+grows. "join" filters the year through Date_Dimension as the dashboards used
+to; "year column" filters the fact table's denormalized Year, which is
+indexed with Month and clustered by period. Times are milliseconds per query.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_utils import FACT_TABLE, current_db_path  # noqa: E402
+
+QUERIES = {
+    "join": '''
+        SELECT I.Category, SUM(F.IssuedQty)
+        FROM Job_Request_Fact_Table F
+        JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
+        JOIN Date_Dimension D ON F.DateKey = D.DateKey
+        WHERE D.Year = ? AND D.Month = ?
+        GROUP BY I.Category
+    ''',
+    "year column": '''
+        SELECT I.Category, SUM(F.IssuedQty)
+        FROM Job_Request_Fact_Table F
+        JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
+        WHERE F.Year = ? AND F.Month = ?
+        GROUP BY I.Category
+    ''',
+}
+YEAR_SHIFT = 5
+
+
+def build_scaled_db(path, scale):
+    """Copy the published database to path with scale copies of its history, each five years older.
+
+    The fact table is clustered on its (Year, Month, ...) key, so the copies are stored by period too.
+    """
+    source = sqlite3.connect(current_db_path())
+    conn = sqlite3.connect(path)
+    source.backup(conn)
+    source.close()
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({FACT_TABLE})")]
+    max_key = conn.execute("SELECT MAX(DateKey) FROM Date_Dimension").fetchone()[0]
+    for k in range(1, scale):
+        shift = {"DateKey": f"DateKey + {k * max_key}", "Year": f"Year - {k * YEAR_SHIFT}"}
+        conn.execute(
+            "INSERT INTO Date_Dimension SELECT DateKey + ?, Year - ?, Month FROM Date_Dimension WHERE DateKey <= ?",
+            (k * max_key, k * YEAR_SHIFT, max_key),
+        )
+        conn.execute(
+            f"INSERT INTO {FACT_TABLE} SELECT {', '.join(shift.get(c, c) for c in columns)} "
+            f"FROM {FACT_TABLE} WHERE DateKey <= ?",
+            (max_key,),
+        )
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+def ms_per_query(conn, query, repeats):
+    conn.execute(query, (2022, 3)).fetchall()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        conn.execute(query, (2022, 3)).fetchall()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", default="1,10,50")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'fact rows':>10}" + "".join(f"{name:>14}" for name in QUERIES))
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (int(s) for s in args.scales.split(",")):
+            conn = build_scaled_db(os.path.join(tmp, f"scaled-{scale}.db"), scale)
+            rows = conn.execute(f"SELECT COUNT(*) FROM {FACT_TABLE}").fetchone()[0]
+            times = [ms_per_query(conn, query, args.repeats) for query in QUERIES.values()]
+            conn.close()
+            print(f"{rows:>10}" + "".join(f"{ms:>14.2f}" for ms in times))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Bytes on the wire and JSON serialization CPU per dashboard page.
+
+Run from the repository root:
+
+    python benchmarks/payload_benchmark.py
+
+"Before" is an uncompressed response serialized with the stdlib json engine,
+"after" is what the server sends now: brotli/gzip and server_utils.fast_to_json.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dash  # noqa: E402
+from plotly.io.json import to_json_plotly  # noqa: E402
+
+import app as dashboard_app  # noqa: E402
+from server_utils import fast_to_json  # noqa: E402
+
+PAGES = ["/inventory", "/operations", "/forecasting", "/planning"]
+REPEATS = 20
+
+
+def page_render_payload(client, path):
+    deps = client.get("/_dash-dependencies").get_json()
+    dep = next(d for d in deps if "_pages_content" in d["output"])
+    outputs = [
+        {"id": o.rsplit(".", 1)[0], "property": o.rsplit(".", 1)[1]}
+        for o in dep["output"].strip(".").split("...")
+    ]
+    inputs = [
+        {"id": i["id"], "property": i["property"], "value": path if i["property"] == "pathname" else ""}
+        for i in dep["inputs"]
+    ]
+    return {
+        "output": dep["output"],
+        "outputs": outputs,
+        "inputs": inputs,
+        "changedPropIds": ["_pages_location.pathname"],
+        "state": [],
+    }
+
+
+def wire_bytes(client, payload, encoding):
+    response = client.post(
+        "/_dash-update-component", json=payload, headers={"Accept-Encoding": encoding}
+    )
+    assert response.status_code == 200, response.status_code
+    return len(response.data)
+
+
+def serialize_ms(layout, encode):
+    start = time.process_time()
+    for _ in range(REPEATS):
+        encode(layout)
+    return (time.process_time() - start) * 1000 / REPEATS
+
+
+def main():
+    client = dashboard_app.server.test_client()
+    layouts = {page["path"]: page["layout"] for page in dash.page_registry.values()}
+    print(f"{'page':<14}{'identity':>10}{'gzip':>10}{'br':>10}{'json ms':>10}{'orjson ms':>11}")
+    totals = [0, 0, 0, 0.0, 0.0]
+    for path in PAGES:
+        payload = page_render_payload(client, path)
+        layout = layouts[path]()
+        row = [
+            wire_bytes(client, payload, "identity"),
+            wire_bytes(client, payload, "gzip"),
+            wire_bytes(client, payload, "br"),
+            serialize_ms(layout, lambda value: to_json_plotly(value, engine="json")),
+            serialize_ms(layout, fast_to_json),
+        ]
+        totals = [t + v for t, v in zip(totals, row)]
+        print(f"{path:<14}{row[0]:>10,}{row[1]:>10,}{row[2]:>10,}{row[3]:>10.2f}{row[4]:>11.2f}")
+    print(f"{'total':<14}{totals[0]:>10,}{totals[1]:>10,}{totals[2]:>10,}{totals[3]:>10.2f}{totals[4]:>11.2f}")
+    print(f"before: {totals[0]:,} bytes, {totals[3]:.2f} ms serialization")
+    print(f"after:  {totals[2]:,} bytes, {totals[4]:.2f} ms serialization")
+
+
+if __name__ == "__main__":
+    main()
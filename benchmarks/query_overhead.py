@@ -0,0 +1,140 @@
+"""Per-callback cost of reading small query results through pandas versus straight from the cursor.
+
+Run from the repository root:
+
+    python benchmarks/query_overhead.py [--repeats 200]
+
+Each case is a callback whose result is a single row or a few rows. "pandas"
+is what it used to do: pd.read_sql_query, then .iloc, melt, merge or iterrows
+to get the values out. "cursor" is what it does now through the typed
+db_utils helpers (query_one, query_all, query_column). Both sides run the
+same SQL on a fresh connection per call, the way an uncached callback does,
+with pandas already imported, so the difference is the DataFrame round trip
+alone. Times are milliseconds per call.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from db_utils import get_db_connection, query_all, query_column, query_one  # noqa: E402
+
+MAE_ME_QUERY = '''
+    SELECT AVG(ABS(T1.ForecastError_Demand)) AS Mean_Absolute_Error, AVG(T1.ForecastError_Demand) AS Mean_Error
+    FROM Job_Request_Fact_Table AS T1
+    INNER JOIN Date_Dimension AS T2 ON T1.DateKey = T2.DateKey
+    INNER JOIN Item_Dimension AS I ON T1.ItemKey = I.ItemKey
+    WHERE T2.Year = ?
+'''
+QTY_QUERY = '''
+    SELECT SUM(T1.ForecastQty) AS Total_ForecastQty, SUM(T1.RequestedQty) AS Total_RequestedQty
+    FROM Job_Request_Fact_Table AS T1
+    INNER JOIN Date_Dimension AS T2 ON T1.DateKey = T2.DateKey
+    INNER JOIN Item_Dimension AS I ON T1.ItemKey = I.ItemKey
+    WHERE T2.Year = ?
+'''
+LINE_QUERY = '''
+    SELECT d.Month, SUM(f.StockOnHand) AS total_stock
+    FROM Job_Request_Fact_Table f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    JOIN Date_Dimension d ON f.DateKey = d.DateKey
+    WHERE d.Year = ? AND LOWER(i.Category) = ?
+    GROUP BY d.Month
+    ORDER BY d.Month
+'''
+PIE_QUERY = '''
+    SELECT i.ObsoleteFlag, COUNT(DISTINCT i.SKU) AS count
+    FROM Item_Dimension i
+    JOIN Job_Request_Fact_Table f ON i.ItemKey = f.ItemKey
+    JOIN Date_Dimension d ON f.DateKey = d.DateKey
+    WHERE d.Year = ? AND LOWER(i.Category) = ?
+    GROUP BY i.ObsoleteFlag
+'''
+SKU_QUERY = "SELECT SKU FROM Item_Dimension WHERE LOWER(Category) = ? ORDER BY SKU"
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+def forecast_accuracy_pandas(conn):
+    error = pd.read_sql_query(MAE_ME_QUERY, conn, params=[2023])
+    qty = pd.read_sql_query(QTY_QUERY, conn, params=[2023])
+    return error.melt(var_name="Metric", value_name="Value"), qty.melt(var_name="Metric", value_name="Value")
+
+
+def forecast_accuracy_cursor(conn):
+    error = query_one(MAE_ME_QUERY, [2023], conn)
+    qty = query_one(QTY_QUERY, [2023], conn)
+    return (
+        {"Metric": ["Mean_Absolute_Error", "Mean_Error"], "Value": list(error)},
+        {"Metric": ["Total_ForecastQty", "Total_RequestedQty"], "Value": list(qty)},
+    )
+
+
+def stock_line_and_pie_pandas(conn):
+    line_df = pd.read_sql_query(LINE_QUERY, conn, params=[2023, "buildings"])
+    line_df["MonthName"] = line_df["Month"].map({i + 1: m for i, m in enumerate(MONTHS)})
+    all_months_df = pd.DataFrame({"Month": range(1, 13), "MonthName": MONTHS})
+    line_df = pd.merge(all_months_df, line_df, on=["Month", "MonthName"], how="left").fillna({"total_stock": 0})
+    pie_df = pd.read_sql_query(PIE_QUERY, conn, params=[2023, "buildings"])
+    pie_counts = [0, 0]
+    for _, row in pie_df.iterrows():
+        pie_counts[1 if row["ObsoleteFlag"] == 1 else 0] = row["count"]
+    return line_df, pie_counts
+
+
+def stock_line_and_pie_cursor(conn):
+    totals = dict(query_all(LINE_QUERY, [2023, "buildings"], conn))
+    line_data = {"MonthName": MONTHS, "total_stock": [totals.get(month, 0) for month in range(1, 13)]}
+    pie_counts = [0, 0]
+    for obsolete_flag, count in query_all(PIE_QUERY, [2023, "buildings"], conn):
+        pie_counts[1 if obsolete_flag == 1 else 0] = count
+    return line_data, pie_counts
+
+
+def sku_options_pandas(conn):
+    df = pd.read_sql_query(SKU_QUERY, conn, params=["office"])
+    return [{"label": sku, "value": sku} for sku in df["SKU"].unique()]
+
+
+def sku_options_cursor(conn):
+    return [{"label": sku, "value": sku} for sku in dict.fromkeys(query_column(SKU_QUERY, ["office"], conn))]
+
+
+CASES = [
+    ("update_mae_me_chart data", forecast_accuracy_pandas, forecast_accuracy_cursor),
+    ("update_line_and_pie_chart data", stock_line_and_pie_pandas, stock_line_and_pie_cursor),
+    ("SKU dropdown options", sku_options_pandas, sku_options_cursor),
+]
+
+
+def ms_per_call(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        conn = get_db_connection()
+        try:
+            func(conn)
+        finally:
+            conn.close()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'callback':<34}{'pandas':>9}{'cursor':>9}{'saved':>9}")
+    for name, before, after in CASES:
+        # One untimed call each, so both sides start with a warm page cache.
+        ms_per_call(before, 1)
+        ms_per_call(after, 1)
+        pandas_ms = ms_per_call(before, args.repeats)
+        cursor_ms = ms_per_call(after, args.repeats)
+        print(f"{name:<34}{pandas_ms:>9.2f}{cursor_ms:>9.2f}{pandas_ms - cursor_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
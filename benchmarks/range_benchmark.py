@@ -0,0 +1,63 @@
+"""Month-range totals: scanning the fact table versus subtracting two rows of the prefix index.
+
+Run from the repository root after the app has built its database:
+
+    python benchmarks/range_benchmark.py [--repeats 50]
+
+Each row totals every metric per section over a range ending at the last month,
+for a category. "scan" sums the fact rows in the range with SQL, as a range
+filter would without the index; "prefix" asks the in-process prefix index,
+whose cost does not depend on the range length. Times are milliseconds per query.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_utils import FACT_TABLE, get_db_connection  # noqa: E402
+from range_utils import get_prefix_index  # noqa: E402
+
+SCAN_QUERY = f'''
+    SELECT s.Section, COALESCE(SUM(f.RequestedQty), 0), SUM(f.IssuedQty), SUM(f.ForecastQty),
+        SUM(f.StockOnHand), SUM(f.IsStockout)
+    FROM {FACT_TABLE} f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    JOIN Section_Dimension s ON f.SectionKey = s.SectionKey
+    WHERE f.Year * 12 + f.Month - 1 BETWEEN ? AND ? AND LOWER(i.Category) = ?
+    GROUP BY s.Section
+'''
+CATEGORY = "buildings"
+
+
+def ms_per_call(func, repeats):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = get_prefix_index()
+    print(f"prefix index: {index.sums.shape[0]} series x {index.sums.shape[1] - 1} months, "
+          f"built in {(time.perf_counter() - started) * 1000:.1f} ms, {index.sums.nbytes / 1024:.0f} KiB")
+    conn = get_db_connection()
+    mask = index.series_mask([CATEGORY])
+    print(f"{'months':>8}{'scan':>10}{'prefix':>10}")
+    for months in (1, 3, 12, 36, index.last - index.first + 1):
+        start, end = index.last - months + 1, index.last
+        scan = ms_per_call(lambda: conn.execute(SCAN_QUERY, (start, end, CATEGORY)).fetchall(), args.repeats)
+        prefix = ms_per_call(lambda: index.group_totals(index.sections, start, end, mask), args.repeats)
+        print(f"{months:>8}{scan:>10.2f}{prefix:>10.3f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
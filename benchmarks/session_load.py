@@ -0,0 +1,330 @@
+"""Replay realistic dashboard sessions against a local server and report per-callback latency.
+
+Run from the repository root:
+
+    python benchmarks/session_load.py [--levels 1,4,8,16] [--seconds 20] [--url http://host:port]
+
+Without --url a server is started from gunicorn.conf.py (see load_test.py);
+--setup default starts plain sync workers instead.
+
+Each virtual user loops over sessions. A session opens a random dashboard the
+way a browser does: the index page, /_dash-layout, /_dash-dependencies and the
+page-render callback. Then it makes --actions interactions. Each interaction
+either picks a new value in one of the page's dropdowns (year, month, category,
+SKU) from the options the server rendered, or clicks a reset button. The
+callbacks that interaction triggers are posted in the same order as Dash's
+renderer, including chained ones: a category change refreshes the SKU dropdown,
+then the chart. Background callbacks are polled until they finish, and their
+latency covers the whole job. Calls within one session are sequential.
+
+Concurrency steps through --levels. Each level reports throughput, p50/p99
+latency in milliseconds and errors for every callback ID.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import sandbox_env, start_server  # noqa: E402
+
+PAGES = ["/inventory", "/operations", "/forecasting", "/planning"]
+PAGE_RENDER_OUTPUT = "_pages_content"
+# Give up polling a background job after this long and count it as an error.
+BACKGROUND_TIMEOUT_SECONDS = 60
+
+
+def parse_outputs(spec):
+    """Split a dependency's output string into (id, property) pairs."""
+    parts = spec[2:-2].split("...") if spec.startswith("..") else [spec]
+    return [tuple(part.rsplit(".", 1)) for part in parts]
+
+
+def callback_label(dep):
+    outputs = parse_outputs(dep["output"])
+    label = ".".join(outputs[0])
+    return f"{label} +{len(outputs) - 1}" if len(outputs) > 1 else label
+
+
+def walk_components(node, found):
+    """Collect the props of every component with an id in a serialized layout."""
+    if isinstance(node, list):
+        for child in node:
+            walk_components(child, found)
+    elif isinstance(node, dict):
+        props = node.get("props") if "type" in node else None
+        if props is not None:
+            if isinstance(props.get("id"), str):
+                found[props["id"]] = dict(props)
+            walk_components(props.get("children"), found)
+        else:
+            for value in node.values():
+                walk_components(value, found)
+    return found
+
+
+def option_values(options):
+    return [option["value"] if isinstance(option, dict) else option for option in options or []]
+
+
+class Stats:
+    """Latencies and errors per callback ID, shared by all virtual users."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, label, seconds=None, error=None):
+        with self.lock:
+            self.latencies.setdefault(label, [])
+            self.errors.setdefault(label, [])
+            if error is None:
+                self.latencies[label].append(seconds)
+            else:
+                self.errors[label].append(error)
+
+
+class Session:
+    """One virtual user: a persistent connection and the component state of its open page."""
+
+    def __init__(self, url, deps, stats, rng, actions, think):
+        parsed = urllib.parse.urlsplit(url)
+        self.conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=120)
+        self.deps = [d for d in deps if not d.get("clientside_function")]
+        self.render_dep = next(d for d in self.deps if PAGE_RENDER_OUTPUT in d["output"])
+        self.stats, self.rng, self.actions, self.think = stats, rng, actions, think
+        self.props = {}
+
+    def close(self):
+        self.conn.close()
+
+    def request(self, method, path, body=None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        for attempt in range(2):
+            try:
+                self.conn.request(method, path, body=data, headers=headers)
+                response = self.conn.getresponse()
+                payload = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # A recycled worker closed the idle connection; browsers retry once too.
+                self.conn.close()
+                if attempt:
+                    raise
+        if response.status not in (200, 204):
+            raise OSError(f"HTTP {response.status}")
+        return json.loads(payload) if payload and response.getheader("Content-Type", "").startswith("application/json") else None
+
+    def timed(self, label, func, *args):
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            self.conn.close()
+            self.stats.record(label, error=repr(e))
+            return None
+        self.stats.record(label, time.perf_counter() - start)
+        return result
+
+    def post_callback(self, dep, changed):
+        payload = {
+            "output": dep["output"],
+            "outputs": [{"id": i, "property": p} for i, p in parse_outputs(dep["output"])],
+            "inputs": [self.prop_value(x) for x in dep["inputs"]],
+            "changedPropIds": changed,
+            "state": [self.prop_value(x) for x in dep["state"]],
+        }
+        if len(payload["outputs"]) == 1:
+            payload["outputs"] = payload["outputs"][0]
+        body = self.request("POST", "/_dash-update-component", payload)
+        if dep.get("background") and body and "cacheKey" in body:
+            interval = dep["background"].get("interval", 250) / 1000
+            job = body["job"]
+            query = urllib.parse.urlencode({"cacheKey": body["cacheKey"], "job": job})
+            deadline = time.perf_counter() + BACKGROUND_TIMEOUT_SECONDS
+            while "response" not in body:
+                if time.perf_counter() > deadline:
+                    raise TimeoutError(f"background job {job} still running")
+                time.sleep(interval)
+                body = self.request("POST", f"/_dash-update-component?{query}", payload)
+                if body is None:
+                    # Dash answers 204 when the job is gone and its result was never stored.
+                    raise OSError("background job ended without a result")
+        return (body or {}).get("response", {})
+
+    def prop_value(self, dependency):
+        value = self.props.get(dependency["id"], {}).get(dependency["property"])
+        return {"id": dependency["id"], "property": dependency["property"], "value": value}
+
+    def fire(self, changed):
+        """Run every callback triggered by changed (id, prop) pairs, chained ones included."""
+        pending = [
+            d for d in self.deps
+            if d is not self.render_dep and any((i["id"], i["property"]) in changed for i in d["inputs"])
+        ]
+        while pending:
+            # Like Dash's renderer, hold back callbacks whose inputs another pending callback will update.
+            ready = [
+                d for d in pending
+                if not any(
+                    (i["id"], i["property"]) in parse_outputs(other["output"])
+                    for other in pending if other is not d for i in d["inputs"]
+                )
+            ] or pending[:1]
+            updated = set()
+            for dep in ready:
+                if not all(i["id"] in self.props for i in dep["inputs"]):
+                    continue
+                changed_ids = [f"{i['id']}.{i['property']}" for i in dep["inputs"] if (i["id"], i["property"]) in changed]
+                response = self.timed(callback_label(dep), self.post_callback, dep, changed_ids)
+                for component_id, props in (response or {}).items():
+                    self.props.setdefault(component_id, {}).update(props)
+                    updated.update((component_id, prop) for prop in props)
+            changed = updated
+            pending = [d for d in pending if d not in ready] + [
+                d for d in self.deps
+                if d is not self.render_dep and d not in pending
+                and any((i["id"], i["property"]) in updated for i in d["inputs"])
+            ]
+
+    def open_page(self, path):
+        self.timed("GET page", self.request, "GET", path)
+        self.timed("GET /_dash-layout", self.request, "GET", "/_dash-layout")
+        self.timed("GET /_dash-dependencies", self.request, "GET", "/_dash-dependencies")
+        self.props = {
+            "_pages_location": {"pathname": path, "search": ""},
+        }
+        response = self.timed(
+            callback_label(self.render_dep), self.post_callback, self.render_dep, ["_pages_location.pathname"]
+        )
+        self.props.update(walk_components(response or {}, {}))
+
+    def targets(self):
+        inputs = {(i["id"], i["property"]) for d in self.deps if d is not self.render_dep for i in d["inputs"]}
+        found = []
+        for component_id, prop in sorted(inputs):
+            props = self.props.get(component_id)
+            if props is None or props.get("disabled"):
+                continue
+            if prop == "value" and option_values(props.get("options")):
+                found.append((component_id, prop))
+            elif prop == "n_clicks":
+                found.append((component_id, prop))
+        return found
+
+    def act(self):
+        targets = self.targets()
+        if not targets:
+            return
+        component_id, prop = self.rng.choice(targets)
+        props = self.props[component_id]
+        if prop == "n_clicks":
+            props["n_clicks"] = (props.get("n_clicks") or 0) + 1
+        else:
+            values = option_values(props.get("options"))
+            if props.get("multi"):
+                props["value"] = self.rng.sample(values, self.rng.randint(1, min(3, len(values))))
+            else:
+                props["value"] = self.rng.choice(values)
+        self.fire({(component_id, prop)})
+
+    def run(self, deadline):
+        while time.perf_counter() < deadline:
+            self.open_page(self.rng.choice(PAGES))
+            for _ in range(self.actions):
+                if time.perf_counter() >= deadline:
+                    break
+                time.sleep(self.think)
+                self.act()
+
+
+def run_level(url, deps, users, seconds, actions, think, seed):
+    stats = Stats()
+    deadline = time.perf_counter() + seconds
+
+    def user(index):
+        session = Session(url, deps, stats, random.Random(seed + index), actions, think)
+        try:
+            session.run(deadline)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def percentile_ms(values, pct):
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0] * 1000
+    return statistics.quantiles(values, n=100)[pct - 1] * 1000
+
+
+def report(users, seconds, stats):
+    total = sum(len(v) for v in stats.latencies.values())
+    errors = sum(len(v) for v in stats.errors.values())
+    print(f"\n{users} users: {total / seconds:.1f} req/s, {errors} errors")
+    print(f"  {'callback':<48}{'count':>7}{'req/s':>8}{'p50':>8}{'p99':>8}{'errors':>8}")
+    for label in sorted(stats.latencies):
+        values = stats.latencies[label]
+        print(f"  {label[:47]:<48}{len(values):>7}{len(values) / seconds:>8.1f}"
+              f"{percentile_ms(values, 50):>8.0f}{percentile_ms(values, 99):>8.0f}{len(stats.errors[label]):>8}")
+    for label, messages in stats.errors.items():
+        for message in sorted(set(messages))[:3]:
+            print(f"  ! {label}: {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="target an already running server instead of starting one")
+    parser.add_argument("--setup", choices=["default", "tuned"], default="tuned")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--levels", default="1,4,8,16", help="comma-separated concurrent user counts")
+    parser.add_argument("--seconds", type=float, default=20, help="duration of each level")
+    parser.add_argument("--actions", type=int, default=5, help="interactions per page visit")
+    parser.add_argument("--think", type=float, default=0.2, help="seconds between interactions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    proc = None
+    sandbox = None
+    url = args.url
+    if url is None:
+        port = 8775
+        sandbox = tempfile.TemporaryDirectory()
+        proc, startup = start_server(args.setup, port, args.workers, sandbox_env(sandbox.name))
+        url = f"http://127.0.0.1:{port}"
+        print(f"started {args.setup} server with {args.workers} workers in {startup:.1f}s")
+    try:
+        parsed = urllib.parse.urlsplit(url)
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+        conn.request("GET", "/_dash-dependencies")
+        deps = json.loads(conn.getresponse().read())
+        conn.close()
+        for users in (int(level) for level in args.levels.split(",")):
+            stats = run_level(url, deps, users, args.seconds, args.actions, args.think, args.seed)
+            report(users, args.seconds, stats)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+            sandbox.cleanup()
+
+
+if __name__ == "__main__":
+    main()
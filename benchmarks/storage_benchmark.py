@@ -0,0 +1,113 @@
+"""Database size and pages read per dashboard query, for one or more database files.
+
+Run from the repository root after the app has built its database:
+
+    python benchmarks/storage_benchmark.py [OLD.db ...] [--repeats 200]
+
+With no paths the published database is measured; pass a copy of one built by
+an earlier version to compare layouts. Pages read are counted on a fresh
+connection with an empty page cache, from the bytes the process read
+(/proc/self/io, so Linux only) divided by the page size, after the schema is
+loaded. Times are milliseconds per query on a warm connection.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_utils import current_db_path  # noqa: E402
+
+# One query per dashboard, as the pages issue them.
+QUERIES = {
+    "operations consumption": ('''
+        SELECT I.Category, SUM(F.IssuedQty)
+        FROM Job_Request_Fact_Table F
+        JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
+        WHERE F.Year = ? AND F.Month = ?
+        GROUP BY I.Category
+    ''', (2022, 3)),
+    "inventory stock line": ('''
+        SELECT f.Month, SUM(f.StockOnHand)
+        FROM Job_Request_Fact_Table f
+        JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+        WHERE f.Year = ? AND LOWER(i.Category) = ?
+        GROUP BY f.Month
+    ''', (2023, "buildings")),
+    "section requests": ('''
+        SELECT S.Section, I.Category, SUM(F.RequestedQty)
+        FROM Job_Request_Fact_Table F
+        JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
+        JOIN Section_Dimension S ON F.SectionKey = S.SectionKey
+        WHERE F.Year = ?
+        GROUP BY S.Section, I.Category
+    ''', (2021,)),
+    "forecast error": ('''
+        SELECT AVG(ABS(T1.ForecastError_Demand)), AVG(T1.ForecastError_Demand)
+        FROM Job_Request_Fact_Table AS T1
+        JOIN Item_Dimension AS I ON T1.ItemKey = I.ItemKey
+        WHERE T1.Year = ? AND T1.Month = ? AND LOWER(I.Category) = ?
+    ''', (2023, 4, "office")),
+    "planning stockouts": ('''
+        SELECT i.Category, COUNT(*)
+        FROM Job_Request_Fact_Table f
+        JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+        WHERE f.IsStockout = 1 AND f.Year = ?
+        GROUP BY i.Category
+    ''', (2022,)),
+    "full fact scan": ('SELECT COUNT(*), SUM(StockOnHand) FROM Job_Request_Fact_Table', ()),
+}
+
+
+def bytes_read():
+    with open("/proc/self/io") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("rchar"))
+
+
+def pages_read(path, query, params):
+    conn = sqlite3.connect(path)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchall()
+    before = bytes_read()
+    conn.execute(query, params).fetchall()
+    read = bytes_read() - before
+    conn.close()
+    return read / page_size
+
+
+def ms_per_query(path, query, params, repeats):
+    conn = sqlite3.connect(path)
+    conn.execute(query, params).fetchall()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        conn.execute(query, params).fetchall()
+    conn.close()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    for path in args.paths or [current_db_path()]:
+        conn = sqlite3.connect(path)
+        pages, page_size = (conn.execute(f"PRAGMA {name}").fetchone()[0] for name in ("page_count", "page_size"))
+        fact_pages = conn.execute(
+            "SELECT COUNT(*) FROM dbstat WHERE name = 'Job_Request_Fact_Table'"
+        ).fetchone()[0] if conn.execute("SELECT 1 FROM pragma_module_list WHERE name = 'dbstat'").fetchone() else "?"
+        conn.close()
+        print(f"{os.path.basename(path)}: {os.path.getsize(path) / 1024:.0f} KiB, "
+              f"{pages} pages of {page_size} bytes, fact table {fact_pages} pages")
+        print(f"    {'query':<24}{'pages':>8}{'ms':>8}")
+        for name, (query, params) in QUERIES.items():
+            pages = pages_read(path, query, params)
+            ms = ms_per_query(path, query, params, args.repeats)
+            print(f"    {name:<24}{pages:>8.1f}{ms:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import copy
+
+from db_utils import FACT_KEY, FACT_TABLE, per_version_memo, read_fact_rows
+from trace_utils import span
+
+# Rows per bitmap chunk. Empty chunks are not stored, and a chunk whose rows form
+# one contiguous run is stored as its bounds, so values clustered by period stay small.
+CHUNK_ROWS = 1 << 16
+# Filterable attributes and the expression giving each row's value.
+BITMAP_COLUMNS = {
+    'Year': 'f.Year',
+    'Month': 'f.Month',
+    'Category': 'LOWER(i.Category)',
+    'SKU': 'i.SKU',
+    'Section': 's.Section',
+}
+# Per-row measures the bitmaps select from.
+ROW_MEASURES = {
+    'StockOnHand': 'f.StockOnHand',
+    'IsShortfall': 'f.IsShortfall',
+    'IsInventoryFailure': 'f.IsInventoryFailure',
+}
+BITMAP_SELECT = f'''
+    SELECT f.ItemKey, {', '.join(BITMAP_COLUMNS.values())}, {', '.join(ROW_MEASURES.values())}
+    FROM {FACT_TABLE} f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    JOIN Section_Dimension s ON f.SectionKey = s.SectionKey
+    {{where}}
+    ORDER BY {', '.join(f'f.{key}' for key in FACT_KEY)}
+'''
+
+
+def _unpacked(chunk, length):
+    import numpy as np
+    if isinstance(chunk, tuple):
+        mask = np.zeros(length, dtype=bool)
+        mask[chunk[0]:chunk[1]] = True
+        return mask
+    return np.unpackbits(chunk, count=length).view(bool)
+
+
+def _packed(chunk, length):
+    import numpy as np
+    return np.packbits(_unpacked(chunk, length)) if isinstance(chunk, tuple) else chunk
+
+
+class Bitmap:
+    """A set of fact row positions, kept per CHUNK_ROWS chunk as a (start, stop) run or packed bits."""
+
+    __slots__ = ('chunks', 'size')
+
+    def __init__(self, chunks, size):
+        self.chunks = chunks
+        self.size = size
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Compress a boolean array over every fact row."""
+        import numpy as np
+        chunks = {}
+        for number, start in enumerate(range(0, len(mask), CHUNK_ROWS)):
+            part = mask[start:start + CHUNK_ROWS]
+            rows = np.flatnonzero(part)
+            if not len(rows):
+                continue
+            run = (int(rows[0]), int(rows[-1]) + 1)
+            chunks[number] = run if run[1] - run[0] == len(rows) else np.packbits(part)
+        return cls(chunks, len(mask))
+
+    @classmethod
+    def full(cls, size):
+        return cls({
+            number: (0, min(CHUNK_ROWS, size - number * CHUNK_ROWS))
+            for number in range((size + CHUNK_ROWS - 1) // CHUNK_ROWS)
+        }, size)
+
+    def _length(self, number):
+        return min(CHUNK_ROWS, self.size - number * CHUNK_ROWS)
+
+    def __or__(self, other):
+        import numpy as np
+        chunks = dict(self.chunks)
+        for number, theirs in other.chunks.items():
+            mine = chunks.get(number)
+            if mine is None:
+                chunks[number] = theirs
+            elif isinstance(mine, tuple) and isinstance(theirs, tuple) and mine[0] <= theirs[1] and theirs[0] <= mine[1]:
+                chunks[number] = (min(mine[0], theirs[0]), max(mine[1], theirs[1]))
+            else:
+                length = self._length(number)
+                chunks[number] = np.bitwise_or(_packed(mine, length), _packed(theirs, length))
+        return Bitmap(chunks, self.size)
+
+    def __and__(self, other):
+        import numpy as np
+        chunks = {}
+        for number in self.chunks.keys() & other.chunks.keys():
+            mine, theirs = self.chunks[number], other.chunks[number]
+            length = self._length(number)
+            if isinstance(mine, tuple) and mine == (0, length):
+                chunks[number] = theirs
+            elif isinstance(theirs, tuple) and theirs == (0, length):
+                chunks[number] = mine
+            elif isinstance(mine, tuple) and isinstance(theirs, tuple):
+                run = (max(mine[0], theirs[0]), min(mine[1], theirs[1]))
+                if run[0] < run[1]:
+                    chunks[number] = run
+            else:
+                both = np.bitwise_and(_packed(mine, length), _packed(theirs, length))
+                if both.any():
+                    chunks[number] = both
+        return Bitmap(chunks, self.size)
+
+    def extended(self, other):
+        """Return the rows of this bitmap followed by those of other, over both sizes added up."""
+        import numpy as np
+        size = self.size + other.size
+        # Rows of other are shifted into place from this bitmap's last, partial chunk on.
+        number, filled = divmod(self.size, CHUNK_ROWS)
+        # Only a packed partial chunk has to grow with the size; runs stay valid as they are.
+        if not other.chunks and not isinstance(self.chunks.get(number), np.ndarray):
+            return Bitmap(self.chunks, size)
+        chunks = {n: chunk for n, chunk in self.chunks.items() if n < number}
+        tail = np.zeros(filled + other.size, dtype=bool)
+        if number in self.chunks:
+            tail[:filled] = _unpacked(self.chunks[number], filled)
+        for rows, mask in other.row_slices():
+            tail[filled + rows.start:filled + rows.stop] = True if mask is None else mask
+        for n, chunk in Bitmap.from_mask(tail).chunks.items():
+            chunks[number + n] = chunk
+        return Bitmap(chunks, size)
+
+    def row_slices(self):
+        """Yield (slice of fact rows, boolean mask or None when every row in it is set) per stored chunk."""
+        import numpy as np
+        for number, chunk in sorted(self.chunks.items()):
+            start = number * CHUNK_ROWS
+            if isinstance(chunk, tuple):
+                yield slice(start + chunk[0], start + chunk[1]), None
+            else:
+                length = self._length(number)
+                yield slice(start, start + length), np.unpackbits(chunk, count=length).view(bool)
+
+    @property
+    def nbytes(self):
+        return sum(0 if isinstance(chunk, tuple) else chunk.nbytes for chunk in self.chunks.values())
+
+
+class FactBitmaps:
+    """Per-value bitmaps over the fact rows for each BITMAP_COLUMNS attribute, with the row measures."""
+
+    def __init__(self, rows, state=None):
+        import numpy as np
+        self.state = state
+        self.size = len(rows)
+        columns = list(zip(*rows)) or [()] * (1 + len(BITMAP_COLUMNS) + len(ROW_MEASURES))
+        self.item_keys, self.items = np.unique(np.array(columns[0], dtype=np.int64), return_inverse=True)
+        self.bitmaps = {}
+        for name, values in zip(BITMAP_COLUMNS, columns[1:1 + len(BITMAP_COLUMNS)]):
+            labels, codes = np.unique(np.array(values, dtype=object), return_inverse=True)
+            self.bitmaps[name] = {label: Bitmap.from_mask(codes == code) for code, label in enumerate(labels.tolist())}
+        self.measures = {
+            name: np.array(values, dtype=np.int64)
+            for name, values in zip(ROW_MEASURES, columns[1 + len(BITMAP_COLUMNS):])
+        }
+
+    def extended(self, rows, state):
+        """Return new bitmaps over these fact rows followed by rows, appended since in BITMAP_SELECT's columns.
+
+        The appended rows take the positions after the existing ones, so only the
+        bitmaps' last chunks are rebuilt.
+        """
+        import numpy as np
+        added = FactBitmaps(rows, state)
+        result = copy.copy(added)
+        result.size = self.size + added.size
+        result.item_keys = np.union1d(self.item_keys, added.item_keys)
+        result.items = np.concatenate([
+            np.searchsorted(result.item_keys, self.item_keys)[self.items],
+            np.searchsorted(result.item_keys, added.item_keys)[added.items],
+        ])
+        result.bitmaps = {}
+        for name, mine in self.bitmaps.items():
+            theirs = added.bitmaps[name]
+            result.bitmaps[name] = {
+                label: mine.get(label, Bitmap({}, self.size)).extended(theirs.get(label, Bitmap({}, added.size)))
+                for label in mine.keys() | theirs.keys()
+            }
+        result.measures = {name: np.concatenate([values, added.measures[name]]) for name, values in self.measures.items()}
+        return result
+
+    def select(self, **filters):
+        """Return the rows matching every filter; each filter is a list of accepted values, None for all."""
+        selected = Bitmap.full(self.size)
+        for name, values in filters.items():
+            if values is None:
+                continue
+            empty = Bitmap({}, self.size)
+            matches = [self.bitmaps[name].get(value, empty) for value in values]
+            union = empty
+            for bitmap in matches:
+                union = union | bitmap
+            selected = selected & union
+        return selected
+
+    def item_totals(self, bitmap):
+        """Return (ItemKeys, row counts, {measure: per-item sums}) over the selected rows."""
+        import numpy as np
+        counts = np.zeros(len(self.item_keys), dtype=np.int64)
+        sums = {name: np.zeros(len(self.item_keys), dtype=np.int64) for name in self.measures}
+        for rows, mask in bitmap.row_slices():
+            items = self.items[rows] if mask is None else self.items[rows][mask]
+            counts += np.bincount(items, minlength=len(self.item_keys))
+            for name, values in self.measures.items():
+                values = values[rows] if mask is None else values[rows][mask]
+                sums[name] += np.bincount(items, weights=values, minlength=len(self.item_keys)).astype(np.int64)
+        return self.item_keys, counts, sums
+
+    @property
+    def nbytes(self):
+        return sum(bitmap.nbytes for values in self.bitmaps.values() for bitmap in values.values())
+
+
+@per_version_memo
+def get_fact_bitmaps(previous):
+    """Return this process's fact bitmaps for the current data version, building them on first use.
+
+    Rows appended since the previous version are added after that version's rows.
+    """
+    with span('bitmap build') as attrs:
+        state, rows, attrs['appended'] = read_fact_rows(BITMAP_SELECT, previous and previous.state)
+        return previous.extended(rows, state) if attrs['appended'] else FactBitmaps(rows, state)
@@ -0,0 +1,412 @@
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-flight stays per process
+    fcntl = None
+
+from db_utils import appended_periods, get_data_version, on_new_data
+from trace_utils import span
+
+# Shared cache files. Kept out of assets/ because Dash serves that folder publicly.
+CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'cache'))
+CACHE_PATH = os.path.join(CACHE_DIR, 'dashboard_cache.db')
+CACHE_MAX_BYTES = int(os.environ.get('DASHBOARD_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+CACHE_ENABLED = os.environ.get('DASHBOARD_CACHE', '1') != '0'
+# Coalesce identical computations across worker processes through lock files.
+SINGLE_FLIGHT_LOCKFILE = os.environ.get('DASHBOARD_SINGLE_FLIGHT_LOCKFILE', '1') != '0'
+LOCK_DIR = os.path.join(os.path.dirname(CACHE_PATH), 'locks')
+# Give up waiting on another worker after this long and compute locally instead.
+LOCK_TIMEOUT_SECONDS = 30
+# How long a page loader's result stays in process memory for sibling callbacks.
+CONTEXT_TTL_SECONDS = 5
+# Only refresh an entry's access time when it is older than this, so hot reads stay read-only.
+ACCESS_TOUCH_SECONDS = 60
+
+_local = threading.local()
+_inflight = {}
+_inflight_lock = threading.Lock()
+_context = {}
+_context_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # A forked child must not wait on computations owned by its parent's threads.
+    global _inflight_lock, _context_lock
+    _inflight.clear()
+    _context.clear()
+    _inflight_lock = threading.Lock()
+    _context_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_cache_connection(cache_path=CACHE_PATH):
+    """Return this thread's connection to the shared cache file."""
+    conn = getattr(_local, 'conn', None)
+    # Connections must not cross a fork, so they are tied to the owning process.
+    if conn is not None and _local.pid == os.getpid() and _local.path == cache_path:
+        return conn
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    conn = sqlite3.connect(cache_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS cache_entries (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            accessed REAL NOT NULL,
+            periods TEXT,
+            PRIMARY KEY (namespace, key)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (accessed)')
+    if 'periods' not in {row[1] for row in conn.execute('PRAGMA table_info(cache_entries)')}:
+        # A cache file written before entries recorded the months they read.
+        with contextlib.suppress(sqlite3.OperationalError):
+            conn.execute('ALTER TABLE cache_entries ADD COLUMN periods TEXT')
+    _local.conn, _local.pid, _local.path = conn, os.getpid(), cache_path
+    return conn
+
+
+def make_key(name, *args, **kwargs):
+    """Build a stable cache key from a function name and its arguments."""
+    payload = json.dumps([name, args, kwargs], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def cache_get(key, namespace=None):
+    """Return the cached bytes for key, or None on a miss."""
+    namespace = namespace or get_data_version()
+    conn = get_cache_connection()
+    row = conn.execute(
+        'SELECT value, accessed FROM cache_entries WHERE namespace = ? AND key = ?',
+        (namespace, key)
+    ).fetchone()
+    if row is None:
+        return None
+    now = time.time()
+    if now - row[1] > ACCESS_TOUCH_SECONDS:
+        conn.execute(
+            'UPDATE cache_entries SET accessed = ? WHERE namespace = ? AND key = ?',
+            (now, namespace, key)
+        )
+    return row[0]
+
+
+def cache_set(key, value, namespace=None, periods=None):
+    """Store bytes under key and evict old entries if the cache is over budget.
+
+    periods lists the [year, month] pairs (month None for the whole year) the value
+    was computed from; None means any fact row. See call_periods.
+    """
+    namespace = namespace or get_data_version()
+    conn = get_cache_connection()
+    conn.execute(
+        'INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, accessed, periods) VALUES (?, ?, ?, ?, ?, ?)',
+        (namespace, key, sqlite3.Binary(value), len(value), time.time(), None if periods is None else json.dumps(periods))
+    )
+    evict(namespace)
+
+
+def evict(namespace=None, max_bytes=CACHE_MAX_BYTES):
+    """Drop entries from old data versions, then least recently used ones, until under max_bytes."""
+    namespace = namespace or get_data_version()
+    conn = get_cache_connection()
+    total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entries').fetchone()[0]
+    if total <= max_bytes:
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('DELETE FROM cache_entries WHERE namespace != ?', (namespace,))
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entries').fetchone()[0]
+        if total > max_bytes:
+            rows = conn.execute('SELECT key, size FROM cache_entries ORDER BY accessed').fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= max_bytes:
+                    break
+                stale.append((namespace, key))
+                total -= size
+            conn.executemany('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', stale)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def clear_cache():
+    """Remove every cached entry."""
+    get_cache_connection().execute('DELETE FROM cache_entries')
+
+
+def carry_over_entries(version):
+    """Move entries of older versions that version only appended rows to, outside their periods, to version.
+
+    Returns the number of entries carried over.
+    """
+    conn = get_cache_connection()
+    carried = 0
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        namespaces = [row[0] for row in conn.execute(
+            'SELECT DISTINCT namespace FROM cache_entries WHERE namespace != ?', (version,)
+        )]
+        for namespace in namespaces:
+            appended = appended_periods(namespace, version)
+            if appended is None:
+                continue
+            years = {year for year, _ in appended}
+            rows = conn.execute(
+                'SELECT key, periods FROM cache_entries WHERE namespace = ? AND periods IS NOT NULL', (namespace,)
+            ).fetchall()
+            unaffected = [
+                (version, namespace, key) for key, periods in rows
+                if not any(year in years if month is None else (year, month) in appended
+                           for year, month in json.loads(periods))
+            ]
+            # An entry already computed under version wins over the carried one.
+            conn.executemany('UPDATE OR IGNORE cache_entries SET namespace = ? WHERE namespace = ? AND key = ?', unaffected)
+            carried += len(unaffected)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    return carried
+
+
+@on_new_data
+def _drop_stale_entries(version):
+    # Results of other versions can never be served again, unless only months they did
+    # not read were appended to; carry those over and free the rest's space now.
+    with _context_lock:
+        _context.clear()
+    if CACHE_ENABLED:
+        with contextlib.suppress(sqlite3.Error):
+            carry_over_entries(version)
+        with contextlib.suppress(sqlite3.Error):
+            get_cache_connection().execute('DELETE FROM cache_entries WHERE namespace != ?', (version,))
+    if SINGLE_FLIGHT_LOCKFILE:
+        _drop_stale_lock_files(version)
+
+
+def _drop_stale_lock_files(version):
+    # Lock files are named after the version their key was computed under, so the rest
+    # are never taken again. Without this the directory grows with every ingested batch.
+    try:
+        names = os.listdir(LOCK_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not name.startswith(f'{version}-'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(LOCK_DIR, name))
+
+
+class _Call:
+    """An in-flight computation that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+@contextlib.contextmanager
+def _lock_file(key):
+    if not SINGLE_FLIGHT_LOCKFILE or fcntl is None:
+        yield
+        return
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    # One lock file per key: callbacks only ever nest data functions, so per-key locks cannot deadlock.
+    with open(os.path.join(LOCK_DIR, f'{key}.lock'), 'a') as f:
+        deadline = time.monotonic() + LOCK_TIMEOUT_SECONDS
+        locked = False
+        while not locked:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if locked:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def single_flight(key, func, *args, **kwargs):
+    """Run func once for concurrent callers sharing key; the others wait and get its result."""
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+    if not leader:
+        with span('single-flight wait'):
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+    try:
+        with _lock_file(key):
+            call.result = func(*args, **kwargs)
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        call.done.set()
+    return call.result
+
+
+def _source_tag(func):
+    # Entries outlive restarts, so a deploy that changes what a module's functions return must miss.
+    try:
+        with open(func.__code__.co_filename, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()[:12]
+    except OSError:
+        return ''
+
+
+def call_periods(year, month=None):
+    """Return the [year, month] pairs a call filtered to year and month reads, or None for every period.
+
+    year is a year or a list of years, month a month; a false value or "all"
+    means every year or the whole year. A month of None in a pair is the whole
+    year. Any other value counts as every year, so it can only be recomputed too often.
+    """
+    years = year if isinstance(year, (list, tuple)) else [year]
+    if not years or not all(years):
+        return None
+    try:
+        years = sorted({int(y) for y in years})
+    except (TypeError, ValueError):
+        return None
+    try:
+        month = int(month) if month and month != 'all' else None
+    except (TypeError, ValueError):
+        month = None
+    return [[y, month] for y in years]
+
+
+def _cached(dumps, loads):
+    def decorator(func=None, *, periods=None):
+        if func is None:
+            return functools.partial(decorator, periods=periods)
+        name = f'{func.__module__}.{func.__qualname__}@{_source_tag(func)}'
+        signature = inspect.signature(func)
+
+        def read_periods(args, kwargs):
+            if periods is None:
+                return None
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return call_periods(*(bound.arguments[param] for param in periods)) if periods else []
+
+        def lookup(key, namespace):
+            if not CACHE_ENABLED:
+                return None
+            try:
+                return cache_get(key, namespace)
+            except sqlite3.Error:
+                return None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(name, *args, **kwargs)
+            # Read the version once: if a new one is published mid-computation, the result
+            # lands under the old version, never under the new one.
+            namespace = get_data_version()
+            with span('cache get', fn=func.__name__) as attrs:
+                hit = lookup(key, namespace)
+                attrs['hit'] = hit is not None
+                if hit is not None:
+                    return loads(hit)
+
+            def compute():
+                # Another worker may have filled the entry while we waited on the lock file.
+                hit = lookup(key, namespace)
+                if hit is not None:
+                    return hit
+                result = func(*args, **kwargs)
+                with span('cache put', fn=func.__name__):
+                    value = dumps(result)
+                    if CACHE_ENABLED:
+                        try:
+                            cache_set(key, value, namespace, read_periods(args, kwargs))
+                        except sqlite3.Error:
+                            pass
+                return value
+
+            value = single_flight(f'{namespace}-{key}', compute)
+            # Every caller deserializes its own copy, so shared results are never aliased.
+            with span('cache load', fn=func.__name__):
+                return loads(value)
+        return wrapper
+    return decorator
+
+
+def _figure_dumps(result):
+    from plotly.io.json import to_json_plotly
+    return to_json_plotly(result).encode('utf-8')
+
+
+def _figure_loads(value):
+    result = json.loads(value)
+    return tuple(result) if isinstance(result, list) else result
+
+
+# Used bare, or as @cached(periods=('year', 'month')) naming the parameters that limit
+# the fact rows a call reads to a year and month (see call_periods), with periods=()
+# for functions that read none. Such entries survive batches appended to other months.
+# Query results (DataFrames, tuples) are pickled.
+cached = _cached(pickle.dumps, pickle.loads)
+# Callback results are stored as serialized figure JSON and returned as plain dicts.
+cached_figure = _cached(_figure_dumps, _figure_loads)
+
+
+def data_context(func=None, *, periods=None):
+    """Share a page loader's result between the callbacks fired by one input change.
+
+    Dash sends each callback as its own request, so the result is held in process
+    memory for CONTEXT_TTL_SECONDS and otherwise comes from the shared cache,
+    where periods works as for cached. Callers must treat the returned datasets
+    as read-only.
+    """
+    if func is None:
+        return functools.partial(data_context, periods=periods)
+    loader = cached(func, periods=periods)
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = make_key(name, get_data_version(), *args, **kwargs)
+        now = time.monotonic()
+        with _context_lock:
+            entry = _context.get(key)
+            if entry is not None and now - entry[0] < CONTEXT_TTL_SECONDS:
+                return entry[1]
+        result = loader(*args, **kwargs)
+        with _context_lock:
+            for stale in [k for k, (t, _) in _context.items() if now - t >= CONTEXT_TTL_SECONDS]:
+                del _context[stale]
+            _context[key] = (now, result)
+        return result
+    return wrapper
@@ -1,9 +1,25 @@
+import argparse
+import contextlib
+import functools
+import glob
+import hashlib
+import itertools
+import json
 import sqlite3
-import pandas as pd
 import os
+import sys
+import threading
+import time
+import warnings
 
-# Path to database
-DB_PATH = os.path.join(os.path.dirname(__file__), 'assets/inventory.db')
+from trace_utils import span
+
+# Each data version is built into its own database file here, next to the ones it replaces.
+DATA_DIR = os.environ.get('DASHBOARD_DATA_DIR', os.path.join(os.path.dirname(__file__), 'data'))
+# Holds the file name of the published database; replaced atomically to switch versions.
+CURRENT_POINTER = os.path.join(DATA_DIR, 'CURRENT')
+# Superseded database files kept for requests that are still reading them.
+KEEP_OLD_DATABASES = 2
 
 # List your CSV files and table names here
 CSV_FILES = [
@@ -13,15 +29,465 @@ CSV_FILES = [
     os.path.join(os.path.dirname(__file__), 'assets/db/Section_Dimension.csv'),
 ]
 TABLE_NAMES = ['Date_Dimension', 'Item_Dimension', 'Job_Request_Fact_Table', 'Section_Dimension']
+FACT_TABLE = 'Job_Request_Fact_Table'
+# Each dimension table and the key the fact table references it by.
+DIMENSION_KEYS = {'Date_Dimension': 'DateKey', 'Item_Dimension': 'ItemKey', 'Section_Dimension': 'SectionKey'}
+# Text columns of the fact CSV stored as integer keys into a table of their distinct values.
+ENCODED_COLUMNS = {
+    'JobRequestID': ('Job_Request_Dimension', 'JobRequestKey'),
+    'FulfillmentStatus': ('Fulfillment_Status_Dimension', 'FulfillmentStatusKey'),
+}
+# The fact table is stored WITHOUT ROWID in this order, the order dashboard filters narrow it in.
+# No set of the source columns is unique (a job request may list one item twice), so the
+# key ends with LineNumber: the row's line in the fact CSV, continued through appended batches.
+FACT_KEY = ['Year', 'Month', 'ItemKey', 'LineNumber']
+
+# The data version hashes the table definitions below, so a database built by code
+# whose tables differ is rebuilt even though the CSV files are unchanged. Bump this
+# for changes those definitions do not show, such as how a CSV value is converted.
+SCHEMA_VERSION = 5
+
+# Conditions the dashboards count, stored on each fact row as 0/1 when it is built or appended,
+# so every page shares one definition. IsStockout itself comes from the source data.
+DERIVED_FLAGS = {
+    # More was requested than was on hand; the Inventory "stockouts" KPI.
+    'IsShortfall': 'COALESCE(f.RequestedQty > f.StockOnHand, 0)',
+    # More on hand than was forecast.
+    'IsOverstock': 'COALESCE(f.StockOnHand > f.ForecastQty, 0)',
+    # Overstocked or obsolete; the Inventory failure chart.
+    'IsInventoryFailure': '(i.ObsoleteFlag = 1 OR COALESCE(f.StockOnHand > f.ForecastQty, 0))',
+}
+
+# Columns of the tables built from the CSV files, and of the logs kept beside them. All
+# are STRICT, so a value of the wrong type fails the build instead of being stored as text.
+TABLE_SCHEMAS = {
+    'Date_Dimension': 'DateKey INTEGER PRIMARY KEY, Year INTEGER NOT NULL, Month INTEGER NOT NULL',
+    'Item_Dimension': 'ItemKey INTEGER PRIMARY KEY, Category TEXT NOT NULL, SKU TEXT NOT NULL, ObsoleteFlag INTEGER NOT NULL',
+    'Section_Dimension': 'SectionKey INTEGER PRIMARY KEY, Section TEXT NOT NULL',
+    'Job_Request_Dimension': 'JobRequestKey INTEGER PRIMARY KEY, JobRequestID TEXT NOT NULL UNIQUE',
+    'Fulfillment_Status_Dimension': 'FulfillmentStatusKey INTEGER PRIMARY KEY, FulfillmentStatus TEXT NOT NULL UNIQUE',
+    FACT_TABLE: f'''
+        Year INTEGER NOT NULL, Month INTEGER NOT NULL, ItemKey INTEGER NOT NULL, LineNumber INTEGER NOT NULL,
+        JobRequestKey INTEGER NOT NULL, SectionKey INTEGER NOT NULL, DateKey INTEGER NOT NULL,
+        RequestedQty REAL, IssuedQty INTEGER NOT NULL, StockOnHand INTEGER NOT NULL, ForecastQty INTEGER NOT NULL,
+        IsStockout INTEGER NOT NULL, FulfillmentStatusKey INTEGER NOT NULL,
+        ForecastError_Demand REAL, ForecastError_Supply INTEGER NOT NULL,
+        {', '.join(f'{name} INTEGER NOT NULL' for name in DERIVED_FLAGS)},
+        PRIMARY KEY ({', '.join(FACT_KEY)})
+    ''',
+    # Each ingested batch is kept whole, as JSON, so a rebuild can replay it. Periods lists
+    # the [Year, Month] pairs it added rows to, so results for other months stay cached.
+    'Ingest_Log': 'BatchId TEXT PRIMARY KEY, Rows INTEGER, IngestedAt REAL, Version TEXT, Batch TEXT NOT NULL, '
+                  'Periods TEXT NOT NULL',
+    # Lines counts the fact rows loaded so far, so the next one appended is numbered Lines + 1.
+    'Data_Version': 'Version TEXT, SourceVersion TEXT, Lines INTEGER NOT NULL',
+}
+# Rows of {source}, a table with the fact CSV's columns, as fact table rows. The one
+# parameter is the number of rows loaded before them, which their LineNumbers follow.
+FACT_SELECT = f'''
+    SELECT
+        d.Year, d.Month, f.ItemKey, ? + f.rowid AS LineNumber, j.JobRequestKey, f.SectionKey, f.DateKey,
+        f.RequestedQty, f.IssuedQty, f.StockOnHand, f.ForecastQty, f.IsStockout,
+        s.FulfillmentStatusKey, f.ForecastError_Demand, f.ForecastError_Supply,
+        {', '.join(f'{expression} AS {name}' for name, expression in DERIVED_FLAGS.items())}
+    FROM {{source}} f
+    LEFT JOIN Date_Dimension d ON f.DateKey = d.DateKey
+    LEFT JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    LEFT JOIN Job_Request_Dimension j ON f.JobRequestID = j.JobRequestID
+    LEFT JOIN Fulfillment_Status_Dimension s ON f.FulfillmentStatus = s.FulfillmentStatus
+    ORDER BY d.Year, d.Month, f.ItemKey, f.rowid
+'''
+
+# Fact totals per Year x Month x Category x SKU, kept in step with the fact table on every append.
+AGGREGATE_TABLE = 'Monthly_SKU_Aggregate'
+AGGREGATE_SCHEMA = '''
+    Year INTEGER NOT NULL, Month INTEGER NOT NULL, Category TEXT NOT NULL, SKU TEXT NOT NULL,
+    RowCount INTEGER, RequestedQty REAL, IssuedQty INTEGER, StockOnHand INTEGER,
+    ForecastQty INTEGER, StockoutEvents INTEGER,
+    ShortfallEvents INTEGER, OverstockEvents INTEGER, InventoryFailures INTEGER,
+    PRIMARY KEY (Year, Month, Category, SKU)
+'''
+# The aggregate's summed columns, in AGGREGATE_SELECT order after the key.
+AGGREGATE_MEASURES = [
+    'RowCount', 'RequestedQty', 'IssuedQty', 'StockOnHand', 'ForecastQty', 'StockoutEvents',
+    'ShortfallEvents', 'OverstockEvents', 'InventoryFailures',
+]
+AGGREGATE_SELECT = '''
+    SELECT
+        f.Year, f.Month, i.Category, i.SKU,
+        COUNT(*),
+        COALESCE(SUM(f.RequestedQty), 0),
+        COALESCE(SUM(f.IssuedQty), 0),
+        COALESCE(SUM(f.StockOnHand), 0),
+        COALESCE(SUM(f.ForecastQty), 0),
+        COALESCE(SUM(f.IsStockout), 0),
+        COALESCE(SUM(f.IsShortfall), 0),
+        COALESCE(SUM(f.IsOverstock), 0),
+        COALESCE(SUM(f.IsInventoryFailure), 0)
+    FROM {source} f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    WHERE true
+    GROUP BY f.Year, f.Month, i.Category, i.SKU
+'''
+
+# Selections longer than this are joined through a temp table instead of an IN (...) list.
+MAX_IN_LIST = 50
+
+_current_path = {}
+_data_version = {}
+_seen_version = None
+_version_lock = threading.Lock()
+_version_listeners = []
+_temp_table_ids = itertools.count()
+
+def current_db_path(pointer=CURRENT_POINTER):
+    """Return the path of the published database file."""
+    st = os.stat(pointer)
+    stamp = (st.st_ino, st.st_mtime_ns)
+    cached = _current_path.get(pointer)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(pointer, encoding='utf-8') as f:
+        path = os.path.join(os.path.dirname(pointer), f.read().strip())
+    _current_path[pointer] = (stamp, path)
+    return path
+
+def get_db_connection(db_path=None):
+    """Return a new SQLite connection, to the published database unless db_path is given."""
+    with span('connect'):
+        return sqlite3.connect(db_path or current_db_path())
+
+def _query_label(query):
+    return ' '.join(query.split())[:120]
+
+def read_sql_query(query, conn, params=None):
+    """Run query on conn and return the result as a DataFrame."""
+    import pandas as pd
+    with span('sql', query=_query_label(query)):
+        return pd.read_sql_query(query, conn, params=params)
+
+def query_one(query, params=(), conn=None):
+    """Run query and return its first row as a tuple, without building a DataFrame."""
+    with borrow_connection(conn) as conn, span('sql', query=_query_label(query)):
+        return conn.execute(query, params).fetchone()
+
+def query_all(query, params=(), conn=None):
+    """Run query and return every row as a tuple, for results too small to need a DataFrame."""
+    with borrow_connection(conn) as conn, span('sql', query=_query_label(query)):
+        return conn.execute(query, params).fetchall()
+
+def query_column(query, params=(), conn=None):
+    """Run query and return the values of its first column as a list."""
+    with borrow_connection(conn) as conn, span('sql', query=_query_label(query)):
+        return [row[0] for row in conn.execute(query, params)]
+
+@contextlib.contextmanager
+def borrow_connection(conn=None):
+    """Yield conn, or a new connection that is closed afterwards."""
+    if conn is not None:
+        yield conn
+        return
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+def in_filter(conn, column, values):
+    """Return an SQL fragment and params restricting column to values.
+
+    Short lists use bound IN (?, ...) parameters. Long ones are loaded into a
+    temp table on conn, so query time depends on the matching rows rather than
+    the parameter count, and SQLite's variable limit never applies.
+    """
+    values = list(dict.fromkeys(values))
+    if len(values) <= MAX_IN_LIST:
+        return f" AND {column} IN ({', '.join(['?'] * len(values))})", values
+    table = f"filter_values_{next(_temp_table_ids)}"
+    with span('sql', query=f'load {len(values)} values into temp.{table}'):
+        conn.execute(f"CREATE TEMP TABLE {table} (value PRIMARY KEY) WITHOUT ROWID")
+        conn.executemany(f"INSERT INTO temp.{table} VALUES (?)", ((v,) for v in values))
+    return f" AND {column} IN (SELECT value FROM temp.{table})", []
+
+def compute_data_version(csv_files=CSV_FILES):
+    """Return a content hash of the source CSV files and the schema they are built into."""
+    schema = [f'schema {SCHEMA_VERSION}', *(f'{table} ({columns})' for table, columns in TABLE_SCHEMAS.items())]
+    schema += [FACT_SELECT, AGGREGATE_SCHEMA, AGGREGATE_SELECT]
+    # Reindenting a definition leaves the version alone.
+    digest = hashlib.sha1(' '.join(' '.join(schema).split()).encode('utf-8'))
+    for csv_file in csv_files:
+        with open(csv_file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def on_new_data(func):
+    """Register func(version) to run in each process the first time it sees a new data version.
+
+    For in-memory structures derived from the data, which must be rebuilt
+    when a new version is published or rows are appended.
+    """
+    _version_listeners.append(func)
+    return func
+
+def per_version_memo(build):
+    """Decorate build(previous) into a no-argument function memoizing it per data version.
 
-def get_db_connection(db_path=DB_PATH):
-    """Return a new SQLite connection."""
-    return sqlite3.connect(db_path)
+    For in-memory structures derived from the whole fact table. Each process
+    builds the value on first use; on a new version, build is passed the value of
+    the last one, so rows appended since can be folded into it (see read_fact_rows).
+    """
+    memo = None
+    lock = threading.Lock()
 
-def import_csvs_to_sqlite(db_path=DB_PATH, csv_files=CSV_FILES, table_names=TABLE_NAMES):
-    """Import CSV files into SQLite tables."""
+    @functools.wraps(build)
+    def wrapper():
+        nonlocal memo
+        # Read the version before the rows: a value built from newer rows is only rebuilt once more.
+        version = get_data_version()
+        current = memo
+        if current is not None and current[0] == version:
+            return current[1]
+        with lock:
+            if memo is None or memo[0] != version:
+                memo = (version, build(memo and memo[1]))
+            return memo[1]
+
+    return wrapper
+
+def read_fact_rows(query, since=None):
+    """Run query over the fact table in one read snapshot, with the state of the data it read.
+
+    query holds a {where} placeholder for a condition on f.LineNumber. since is
+    the state returned by an earlier call: while the same database file is
+    published, only the rows appended after it are read. Returns (state, rows,
+    appended), where state is (database path, data version, fact lines) and
+    appended tells whether rows holds just the appended rows.
+    """
+    path = current_db_path()
+    conn = get_db_connection(path)
+    try:
+        # A read transaction, so the version and line count match the rows read.
+        conn.execute('BEGIN')
+        version, lines = conn.execute('SELECT Version, Lines FROM Data_Version').fetchone()
+        appended = since is not None and since[0] == path and since[2] <= lines
+        with span('sql', query=_query_label(query)):
+            if appended:
+                rows = conn.execute(query.format(where='WHERE f.LineNumber > ?'), (since[2],)).fetchall()
+            else:
+                rows = conn.execute(query.format(where='')).fetchall()
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+    return (path, version, lines), rows, appended
+
+def appended_periods(since, version, db_path=None):
+    """Return the (Year, Month) pairs batches appended between data versions since and version added rows to.
+
+    Returns None unless version was reached from since by appending batches to the database.
+    """
+    conn = sqlite3.connect(db_path or current_db_path())
+    try:
+        chain = conn.execute("SELECT SourceVersion, '[]' FROM Data_Version").fetchall()
+        chain += conn.execute('SELECT Version, Periods FROM Ingest_Log ORDER BY rowid').fetchall()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+    versions = [row[0] for row in chain]
+    if since not in versions or version not in versions:
+        return None
+    start, end = versions.index(since), versions.index(version)
+    if start > end:
+        return None
+    return {tuple(period) for _, periods in chain[start + 1:end + 1] for period in json.loads(periods)}
+
+def _file_stamp(db_path):
+    # Commits in WAL mode land in the -wal file and reach the main file only at checkpoints.
+    stamp = [db_path, os.stat(db_path).st_mtime_ns]
+    try:
+        wal = os.stat(db_path + '-wal')
+        stamp += [wal.st_mtime_ns, wal.st_size]
+    except FileNotFoundError:
+        pass
+    return tuple(stamp)
+
+def get_data_version(db_path=None):
+    """Return the version tag of the data currently loaded in the database."""
+    global _seen_version
+    db_path = db_path or current_db_path()
+    stamp = _file_stamp(db_path)
+    cached = _data_version.get(db_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
     conn = sqlite3.connect(db_path)
-    for csv_file, table_name in zip(csv_files, table_names):
-        df = pd.read_csv(csv_file)
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
+    try:
+        row = conn.execute('SELECT Version FROM Data_Version').fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    conn.close()
+    version = row[0] if row else 'unversioned'
+    _data_version[db_path] = (stamp, version)
+    with _version_lock:
+        changed = _seen_version is not None and version != _seen_version
+        _seen_version = version
+    if changed:
+        for listener in _version_listeners:
+            listener(version)
+    return version
+
+def get_source_version(db_path=None):
+    """Return the version of the CSV files the database was last fully built from, or None."""
+    try:
+        db_path = db_path or current_db_path()
+    except FileNotFoundError:
+        return None
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute('SELECT SourceVersion FROM Data_Version').fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    conn.close()
+    return row[0] if row else None
+
+def create_tables(conn):
+    """Create the empty STRICT tables of TABLE_SCHEMAS, with the fact table clustered on FACT_KEY."""
+    for table, columns in TABLE_SCHEMAS.items():
+        options = 'STRICT, WITHOUT ROWID' if table == FACT_TABLE else 'STRICT'
+        conn.execute(f'CREATE TABLE {table} ({columns}) {options}')
+
+def add_lookup_values(conn, source):
+    """Add the IDs and statuses in source, a table with the fact CSV's columns, to their lookup tables."""
+    for column, (table, _) in ENCODED_COLUMNS.items():
+        conn.execute(
+            f'INSERT OR IGNORE INTO {table} ({column}) '
+            f'SELECT DISTINCT {column} FROM {source} WHERE {column} IS NOT NULL ORDER BY {column}'
+        )
+
+def load_fact_rows(conn, source):
+    """Insert the rows of source, a table with the fact CSV's columns, into the fact table.
+
+    Each row is stored with its Year, Month and DERIVED_FLAGS, and with integer
+    keys in place of its ENCODED_COLUMNS, so a year or month filter reads one
+    stretch of the clustered table and no query compares repeated strings.
+    Rows are numbered in source's rowid order.
+    """
+    add_lookup_values(conn, source)
+    conn.execute(f'INSERT INTO {FACT_TABLE} ' + FACT_SELECT.format(source=source), (0,))
+
+def build_aggregates(conn):
+    """Index the fact table's dimension keys and rebuild the monthly per-SKU aggregate from it."""
+    for key in DIMENSION_KEYS.values():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_fact_{key} ON {FACT_TABLE} ({key})')
+    # Lets read_fact_rows find the rows appended since a line count without scanning the table.
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_fact_LineNumber ON {FACT_TABLE} (LineNumber)')
+    conn.execute(f'DROP TABLE IF EXISTS {AGGREGATE_TABLE}')
+    conn.execute(f'CREATE TABLE {AGGREGATE_TABLE} ({AGGREGATE_SCHEMA}) STRICT, WITHOUT ROWID')
+    conn.execute(f'INSERT INTO {AGGREGATE_TABLE} ' + AGGREGATE_SELECT.format(source=FACT_TABLE))
+
+def publish_database(path, pointer=CURRENT_POINTER):
+    """Point new connections at the database file at path, then delete files superseded long enough ago.
+
+    Requests already reading the previous file finish on it: SQLite keeps an
+    open file readable after it is unlinked.
+    """
+    tmp = f'{pointer}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(os.path.basename(path))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer)
+    data_dir = os.path.dirname(pointer)
+    old = sorted(
+        (p for p in glob.glob(os.path.join(data_dir, 'inventory-*.db')) if p != path),
+        key=os.path.getmtime, reverse=True,
+    )
+    for stale in old[KEEP_OLD_DATABASES:]:
+        for name in (stale, stale + '-wal', stale + '-shm'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(name)
+
+def import_csvs_to_sqlite(data_dir=DATA_DIR, csv_files=CSV_FILES, table_names=TABLE_NAMES, force=False):
+    """Build a database from the CSV files and publish it, unless the published one was built from them.
+
+    The new file is built beside the published one and swapped in through the
+    CURRENT pointer, so running workers keep serving while it is built and
+    switch over on their next query. Batches appended to the published file by
+    ingest_utils are replayed onto the new one. If one no longer applies to the
+    CSV files, nothing is published and ValueError lists it; force drops such
+    batches with a warning instead. Returns True if a new database was published.
+    """
+    version = compute_data_version(csv_files)
+    pointer = os.path.join(data_dir, 'CURRENT')
+    published = current_db_path(pointer) if os.path.exists(pointer) else None
+    if not force and published and get_source_version(published) == version:
+        return False
+    import pandas as pd
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'inventory-{version}-{time.time_ns()}.db')
+    building = path + '.building'
+    conn = sqlite3.connect(building)
+    try:
+        # pandas loads each CSV into an untyped staging table, which fills the STRICT one.
+        for csv_file, table_name in zip(csv_files, table_names):
+            pd.read_csv(csv_file).to_sql(f'{table_name}_csv', conn, index=False)
+        create_tables(conn)
+        for table_name in table_names:
+            if table_name != FACT_TABLE:
+                conn.execute(f'INSERT INTO {table_name} SELECT * FROM {table_name}_csv')
+        load_fact_rows(conn, f'{FACT_TABLE}_csv')
+        for table_name in table_names:
+            conn.execute(f'DROP TABLE {table_name}_csv')
+        build_aggregates(conn)
+        conn.execute(
+            f'INSERT INTO Data_Version SELECT ?, ?, COALESCE(MAX(LineNumber), 0) FROM {FACT_TABLE}', (version, version)
+        )
+        conn.commit()
+        # Drop the staging tables' free pages from the file.
+        conn.execute('VACUUM')
+        # WAL lets appends commit while dashboards read; the mode is stored in the file.
+        conn.execute('PRAGMA journal_mode=WAL')
+    except BaseException:
+        conn.close()
+        os.remove(building)
+        raise
     conn.close()
+    if published and os.path.exists(published):
+        from ingest_utils import replay_batches
+        try:
+            dropped = replay_batches(published, building, keep_going=force)
+        except BaseException as e:
+            for name in (building, building + '-wal', building + '-shm'):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(name)
+            if isinstance(e, ValueError):
+                raise ValueError(
+                    f'{published} holds ingested batches that do not apply to the new database; '
+                    f'nothing was published. Rebuild with `python db_utils.py --force` to drop them.\n{e}'
+                ) from None
+            raise
+        for problem in dropped:
+            warnings.warn(f'ingested rows not carried over to the rebuilt database: {problem}')
+    os.replace(building, path)
+    publish_database(path, pointer)
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the dashboard database from the CSV files and publish it.')
+    parser.add_argument(
+        '--force', action='store_true',
+        help='rebuild even if the CSV files are unchanged, dropping ingested batches that no longer apply',
+    )
+    args = parser.parse_args()
+    try:
+        published = import_csvs_to_sqlite(force=args.force)
+    except ValueError as e:
+        sys.exit(str(e))
+    if published:
+        print(f'Published data version {get_data_version()} as {current_db_path()}')
+    else:
+        print(f'CSV files unchanged; still serving {current_db_path()}')
+
+if __name__ == '__main__':
+    main()
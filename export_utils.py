@@ -0,0 +1,197 @@
+import csv
+import importlib.util
+import io
+
+from db_utils import DERIVED_FLAGS, FACT_KEY, FACT_TABLE, get_data_version, get_db_connection, in_filter
+from profile_utils import ADMIN_TOKEN, is_authorized
+from range_utils import to_period
+from trace_utils import span
+
+EXPORT_URL = '/export/fact-rows'
+# Rows fetched from the cursor and written out at a time. An export holds one batch in
+# memory however many rows match; each batch is one Parquet row group.
+EXPORT_BATCH_ROWS = 10000
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+# Columns of an exported row, with the expression and type of each: the fact row with
+# its keys decoded through the dimension and lookup tables.
+EXPORT_COLUMNS = {
+    'JobRequestID': ('j.JobRequestID', str),
+    'Year': ('f.Year', int),
+    'Month': ('f.Month', int),
+    'Category': ('i.Category', str),
+    'SKU': ('i.SKU', str),
+    'ObsoleteFlag': ('i.ObsoleteFlag', int),
+    'Section': ('s.Section', str),
+    'RequestedQty': ('f.RequestedQty', float),
+    'IssuedQty': ('f.IssuedQty', int),
+    'StockOnHand': ('f.StockOnHand', int),
+    'ForecastQty': ('f.ForecastQty', int),
+    'IsStockout': ('f.IsStockout', int),
+    'FulfillmentStatus': ('fs.FulfillmentStatus', str),
+    'ForecastError_Demand': ('f.ForecastError_Demand', float),
+    'ForecastError_Supply': ('f.ForecastError_Supply', int),
+    **{name: (f'f.{name}', int) for name in DERIVED_FLAGS},
+}
+# Query parameters an export is filtered by, as the dashboard dropdowns filter: the column
+# each restricts and the type of its values. Repeat a parameter to accept several values;
+# "all" or leaving it out accepts every value. Categories match case-insensitively.
+EXPORT_FILTERS = {
+    'year': ('f.Year', int),
+    'month': ('f.Month', int),
+    'category': ('LOWER(i.Category)', str.lower),
+    'sku': ('i.SKU', str),
+    'section': ('s.Section', str),
+    'stockout': ('f.IsStockout', int),
+}
+# Rows come out in the fact table's stored order, so the cursor streams them without a sort.
+EXPORT_SELECT = f'''
+    SELECT {', '.join(expression for expression, _ in EXPORT_COLUMNS.values())}
+    FROM {FACT_TABLE} f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    JOIN Section_Dimension s ON f.SectionKey = s.SectionKey
+    JOIN Job_Request_Dimension j ON f.JobRequestKey = j.JobRequestKey
+    JOIN Fulfillment_Status_Dimension fs ON f.FulfillmentStatusKey = fs.FulfillmentStatusKey
+    WHERE 1=1{{filters}}
+    ORDER BY {', '.join(f'f.{key}' for key in FACT_KEY)}
+'''
+
+
+def parse_export_filters(args):
+    """Return {parameter: values or None} from a request's query arguments.
+
+    from and to bound the months as YYYY-MM, like the range sliders. Raises
+    ValueError naming the parameter when a value does not parse.
+    """
+    filters = {}
+    for name, (_, kind) in EXPORT_FILTERS.items():
+        values = [value for value in args.getlist(name) if value != 'all']
+        try:
+            filters[name] = [kind(value) for value in values] or None
+        except ValueError:
+            raise ValueError(f'{name}: expected {kind.__name__} values, got {values}') from None
+    for name in ('from', 'to'):
+        value = args.get(name)
+        filters[name] = _parse_month(name, value) if value else None
+    return filters
+
+
+def _parse_month(name, value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise ValueError(f'{name}: expected YYYY-MM, got {value!r}') from None
+    # to_period would carry month 13 into the next year and month 0 into the previous one.
+    if not 1 <= month <= 12:
+        raise ValueError(f'{name}: month must be 01 to 12, got {value!r}')
+    return to_period(year, month)
+
+
+def export_query(conn, filters):
+    """Return EXPORT_SELECT restricted to filters, and its params."""
+    clauses, params = [], []
+    for name, (column, _) in EXPORT_FILTERS.items():
+        if filters.get(name):
+            clause, clause_params = in_filter(conn, column, filters[name])
+            clauses.append(clause)
+            params.extend(clause_params)
+    for name, op in (('from', '>='), ('to', '<=')):
+        if filters.get(name) is not None:
+            clauses.append(f' AND f.Year * 12 + f.Month - 1 {op} ?')
+            params.append(filters[name])
+    return EXPORT_SELECT.format(filters=''.join(clauses)), params
+
+
+def iter_export_batches(filters, db_path=None):
+    """Yield the matching rows in lists of up to EXPORT_BATCH_ROWS, read from one open cursor.
+
+    The cursor is a single statement, so a long export reads one consistent
+    snapshot even while batches are appended.
+    """
+    conn = get_db_connection(db_path)
+    try:
+        query, params = export_query(conn, filters)
+        cursor = conn.execute(query, params)
+        while True:
+            with span('sql', query=f'export batch of {EXPORT_BATCH_ROWS}'):
+                rows = cursor.fetchmany(EXPORT_BATCH_ROWS)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def _drain(buffer):
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def csv_chunks(batches):
+    """Yield a header line, then each batch of rows as CSV bytes."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_COLUMNS)
+    yield _drain(buffer).encode('utf-8')
+    for rows in batches:
+        writer.writerows(rows)
+        yield _drain(buffer).encode('utf-8')
+
+
+def parquet_chunks(batches):
+    """Yield a Parquet file in pieces, one row group per batch. Needs pyarrow."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, (_, kind) in EXPORT_COLUMNS.items()])
+    buffer = io.BytesIO()
+    writer = pq.ParquetWriter(buffer, schema)
+    try:
+        for rows in batches:
+            columns = zip(*rows)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+            yield _drain(buffer)
+    finally:
+        writer.close()
+    yield _drain(buffer)
+
+
+def register_export(server, token=ADMIN_TOKEN):
+    """Add the admin route that downloads the fact rows behind the dashboards.
+
+    GET /export/fact-rows?format=csv&year=2022&category=Buildings&stockout=1
+    streams every matching fact row, joined with its item, section, job request
+    and fulfillment status, as CSV (the default) or Parquet. Filters follow
+    EXPORT_FILTERS, plus from=YYYY-MM and to=YYYY-MM for a month range. Rows
+    are sent as the cursor yields them, so memory use does not grow with the
+    export and the first bytes go out at once; the request holds a worker
+    thread until the last row is sent. An export can hold that thread for the
+    whole fact history, so like the other admin routes it needs the admin token.
+    """
+    from flask import Response, abort, request
+
+    @server.route(EXPORT_URL)
+    def export_fact_rows():
+        if not token:
+            abort(404)
+        if not is_authorized(request, token):
+            return Response('Unauthorized\n', 401, {'WWW-Authenticate': 'Bearer'}, mimetype='text/plain')
+        fmt = request.args.get('format', 'csv')
+        if fmt not in EXPORT_MIMETYPES:
+            return Response(f"format: expected one of {', '.join(EXPORT_MIMETYPES)}\n", 400, mimetype='text/plain')
+        try:
+            filters = parse_export_filters(request.args)
+        except ValueError as e:
+            return Response(f'{e}\n', 400, mimetype='text/plain')
+        if fmt == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+            return Response('Parquet export needs pyarrow installed; use format=csv\n', 501, mimetype='text/plain')
+        chunks = csv_chunks if fmt == 'csv' else parquet_chunks
+        filename = f'fact-rows-{get_data_version()}.{fmt}'
+        return Response(
+            chunks(iter_export_batches(filters)),
+            mimetype=EXPORT_MIMETYPES[fmt],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+        )
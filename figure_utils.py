@@ -0,0 +1,58 @@
+import logging
+import os
+
+from trace_utils import current_trace, traced
+
+# Largest number of series or slices a figure may carry before the rest are folded into "Other".
+MAX_FIGURE_SERIES = int(os.environ.get('DASHBOARD_MAX_SERIES', 10))
+OTHER_LABEL = "Other"
+
+logger = logging.getLogger(__name__)
+
+# Size in bytes of the last uncompressed callback response for each output, e.g. 'consumption-rate-chart.figure'.
+payload_sizes = {}
+
+
+@traced('pandas')
+def top_n_with_other(df, label, value, n=None, by=None, other_label=OTHER_LABEL):
+    """Keep the n labels with the largest total value and fold the rest into one other_label row.
+
+    When by is given, the folded rows are summed per by-group, so a bar chart keeps
+    one "Other" segment per bar. Columns outside label, value and by are dropped
+    from the folded rows.
+    """
+    import pandas as pd
+    n = MAX_FIGURE_SERIES if n is None else n
+    if df.empty or df[label].nunique() <= n:
+        return df
+    totals = df.groupby(label, sort=False)[value].sum()
+    keep = totals.nlargest(n).index
+    mask = df[label].isin(keep).to_numpy()
+    rest = df.loc[~mask]
+    if by:
+        other = rest.groupby(by, as_index=False, sort=False)[value].sum()
+    else:
+        other = pd.DataFrame({value: [rest[value].sum()]})
+    other[label] = other_label
+    return pd.concat([df.loc[mask], other], ignore_index=True)
+
+
+def record_payload_size(response):
+    """Record the size of a callback response body Dash has already serialized."""
+    from flask import request
+    if request.path != '/_dash-update-component' or response.status_code != 200 or response.is_streamed:
+        return response
+    body = request.get_json(silent=True) or {}
+    name = body.get('output', '?').strip('.').split('...')[0]
+    size = len(response.get_data())
+    payload_sizes[name] = size
+    trace = current_trace()
+    if trace is not None:
+        trace.attrs['bytes'] = size
+    logger.debug("callback %s payload: %d bytes", name, size)
+    return response
+
+
+def register_payload_sizes(server):
+    """Measure callback responses before register_compression shrinks them; register after it."""
+    server.after_request(record_payload_size)
@@ -0,0 +1,54 @@
+# Production settings, picked up automatically by `gunicorn app:server` from the repository root.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Load the app once in the master: the CSV import, asset build and cache warm-up
+# run a single time and every worker is forked from the warmed process.
+preload_app = True
+
+# Threads let one worker keep serving while a slow callback waits on SQLite or the cache.
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", max(2, multiprocessing.cpu_count())))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Browsers fire several callbacks per interaction; keep their connections open between them.
+keepalive = 5
+timeout = 120
+graceful_timeout = 30
+
+# Recycle workers now and then, staggered so they do not all restart together.
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG")
+
+
+def when_ready(server):
+    import app
+    app.warm_up()
+    server.log.info("Caches warmed, forking %s workers x %s threads", workers, threads)
+
+
+def on_reload(server):
+    # SIGHUP: reload the CSVs and rebuild the assets in the master, so re-forked workers
+    # start from the new data version and a warm cache. New data alone needs no
+    # restart: `python db_utils.py` publishes it and running workers switch over.
+    import app
+    from asset_utils import build_assets
+    from db_utils import import_csvs_to_sqlite
+    reloaded = import_csvs_to_sqlite()
+    build_assets()
+    app.warm_up()
+    server.log.info("Reloaded data and rebuilt caches" if reloaded else "Data unchanged; rebuilt caches")
+
+
+def post_fork(server, worker):
+    # The worker has no threads yet: fork its background job launcher now.
+    import app
+    app.background_manager.start_job_launcher()
+    # In-process cache tables are reset by cache_utils' at-fork hook; confirm the
+    # data version this worker will key the shared cache with.
+    from db_utils import get_data_version
+    server.log.info("Worker %s serving data version %s", worker.pid, get_data_version())
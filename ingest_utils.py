@@ -0,0 +1,277 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+
+from db_utils import (
+    AGGREGATE_MEASURES, AGGREGATE_SELECT, AGGREGATE_TABLE, DIMENSION_KEYS, FACT_SELECT, FACT_TABLE,
+    add_lookup_values, current_db_path, get_data_version, in_filter, query_column,
+)
+from profile_utils import ADMIN_TOKEN, is_authorized
+
+INGEST_URL = '/_admin/ingest'
+# Fact table columns a batch supplies, with the type each value is converted to.
+# Year, Month, the derived flags and the ID and status keys are filled in from the dimensions.
+FACT_COLUMNS = [
+    ('JobRequestID', str),
+    ('ItemKey', int),
+    ('SectionKey', int),
+    ('DateKey', int),
+    ('RequestedQty', float),
+    ('IssuedQty', int),
+    ('StockOnHand', int),
+    ('ForecastQty', int),
+    ('IsStockout', int),
+    ('FulfillmentStatus', str),
+    ('ForecastError_Demand', float),
+    ('ForecastError_Supply', int),
+]
+# Left empty for some rows of the source CSV.
+NULLABLE_COLUMNS = {'RequestedQty', 'ForecastError_Demand'}
+JSONL_MIMETYPES = ('application/jsonl', 'application/x-ndjson', 'application/x-jsonlines')
+MAX_BATCH_BYTES = 32 * 1024 * 1024
+# Validation errors listed in a rejection, so a bad file does not produce a wall of text.
+MAX_REPORTED_ERRORS = 20
+
+
+def parse_batch(text, fmt='csv'):
+    """Parse a batch of fact rows from CSV text with a header line, or from JSON lines."""
+    if fmt == 'jsonl':
+        rows = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                try:
+                    rows.append(json.loads(line))
+                except ValueError as e:
+                    raise ValueError(f'line {number}: {e}') from None
+        return rows
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def read_batch(path):
+    """Parse the batch file at path; .jsonl and .ndjson files are JSON lines, anything else CSV."""
+    fmt = 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson') else 'csv'
+    with open(path, encoding='utf-8', newline='') as f:
+        return parse_batch(f.read(), fmt)
+
+
+def _convert(value, kind):
+    if value is None or value == '':
+        return None
+    if kind is str:
+        return str(value)
+    if isinstance(value, str):
+        value = kind(value.strip())
+    elif isinstance(value, bool) or (kind is int and value != int(value)):
+        raise ValueError(f'{value!r} is not {kind.__name__}')
+    # JSON Infinity and NaN, or "inf" and "nan" in a CSV, would be stored as-is or as NULL.
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f'{value!r} is not finite')
+    return kind(value)
+
+
+def validate_rows(rows):
+    """Convert parsed rows to fact table tuples, raising ValueError that lists what is wrong."""
+    names = [name for name, _ in FACT_COLUMNS]
+    errors = []
+    values = []
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            errors.append(f'row {number}: expected an object with the fact table columns')
+            continue
+        missing = [name for name in names if name not in row]
+        unknown = [name for name in row if name not in names]
+        if missing or unknown:
+            errors.append(f'row {number}: missing {missing}, unknown {unknown}')
+            continue
+        converted = []
+        for name, kind in FACT_COLUMNS:
+            try:
+                value = _convert(row[name], kind)
+            except (TypeError, ValueError, OverflowError):
+                errors.append(f'row {number}: {name} {row[name]!r} is not a finite {kind.__name__}')
+                break
+            if value is None and name not in NULLABLE_COLUMNS:
+                errors.append(f'row {number}: {name} is empty')
+                break
+            converted.append(value)
+        else:
+            if converted[names.index('IsStockout')] not in (0, 1):
+                errors.append(f'row {number}: IsStockout must be 0 or 1')
+            else:
+                values.append(tuple(converted))
+    if not rows:
+        errors.append('the batch has no rows')
+    if errors:
+        raise ValueError(_error_report(errors))
+    return values
+
+
+def check_foreign_keys(conn, values):
+    """Raise ValueError if a row references a key missing from its dimension table."""
+    names = [name for name, _ in FACT_COLUMNS]
+    errors = []
+    for table, key in DIMENSION_KEYS.items():
+        keys = {row[names.index(key)] for row in values}
+        fragment, params = in_filter(conn, key, keys)
+        found = set(query_column(f'SELECT {key} FROM {table} WHERE 1=1' + fragment, params, conn))
+        errors += [f'{key} {missing} is not in {table}' for missing in sorted(keys - found)]
+    if errors:
+        raise ValueError(_error_report(errors))
+
+
+def _error_report(errors):
+    more = len(errors) - MAX_REPORTED_ERRORS
+    return '\n'.join(errors[:MAX_REPORTED_ERRORS] + ([f'... and {more} more'] if more > 0 else []))
+
+
+def append_fact_rows(rows, db_path=None):
+    """Append a batch of fact rows and fold them into the aggregate, all in one transaction.
+
+    The work is proportional to the batch: the aggregate is updated from the new
+    rows alone, and SQLite maintains the indexes as they are inserted. The data
+    version moves on; cached results that read none of the batch's months are
+    carried over to it, the rest are recomputed. A batch identical to one already
+    ingested is skipped.
+    Returns a dict with the batch id, rows inserted and the new data version.
+    """
+    return append_values(validate_rows(rows), db_path)
+
+
+def append_values(values, db_path=None, ingested_at=None):
+    """Append validated fact table tuples as one batch; see append_fact_rows.
+
+    The batch is kept in Ingest_Log, so a database rebuilt from the CSV files
+    can replay it with replay_batches.
+    """
+    db_path = db_path or current_db_path()
+    batch = json.dumps(values)
+    batch_id = hashlib.sha1(batch.encode('utf-8')).hexdigest()[:16]
+    columns = ', '.join(name for name, _ in FACT_COLUMNS)
+    placeholders = ', '.join(['?'] * len(FACT_COLUMNS))
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT 1 FROM Ingest_Log WHERE BatchId = ?', (batch_id,)).fetchone():
+                conn.execute('ROLLBACK')
+                return {'batch': batch_id, 'inserted': 0, 'version': get_data_version(db_path)}
+            check_foreign_keys(conn, values)
+            conn.execute(f'CREATE TEMP TABLE ingest_batch ({columns})')
+            conn.executemany(f'INSERT INTO temp.ingest_batch ({columns}) VALUES ({placeholders})', values)
+            add_lookup_values(conn, 'temp.ingest_batch')
+            previous, loaded = conn.execute('SELECT Version, Lines FROM Data_Version').fetchone()
+            conn.execute('CREATE TEMP TABLE ingest_rows AS ' + FACT_SELECT.format(source='temp.ingest_batch'), (loaded,))
+            conn.execute(
+                f'INSERT INTO {AGGREGATE_TABLE} '
+                + AGGREGATE_SELECT.format(source='temp.ingest_rows')
+                + ' ON CONFLICT (Year, Month, Category, SKU) DO UPDATE SET '
+                + ', '.join(f'{column} = {column} + excluded.{column}' for column in AGGREGATE_MEASURES)
+            )
+            conn.execute(f'INSERT INTO {FACT_TABLE} SELECT * FROM temp.ingest_rows')
+            periods = conn.execute('SELECT DISTINCT Year, Month FROM temp.ingest_rows ORDER BY Year, Month').fetchall()
+            version = hashlib.sha1(f'{previous}:{batch_id}'.encode('utf-8')).hexdigest()[:16]
+            conn.execute('UPDATE Data_Version SET Version = ?, Lines = Lines + ?', (version, len(values)))
+            conn.execute(
+                'INSERT INTO Ingest_Log VALUES (?, ?, ?, ?, ?, ?)',
+                (batch_id, len(values), ingested_at or time.time(), version, batch, json.dumps(periods)),
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    return {'batch': batch_id, 'inserted': len(values), 'version': version}
+
+
+def logged_batches(db_path):
+    """Return (batch id, ingested at, rows as JSON) for each batch ingested into db_path, oldest first.
+
+    Raises ValueError if the database holds batches whose rows were not kept.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        logged = conn.execute('SELECT COUNT(*) FROM Ingest_Log').fetchone()[0]
+        if not logged:
+            return []
+        try:
+            return conn.execute('SELECT BatchId, IngestedAt, Batch FROM Ingest_Log ORDER BY rowid').fetchall()
+        except sqlite3.OperationalError:
+            # Logged by older code, which kept only each batch's hash.
+            raise ValueError(f'{logged} ingested batches were logged without their rows and cannot be replayed') from None
+    finally:
+        conn.close()
+
+
+def replay_batches(source_path, db_path, keep_going=False):
+    """Append the batches ingested into the database at source_path to the one at db_path, in order.
+
+    Raises ValueError listing the batches that no longer apply, for example
+    because the CSV files dropped a key they reference; with keep_going those
+    are skipped instead. Returns the list of problems skipped.
+    """
+    try:
+        batches = logged_batches(source_path)
+    except ValueError as e:
+        if not keep_going:
+            raise
+        return [str(e)]
+    errors = []
+    for batch_id, ingested_at, batch in batches:
+        try:
+            append_values([tuple(row) for row in json.loads(batch)], db_path, ingested_at)
+        except ValueError as e:
+            errors.append(f'batch {batch_id}: ' + str(e).replace('\n', '; '))
+    if errors and not keep_going:
+        raise ValueError(_error_report(errors))
+    return errors
+
+
+def register_ingest(server, token=ADMIN_TOKEN):
+    """Add the admin route that appends a batch of fact rows to the Flask server.
+
+    POST /_admin/ingest with a CSV body (header line included), or JSON lines
+    sent as application/jsonl or application/x-ndjson. Answers 400 listing the
+    problems when the batch is rejected; nothing is written in that case.
+    """
+    from flask import Response, abort, jsonify, request
+
+    @server.route(INGEST_URL, methods=['POST'])
+    def ingest():
+        if not token:
+            abort(404)
+        if not is_authorized(request, token):
+            return Response('Unauthorized\n', 401, {'WWW-Authenticate': 'Bearer'}, mimetype='text/plain')
+        if (request.content_length or 0) > MAX_BATCH_BYTES:
+            abort(413)
+        fmt = 'jsonl' if request.mimetype in JSONL_MIMETYPES else 'csv'
+        try:
+            result = append_fact_rows(parse_batch(request.get_data(as_text=True), fmt))
+        except ValueError as e:
+            return Response(f'{e}\n', 400, mimetype='text/plain')
+        return jsonify(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Append batches of job request rows to the dashboard database.')
+    parser.add_argument('files', nargs='+', help='CSV files with a header line, or .jsonl files; one batch each')
+    parser.add_argument('--db', help='database file to append to (default: the published one)')
+    args = parser.parse_args()
+    for path in args.files:
+        try:
+            result = append_fact_rows(read_batch(path), args.db)
+        except ValueError as e:
+            sys.exit(f'{path}: rejected\n{e}')
+        print(f"{path}: {result['inserted']} rows appended, data version {result['version']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
+from asset_utils import responsive_image
 
 dash.register_page(__name__, path="/about", name="About")
 
@@ -9,7 +10,7 @@ header = dbc.Navbar(
     dbc.Container([
         dbc.NavbarBrand(
             html.Div([
-                html.Img(src="/assets/upmo.png", height="40px", style={"marginRight": "12px"}),
+                responsive_image("upmo.png", sizes="40px", height="40px", style={"marginRight": "12px"}),
                 html.Span("UPMO Intelligence", className="fw-bold fs-3")
             ], style={"display": "flex", "alignItems": "center"})
         ),
@@ -26,16 +27,16 @@ header = dbc.Navbar(
 )
 
 profiles = [
-	{"name": "Evangelista, Cathleen Eren", "email": "cmevangelista@up.edu.ph", "img": "/assets/profile/evangelista.jpg"},
-	{"name": "Faustino, Mikaela Jessica", "email": "mhfaustino@up.edu.ph", "img": "/assets/profile/faustino.jpg"},
-	{"name": "Manese, Reign Micaella", "email": "rdmanese@up.edu.ph", "img": "/assets/profile/manese.jpg"},
-	{"name": "Puerto, Atasha Brianne", "email": "abpuerto@up.edu.ph", "img": "/assets/profile/puerto.jpg"},
+	{"name": "Evangelista, Cathleen Eren", "email": "cmevangelista@up.edu.ph", "img": "profile/evangelista.jpg"},
+	{"name": "Faustino, Mikaela Jessica", "email": "mhfaustino@up.edu.ph", "img": "profile/faustino.jpg"},
+	{"name": "Manese, Reign Micaella", "email": "rdmanese@up.edu.ph", "img": "profile/manese.jpg"},
+	{"name": "Puerto, Atasha Brianne", "email": "abpuerto@up.edu.ph", "img": "profile/puerto.jpg"},
 ]
 
 profile_cards = dbc.Row([
 	dbc.Col(
 		dbc.Card([
-			dbc.CardImg(src=profile["img"], top=True, style={"height": "260px", "objectFit": "cover"}),
+			responsive_image(profile["img"], sizes="260px", className="card-img-top", style={"height": "260px", "objectFit": "cover"}),
 			dbc.CardBody([
 				html.Div([
 					html.H5(profile["name"].split(",")[0] + ",", className="fw-bold mb-1 text-center"),
@@ -53,7 +54,7 @@ layout = html.Div([
 	dbc.Container([
 		html.H2("About", className="fw-bold mb-2"),
 		html.Div([
-			html.Img(src="/assets/upmo.png", style={"height": "140px", "marginBottom": "20px"}),
+			responsive_image("upmo.png", sizes="140px", style={"height": "140px", "marginBottom": "20px"}),
 			html.P(
 				"The University Planning and Maintenance Office (UPMO) is University of the Philippines Los Banos’s lead unit for campus development and facility upkeep. We ensure that the university’s physical environment remains safe, functional, and conducive to learning by overseeing infrastructure planning, building maintenance, utilities management, and the preservation of campus spaces. Through efficient services and long-term development initiatives, UPMO supports UPLB’s mission by providing a well-maintained and sustainable campus for the entire community.",
 				className="mb-4 text-center",
@@ -86,8 +87,8 @@ layout = html.Div([
                 ], md=8),
                 dbc.Col([
                     html.Div([
-                        html.Img(src="/assets/UPLB.png", height="120px", style={"marginRight": "16px"}),
-                        html.Img(src="/assets/upmo.png", height="120px"),
+                        responsive_image("UPLB.png", sizes="120px", height="120px", style={"marginRight": "16px"}),
+                        responsive_image("upmo.png", sizes="120px", height="120px"),
                     ], style={"display": "flex", "justifyContent": "flex-end", "alignItems": "center", "height": "100%"})
                 ], md=4)
             ], className="py-4")
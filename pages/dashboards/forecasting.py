@@ -1,26 +1,27 @@
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
 from dash import Input, Output, callback
-from db_utils import get_db_connection
+from db_utils import get_db_connection, borrow_connection, query_column, query_one, read_sql_query
+from cache_utils import cached, cached_figure, data_context
+from background_utils import background_callback, report_progress
+from asset_utils import responsive_image
+from trace_utils import span, traced
 
 dash.register_page(__name__, path="/forecasting", name="Forecast Trend")
 
+@cached(periods=())
 def get_sku_options(category=None):
-    conn = get_db_connection()
     if category and category != "all":
         query = "SELECT SKU FROM Item_Dimension WHERE LOWER(Category) = ? ORDER BY SKU"
-        df = pd.read_sql_query(query, conn, params=[category.lower()])
+        skus = query_column(query, [category.lower()])
     else:
         query = "SELECT SKU FROM Item_Dimension ORDER BY SKU"
-        df = pd.read_sql_query(query, conn)
-    conn.close()
-    options = [{"label": sku, "value": sku} for sku in df["SKU"].unique()]
+        skus = query_column(query)
+    options = [{"label": sku, "value": sku} for sku in dict.fromkeys(skus)]
     return [{"label": "All SKUs", "value": "all"}] + options
-def get_mae_me_data(year=None, month=None, category=None, sku=None):
-    conn = get_db_connection()
+def get_mae_me_data(year=None, month=None, category=None, sku=None, conn=None):
+    """Return (Mean_Absolute_Error, Mean_Error) for one filter state."""
     query = '''
     WITH MaxYear AS (
         SELECT MAX(Year) AS Max_Year FROM Date_Dimension
@@ -29,19 +30,18 @@ def get_mae_me_data(year=None, month=None, category=None, sku=None):
         AVG(ABS(T1.ForecastError_Demand)) AS Mean_Absolute_Error,
         AVG(T1.ForecastError_Demand) AS Mean_Error
     FROM Job_Request_Fact_Table AS T1
-    INNER JOIN Date_Dimension AS T2 ON T1.DateKey = T2.DateKey
     CROSS JOIN MaxYear AS M
     INNER JOIN Item_Dimension AS I ON T1.ItemKey = I.ItemKey
     WHERE 1=1
     '''
     params = []
     if year:
-        query += ' AND T2.Year = ?'
+        query += ' AND T1.Year = ?'
         params.append(year)
     else:
-        query += ' AND T2.Year = M.Max_Year - 1'
+        query += ' AND T1.Year = M.Max_Year - 1'
     if month and month != "all":
-        query += ' AND T2.Month = ?'
+        query += ' AND T1.Month = ?'
         params.append(month)
     if category and category != "all":
         query += ' AND LOWER(I.Category) = ?'
@@ -49,12 +49,10 @@ def get_mae_me_data(year=None, month=None, category=None, sku=None):
     if sku and sku != "all":
         query += ' AND I.SKU = ?'
         params.append(sku)
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+    return query_one(query, params, conn)
 
-def get_qty_data(year=None, month=None, category=None, sku=None):
-    conn = get_db_connection()
+def get_qty_data(year=None, month=None, category=None, sku=None, conn=None):
+    """Return (Total_ForecastQty, Total_RequestedQty) for one filter state."""
     query = '''
     WITH MaxYear AS (
         SELECT MAX(Year) AS Max_Year FROM Date_Dimension
@@ -63,19 +61,18 @@ def get_qty_data(year=None, month=None, category=None, sku=None):
         SUM(T1.ForecastQty) AS Total_ForecastQty,
         SUM(T1.RequestedQty) AS Total_RequestedQty
     FROM Job_Request_Fact_Table AS T1
-    INNER JOIN Date_Dimension AS T2 ON T1.DateKey = T2.DateKey
     CROSS JOIN MaxYear AS M
     INNER JOIN Item_Dimension AS I ON T1.ItemKey = I.ItemKey
     WHERE 1=1
     '''
     params = []
     if year:
-        query += ' AND T2.Year = ?'
+        query += ' AND T1.Year = ?'
         params.append(year)
     else:
-        query += ' AND T2.Year = M.Max_Year - 1'
+        query += ' AND T1.Year = M.Max_Year - 1'
     if month and month != "all":
-        query += ' AND T2.Month = ?'
+        query += ' AND T1.Month = ?'
         params.append(month)
     if category and category != "all":
         query += ' AND LOWER(I.Category) = ?'
@@ -83,15 +80,22 @@ def get_qty_data(year=None, month=None, category=None, sku=None):
     if sku and sku != "all":
         query += ' AND I.SKU = ?'
         params.append(sku)
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+    return query_one(query, params, conn)
+
+@data_context(periods=('year', 'month'))
+def load_forecast_accuracy_data(year=None, month=None, category=None, sku=None):
+    """Fetch the forecast error and quantity datasets for one filter state over one connection."""
+    with borrow_connection() as conn:
+        return {
+            "error": get_mae_me_data(year, month, category, sku, conn),
+            "qty": get_qty_data(year, month, category, sku, conn),
+        }
 
 header = dbc.Navbar(
     dbc.Container([
         dbc.NavbarBrand(
             html.Div([
-                html.Img(src="/assets/upmo.png", height="40px", style={"marginRight": "12px"}),
+                responsive_image("upmo.png", sizes="40px", height="40px", style={"marginRight": "12px"}),
                 html.Span("UPMO Intelligence", className="fw-bold fs-3")
             ], style={"display": "flex", "alignItems": "center"})
         ),
@@ -107,6 +111,7 @@ header = dbc.Navbar(
     style={"position": "sticky", "top": "0", "zIndex": "1000"}
 )
 
+@cached
 def get_forecast_trend_data(input_year, category="Buildings"):
     conn = get_db_connection()
     prev_year = input_year - 1
@@ -118,17 +123,15 @@ def get_forecast_trend_data(input_year, category="Buildings"):
         ? AS PreviousForecastYear,
         ? AS CurrentForecastYear,
         ? AS FollowingForecastYear,
-        SUM(CASE WHEN D.Year = ? THEN J.ForecastQty ELSE 0 END) AS PreviousYearForecast,
-        SUM(CASE WHEN D.Year = ? THEN J.ForecastQty ELSE 0 END) AS CurrentYearForecast,
-        SUM(CASE WHEN D.Year = ? THEN J.ForecastQty ELSE 0 END) AS FollowingYearForecast
+        SUM(CASE WHEN J.Year = ? THEN J.ForecastQty ELSE 0 END) AS PreviousYearForecast,
+        SUM(CASE WHEN J.Year = ? THEN J.ForecastQty ELSE 0 END) AS CurrentYearForecast,
+        SUM(CASE WHEN J.Year = ? THEN J.ForecastQty ELSE 0 END) AS FollowingYearForecast
     FROM
         Job_Request_Fact_Table AS J
-    JOIN
-        Date_Dimension AS D ON J.DateKey = D.DateKey
     JOIN
         Item_Dimension AS I ON J.ItemKey = I.ItemKey
     WHERE
-        D.Year IN (?, ?, ?)
+        J.Year IN (?, ?, ?)
         AND LOWER(I.Category) = ?
     GROUP BY
         I.Category,
@@ -138,11 +141,13 @@ def get_forecast_trend_data(input_year, category="Buildings"):
         CurrentYearForecast DESC
     '''
     params = [prev_year, input_year, next_year, prev_year, input_year, next_year, prev_year, input_year, next_year, category.lower()]
-    df = pd.read_sql_query(query, conn, params=params)
+    df = read_sql_query(query, conn, params=params)
     conn.close()
     return df
 
+@traced("pandas")
 def prepare_line_chart_data(df, input_year):
+    import pandas as pd
     prev_year = input_year - 1
     next_year = input_year + 1
     rename_map = {
@@ -160,289 +165,311 @@ def prepare_line_chart_data(df, input_year):
     melted["YearType"] = melted["YearType"].map(rename_map)
     return melted
 
-layout = html.Div([
-    header,
-    dbc.Container([
-        dbc.Row([
-            dbc.Col([
-                html.H2("Dashboard", className="fw-bold mb-4 d-inline-block mb-0"),
-            ], md=6),
-            dbc.Col([
-                dbc.ButtonGroup([
-                    dbc.Button("Inventory", href="/inventory", color="primary", disabled=False),
-                    dbc.Button("Forecasting", href="/forecasting", color="primary", disabled=True),
-                    dbc.Button("Operations", href="/operations", color="primary", disabled=False),
-                    dbc.Button("Planning", href="/planning", color="primary", disabled=False),
-                ], size="md"),
-            ], md=6, className="d-flex align-items-center justify-content-end"),
-        ], className="mb-2", style={"paddingTop": "32px"}),
-        html.Div([
+def layout(**kwargs):
+    # Render the default filter state server-side so first paint needs no callback round trips.
+    trend_fig = update_forecast_trend_chart(2022, "buildings")
+    mae_me_fig, qty_fig = update_mae_me_chart(2023, "all", "all", "all")
+    return html.Div([
+        header,
+        dbc.Container([
+            dbc.Row([
+                dbc.Col([
+                    html.H2("Dashboard", className="fw-bold mb-4 d-inline-block mb-0"),
+                ], md=6),
+                dbc.Col([
+                    dbc.ButtonGroup([
+                        dbc.Button("Inventory", href="/inventory", color="primary", disabled=False),
+                        dbc.Button("Forecasting", href="/forecasting", color="primary", disabled=True),
+                        dbc.Button("Operations", href="/operations", color="primary", disabled=False),
+                        dbc.Button("Planning", href="/planning", color="primary", disabled=False),
+                    ], size="md"),
+                ], md=6, className="d-flex align-items-center justify-content-end"),
+            ], className="mb-2", style={"paddingTop": "32px"}),
             html.Div([
-                html.Img(src="/assets/pegaraw.jpg", style={
-                    "width": "100vw",
-                    "height": "440px",
-                    "objectFit": "cover",
-                    "position": "relative",
-                    "left": "50%",
-                    "transform": "translateX(-50%)"
-                }),
-                html.Div(style={
-                    "position": "absolute",
-                    "top": "0",
-                    "left": "0",
-                    "width": "100vw",
-                    "height": "440px",
-                    "background": "rgba(0,0,0,0.65)",
-                    "zIndex": "1"
-                }),
                 html.Div([
-                    html.Div("FORECASTING", style={
-                        "color": "#fff",
-                        "fontSize": "3rem",
-                        "fontWeight": "bold",
-                        "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
-                        "letterSpacing": "0.12em",
-                        "width": "100%",
-                        "marginBottom": "12px",
-                        "display": "flex",
-                        "justifyContent": "center",
-                        "alignItems": "center",
-                        "textAlign": "center"
+                    responsive_image("pegaraw.jpg", sizes="100vw", style={
+                        "width": "100vw",
+                        "height": "440px",
+                        "objectFit": "cover",
+                        "position": "relative",
+                        "left": "50%",
+                        "transform": "translateX(-50%)"
                     }),
-                    html.Hr(style={
-                        "width": "60%",
-                        "borderColor": "#fff",
-                        "opacity": "0.7",
-                        "margin": "12px auto"
+                    html.Div(style={
+                        "position": "absolute",
+                        "top": "0",
+                        "left": "0",
+                        "width": "100vw",
+                        "height": "440px",
+                        "background": "rgba(0,0,0,0.65)",
+                        "zIndex": "1"
                     }),
                     html.Div([
-                        "Analyze historical trends and forecast future demand to optimize resource allocation.", html.Br(),
-                        "This dashboard empowers data-driven planning for UPLB's operational needs."
-                    ],
-                        style={
+                        html.Div("FORECASTING", style={
                             "color": "#fff",
-                            "fontSize": "1.1rem",
-                            "width": "100%",
+                            "fontSize": "3rem",
+                            "fontWeight": "bold",
                             "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
+                            "letterSpacing": "0.12em",
+                            "width": "100%",
+                            "marginBottom": "12px",
                             "display": "flex",
                             "justifyContent": "center",
                             "alignItems": "center",
                             "textAlign": "center"
-                        }
-                    )
+                        }),
+                        html.Hr(style={
+                            "width": "60%",
+                            "borderColor": "#fff",
+                            "opacity": "0.7",
+                            "margin": "12px auto"
+                        }),
+                        html.Div([
+                            "Analyze historical trends and forecast future demand to optimize resource allocation.", html.Br(),
+                            "This dashboard empowers data-driven planning for UPLB's operational needs."
+                        ],
+                            style={
+                                "color": "#fff",
+                                "fontSize": "1.1rem",
+                                "width": "100%",
+                                "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
+                                "display": "flex",
+                                "justifyContent": "center",
+                                "alignItems": "center",
+                                "textAlign": "center"
+                            }
+                        )
+                    ], style={
+                        "position": "absolute",
+                        "top": "0",
+                        "left": "0",
+                        "width": "100vw",
+                        "height": "440px",
+                        "display": "flex",
+                        "flexDirection": "column",
+                        "justifyContent": "center",
+                        "alignItems": "center",
+                        "zIndex": "2"
+                    })
                 ], style={
-                    "position": "absolute",
-                    "top": "0",
-                    "left": "0",
+                    "position": "relative",
                     "width": "100vw",
-                    "height": "440px",
-                    "display": "flex",
-                    "flexDirection": "column",
-                    "justifyContent": "center",
-                    "alignItems": "center",
-                    "zIndex": "2"
-                })
-            ], style={
-                "position": "relative",
-                "width": "100vw",
-                "marginBottom": "8px",
-                "left": "50%",
-                "transform": "translateX(-50%)"
-            }),
-        ]),
-        dbc.Card([
-            dbc.CardBody([
-                dbc.Row([
-                    dbc.Col([
-                        html.H4("Forecast Trend", className="mt-4"),
-                        dbc.Row([
-                            dbc.Col([
-                                html.Label("Filter by Year"),
-                                dcc.Dropdown(
-                                    id="trend-year-dropdown",
-                                    options=[{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022]],
-                                    value=2022,
-                                    placeholder="Select Year"
-                                ),
-                            ], md=6),
-                            dbc.Col([
-                                html.Label("Filter by Category"),
-                                dcc.Dropdown(
-                                    id="trend-category-dropdown",
-                                    options=[{"label": "Buildings", "value": "buildings"}] + [{"label": x, "value": x.lower()} for x in ["Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
-                                    value="buildings",
-                                    placeholder="Select Category"
-                                ),
-                            ], md=6),
-                        ], className="mb-4"),
-                        dbc.Card([
-                            dbc.CardBody([
-                                dcc.Graph(id="forecast-trend-chart", style={"height": "400px"})
+                    "marginBottom": "8px",
+                    "left": "50%",
+                    "transform": "translateX(-50%)"
+                }),
+            ]),
+            dbc.Card([
+                dbc.CardBody([
+                    dbc.Row([
+                        dbc.Col([
+                            html.H4("Forecast Trend", className="mt-4"),
+                            dbc.Row([
+                                dbc.Col([
+                                    html.Label("Filter by Year"),
+                                    dcc.Dropdown(
+                                        id="trend-year-dropdown",
+                                        options=[{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022]],
+                                        value=2022,
+                                        placeholder="Select Year"
+                                    ),
+                                ], md=6),
+                                dbc.Col([
+                                    html.Label("Filter by Category"),
+                                    dcc.Dropdown(
+                                        id="trend-category-dropdown",
+                                        options=[{"label": "Buildings", "value": "buildings"}] + [{"label": x, "value": x.lower()} for x in ["Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                        value="buildings",
+                                        placeholder="Select Category"
+                                    ),
+                                ], md=6),
+                            ], className="mb-4"),
+                            dbc.Card([
+                                dbc.CardBody([
+                                    dbc.Progress(id="trend-progress", value=0, striped=True, animated=True, style={"visibility": "hidden", "height": "14px"}, className="mb-2"),
+                                    dcc.Graph(id="forecast-trend-chart", figure=trend_fig, style={"height": "400px"})
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                        ], md=12),
+                    ]),
+                    html.Hr(),
+                    dbc.Row([
+                        dbc.Col([
+                            html.H4("Forecasted Demand vs. Actual Consumption", className="mt-4"),
+                            dbc.Row([
+                                dbc.Col([
+                                    html.Label("Year"),
+                                    dcc.Dropdown(
+                                        id="mae-year-dropdown",
+                                        options=[{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
+                                        value=2023,
+                                        placeholder="Select Year"
+                                    ),
+                                ], md=3),
+                                dbc.Col([
+                                    html.Label("Month"),
+                                    dcc.Dropdown(
+                                        id="mae-month-dropdown",
+                                        options=[{"label": "All Months", "value": "all"}] + [
+                                            {"label": name, "value": num} for num, name in enumerate([
+                                                "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"
+                                            ], 1)
+                                        ],
+                                        value="all",
+                                        placeholder="Select Month"
+                                    ),
+                                ], md=3),
+                                dbc.Col([
+                                    html.Label("Category"),
+                                    dcc.Dropdown(
+                                        id="mae-category-dropdown",
+                                        options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                        value="all",
+                                        placeholder="Select Category"
+                                    ),
+                                ], md=3),
+                                dbc.Col([
+                                    html.Label("SKU"),
+                                    dcc.Dropdown(
+                                        id="mae-sku-dropdown",
+                                        options=get_sku_options(),
+                                        value="all",
+                                        placeholder="Select SKU",
+                                        disabled=True
+                                    ),
+                                ], md=3),
+                            ], className="mb-4"),
+                            dbc.Row([
+                                dbc.Col([
+                                    dbc.Card([
+                                        dbc.CardBody([
+                                            dbc.Progress(id="mae-progress", value=0, striped=True, animated=True, style={"visibility": "hidden", "height": "14px"}, className="mb-2"),
+                                            dcc.Graph(id="qty-chart", figure=qty_fig, style={"height": "300px"})
+                                        ])
+                                    ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                                ], md=6),
+                                dbc.Col([
+                                    dbc.Card([
+                                        dbc.CardBody([
+                                            dcc.Graph(id="mae-me-chart", figure=mae_me_fig, style={"height": "300px"})
+                                        ])
+                                    ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                                ], md=6),
                             ])
-                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                    ], md=12),
-                ]),
-                html.Hr(),
-                dbc.Row([
-                    dbc.Col([
-                        html.H4("Forecasted Demand vs. Actual Consumption", className="mt-4"),
-                        dbc.Row([
-                            dbc.Col([
-                                html.Label("Year"),
-                                dcc.Dropdown(
-                                    id="mae-year-dropdown",
-                                    options=[{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
-                                    value=2023,
-                                    placeholder="Select Year"
-                                ),
-                            ], md=3),
-                            dbc.Col([
-                                html.Label("Month"),
-                                dcc.Dropdown(
-                                    id="mae-month-dropdown",
-                                    options=[{"label": "All Months", "value": "all"}] + [
-                                        {"label": name, "value": num} for num, name in enumerate([
-                                            "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"
-                                        ], 1)
-                                    ],
-                                    value="all",
-                                    placeholder="Select Month"
-                                ),
-                            ], md=3),
-                            dbc.Col([
-                                html.Label("Category"),
-                                dcc.Dropdown(
-                                    id="mae-category-dropdown",
-                                    options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
-                                    value="all",
-                                    placeholder="Select Category"
-                                ),
-                            ], md=3),
-                            dbc.Col([
-                                html.Label("SKU"),
-                                dcc.Dropdown(
-                                    id="mae-sku-dropdown",
-                                    options=get_sku_options(),
-                                    value="all",
-                                    placeholder="Select SKU"
-                                ),
-                            ], md=3),
-                        ], className="mb-4"),
-                        dbc.Row([
-                            dbc.Col([
-                                dbc.Card([
-                                    dbc.CardBody([
-                                        dcc.Graph(id="qty-chart", style={"height": "300px"})
-                                    ])
-                                ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                            ], md=6),
-                            dbc.Col([
-                                dbc.Card([
-                                    dbc.CardBody([
-                                        dcc.Graph(id="mae-me-chart", style={"height": "300px"})
-                                    ])
-                                ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                            ], md=6),
-                        ])
-                    ], md=12),
+                        ], md=12),
+                    ])
                 ])
             ])
-        ])
-    ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px", "backgroundColor": "#eaeaea"}),
-    html.Footer([
-        dbc.Container([
-            dbc.Row([
-                dbc.Col([
-                    html.Div([
-                        html.Div("UPLB University Planning and Maintenance Office", className="fw-bold mb-1"),
-                        html.Div("UPMO Bldg, Rambutan Road,", className="mb-0"),
-                        html.Div("University of the Philippines Los Baños", className="mb-0"),
-                        html.Div("Batong Malake, Los Baños, Philippines 4031", className="mb-2"),
+        ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px", "backgroundColor": "#eaeaea"}),
+        html.Footer([
+            dbc.Container([
+                dbc.Row([
+                    dbc.Col([
                         html.Div([
-                            html.Span([
-                                html.I(className="bi bi-telephone-fill me-2"),
-                                "0917 882 2479"
-                            ], style={"marginRight": "24px"}),
-                            html.Span([
-                                html.I(className="bi bi-envelope-fill me-2"),
-                                "upmo.uplb@up.edu.ph"
-                            ])
-                        ], style={"display": "flex", "alignItems": "center"})
-                    ], style={"color": "#fff", "fontSize": "1rem"})
-                ], md=8),
-                dbc.Col([
-                    html.Div([
-                        html.Img(src="/assets/UPLB.png", height="120px", style={"marginRight": "16px"}),
-                        html.Img(src="/assets/upmo.png", height="120px"),
-                    ], style={"display": "flex", "justifyContent": "flex-end", "alignItems": "center", "height": "100%"})
-                ], md=4)
-            ], className="py-4")
-        ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px"})
-    ], style={"backgroundColor": "#00563F", "marginTop": "40px", "borderTop": "4px solid #eaeaea", "paddingLeft": "64px", "paddingRight": "64px"})
-    ], style={"backgroundColor": "#eaeaea", "minHeight": "100vh"})
+                            html.Div("UPLB University Planning and Maintenance Office", className="fw-bold mb-1"),
+                            html.Div("UPMO Bldg, Rambutan Road,", className="mb-0"),
+                            html.Div("University of the Philippines Los Baños", className="mb-0"),
+                            html.Div("Batong Malake, Los Baños, Philippines 4031", className="mb-2"),
+                            html.Div([
+                                html.Span([
+                                    html.I(className="bi bi-telephone-fill me-2"),
+                                    "0917 882 2479"
+                                ], style={"marginRight": "24px"}),
+                                html.Span([
+                                    html.I(className="bi bi-envelope-fill me-2"),
+                                    "upmo.uplb@up.edu.ph"
+                                ])
+                            ], style={"display": "flex", "alignItems": "center"})
+                        ], style={"color": "#fff", "fontSize": "1rem"})
+                    ], md=8),
+                    dbc.Col([
+                        html.Div([
+                            responsive_image("UPLB.png", sizes="120px", height="120px", style={"marginRight": "16px"}),
+                            responsive_image("upmo.png", sizes="120px", height="120px"),
+                        ], style={"display": "flex", "justifyContent": "flex-end", "alignItems": "center", "height": "100%"})
+                    ], md=4)
+                ], className="py-4")
+            ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px"})
+        ], style={"backgroundColor": "#00563F", "marginTop": "40px", "borderTop": "4px solid #eaeaea", "paddingLeft": "64px", "paddingRight": "64px"})
+        ], style={"backgroundColor": "#eaeaea", "minHeight": "100vh"})
 from dash import ctx
 @callback(
     Output("mae-sku-dropdown", "options"),
     Output("mae-sku-dropdown", "disabled"),
-    [Input("mae-category-dropdown", "value")]
+    [Input("mae-category-dropdown", "value")],
+    prevent_initial_call=True
 )
 def update_sku_options(selected_category):
     options = get_sku_options(selected_category)
     disabled = selected_category == "all"
     return options, disabled
-@callback(
+@background_callback(
     Output("mae-me-chart", "figure"),
     Output("qty-chart", "figure"),
     [Input("mae-year-dropdown", "value"),
      Input("mae-month-dropdown", "value"),
      Input("mae-category-dropdown", "value"),
-     Input("mae-sku-dropdown", "value")]
+     Input("mae-sku-dropdown", "value")],
+    progress_id="mae-progress",
+    prevent_initial_call=True
 )
+@cached_figure(periods=('year', 'month'))
 def update_mae_me_chart(year, month, category, sku):
-    df_error = get_mae_me_data(year, month, category, sku)
-    df_qty = get_qty_data(year, month, category, sku)
-    df_error_long = df_error.melt(var_name="Metric", value_name="Value")
-    fig_error = px.bar(
-        df_error_long,
-        x="Metric",
-        y="Value",
-        title="Forecast Error Metrics (MAE & ME)",
-        text="Value",
-        color_discrete_sequence=["#8D1436"]
-    )
-    fig_error.update_layout(yaxis_title="Value", xaxis_title="Metric")
-    df_qty_long = df_qty.melt(var_name="Metric", value_name="Value")
-    fig_qty = px.bar(
-        df_qty_long,
-        x="Value",
-        y="Metric",
-        orientation="h",
-        title="Forecast & Request Quantities",
-        text="Value",
-        color_discrete_sequence=["#8D1436"]
-    )
-    fig_qty.update_layout(xaxis_title="Value", yaxis_title="Metric")
+    import plotly.express as px
+    report_progress(1, 3, "Loading forecast accuracy")
+    data = load_forecast_accuracy_data(year, month, category, sku)
+    error_long = {"Metric": ["Mean_Absolute_Error", "Mean_Error"], "Value": list(data["error"])}
+    qty_long = {"Metric": ["Total_ForecastQty", "Total_RequestedQty"], "Value": list(data["qty"])}
+    report_progress(2, 3, "Drawing charts")
+    with span("figure"):
+        fig_error = px.bar(
+            error_long,
+            x="Metric",
+            y="Value",
+            title="Forecast Error Metrics (MAE & ME)",
+            text="Value",
+            color_discrete_sequence=["#8D1436"]
+        )
+        fig_error.update_layout(yaxis_title="Value", xaxis_title="Metric")
+        fig_qty = px.bar(
+            qty_long,
+            x="Value",
+            y="Metric",
+            orientation="h",
+            title="Forecast & Request Quantities",
+            text="Value",
+            color_discrete_sequence=["#8D1436"]
+        )
+        fig_qty.update_layout(xaxis_title="Value", yaxis_title="Metric")
     return fig_error, fig_qty
 
-@callback(
+@background_callback(
     Output("forecast-trend-chart", "figure"),
-    [Input("trend-year-dropdown", "value"), Input("trend-category-dropdown", "value")]
+    [Input("trend-year-dropdown", "value"), Input("trend-category-dropdown", "value")],
+    progress_id="trend-progress",
+    prevent_initial_call=True
 )
+@cached_figure
 def update_forecast_trend_chart(selected_year, selected_category):
+    import plotly.express as px
     if selected_year is None:
         input_year = 2022
     else:
         input_year = int(selected_year)
     category = "Buildings" if selected_category is None or selected_category == "all" else selected_category.capitalize()
+    report_progress(1, 3, "Loading forecasts")
     df = get_forecast_trend_data(input_year, category=category)
+    report_progress(2, 3, "Reshaping")
     chart_df = prepare_line_chart_data(df, input_year)
-    fig = px.line(
-        chart_df,
-        x="YearType",
-        y="ForecastQty",
-        color="SKU",
-        markers=True,
-        title=f"Forecasted Demand Trend for {category}"
-    )
-    fig.update_layout(xaxis_title="Year", yaxis_title="Forecasted Demand")
+    report_progress(3, 3, "Drawing chart")
+    with span("figure"):
+        fig = px.line(
+            chart_df,
+            x="YearType",
+            y="ForecastQty",
+            color="SKU",
+            markers=True,
+            title=f"Forecasted Demand Trend for {category}"
+        )
+        fig.update_layout(xaxis_title="Year", yaxis_title="Forecasted Demand")
     return fig
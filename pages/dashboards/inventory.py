@@ -1,11 +1,15 @@
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-import pandas as pd
-from db_utils import get_db_connection, import_csvs_to_sqlite
-import plotly.express as px
+from db_utils import borrow_connection, get_db_connection, import_csvs_to_sqlite, in_filter, query_all, read_sql_query
+from cache_utils import cached, cached_figure
+from background_utils import background_callback, report_progress
 from dash import Input, Output, callback
 import plotly.graph_objects as go
+from asset_utils import responsive_image
+from bitmap_utils import get_fact_bitmaps
+from range_utils import PREFIX_METRICS, get_prefix_index, period_label, rolling_window_figure, slider_marks
+from trace_utils import span
 
 dash.register_page(__name__, path="/inventory", name="Inventory Dashboard")
 
@@ -13,7 +17,7 @@ header = dbc.Navbar(
     dbc.Container([
         dbc.NavbarBrand(
             html.Div([
-                html.Img(src="/assets/upmo.png", height="40px", style={"marginRight": "12px"}),
+                responsive_image("upmo.png", sizes="40px", height="40px", style={"marginRight": "12px"}),
                 html.Span("UPMO Intelligence", className="fw-bold fs-3")
             ], style={"display": "flex", "alignItems": "center"})
         ),
@@ -29,109 +33,58 @@ header = dbc.Navbar(
     style={"position": "sticky", "top": "0", "zIndex": "1000"}
 )
 
-def get_inventory_metrics(year=None, category=None):
-    conn = get_db_connection()
-    params = []
-    sku_query = '''
-        SELECT COUNT(DISTINCT i.SKU) AS total_skus
-        FROM Item_Dimension i
-        JOIN Job_Request_Fact_Table f ON i.ItemKey = f.ItemKey
-        JOIN Date_Dimension d ON f.DateKey = d.DateKey
-        WHERE 1=1
-    '''
-    if year and "all" not in year:
-        sku_query += f" AND d.Year IN ({', '.join(['?' for _ in year])})"
-        params.extend(year)
-    if category and "all" not in category:
-        sku_query += f" AND LOWER(i.Category) IN ({', '.join(['?' for _ in category])})"
-        params.extend([c.lower() for c in category])
-    sku_df = pd.read_sql_query(sku_query, conn, params=params)
-    total_skus = int(sku_df["total_skus"].iloc[0]) if not sku_df.empty else 0
-
-    stock_query = '''
-        SELECT SUM(f.StockOnHand) AS total_stock
-        FROM Job_Request_Fact_Table f
-        JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
-        JOIN Date_Dimension d ON f.DateKey = d.DateKey
-        WHERE 1=1
-    '''
-    stock_params = []
-    if year and "all" not in year:
-        stock_query += f" AND d.Year IN ({', '.join(['?' for _ in year])})"
-        stock_params.extend(year)
-    if category and "all" not in category:
-        stock_query += f" AND LOWER(i.Category) IN ({', '.join(['?' for _ in category])})"
-        stock_params.extend([c.lower() for c in category])
-    stock_df = pd.read_sql_query(stock_query, conn, params=stock_params)
-    total_stock = int(stock_df["total_stock"].iloc[0]) if not stock_df.empty and pd.notnull(stock_df["total_stock"].iloc[0]) else 0
-
-    stockout_query = '''
-        SELECT COUNT(*) AS total_stockouts
-        FROM Job_Request_Fact_Table f
-        JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
-        JOIN Date_Dimension d ON f.DateKey = d.DateKey
-        WHERE f.RequestedQty > f.StockOnHand
-    '''
-    stockout_params = []
-    if year and "all" not in year:
-        stockout_query += f" AND d.Year IN ({', '.join(['?' for _ in year])})"
-        stockout_params.extend(year)
-    if category and "all" not in category:
-        stockout_query += f" AND LOWER(i.Category) IN ({', '.join(['?' for _ in category])})"
-        stockout_params.extend([c.lower() for c in category])
-    stockout_df = pd.read_sql_query(stockout_query, conn, params=stockout_params)
-    total_stockouts = int(stockout_df["total_stockouts"].iloc[0]) if not stockout_df.empty else 0
-
-    obsolete_query = '''
-        SELECT COUNT(i.SKU) AS total_obsoletes
-        FROM Item_Dimension i
-        JOIN Job_Request_Fact_Table f ON i.ItemKey = f.ItemKey
-        JOIN Date_Dimension d ON f.DateKey = d.DateKey
-        WHERE i.ObsoleteFlag = 1
-    '''
-    obsolete_params = []
-    if year and "all" not in year:
-        obsolete_query += f" AND d.Year IN ({', '.join(['?' for _ in year])})"
-        obsolete_params.extend(year)
-    if category and "all" not in category:
-        obsolete_query += f" AND LOWER(i.Category) IN ({', '.join(['?' for _ in category])})"
-        obsolete_params.extend([c.lower() for c in category])
-    obsolete_df = pd.read_sql_query(obsolete_query, conn, params=obsolete_params)
-    total_obsoletes = int(obsolete_df["total_obsoletes"].iloc[0]) if not obsolete_df.empty else 0
-
-    conn.close()
-    return total_skus, total_stock, total_stockouts, total_obsoletes
+def normalize_inventory_filters(selected_year, selected_category):
+    """Normalize the Inventory year/category selections so sibling callbacks share one dataset."""
+    year_options = [2019, 2020, 2021, 2022, 2023]
+    year = selected_year if isinstance(selected_year, list) else [selected_year]
+    category = selected_category if isinstance(selected_category, list) else [selected_category]
+    year = [y for y in year if y is not None]
+    category = [c for c in category if c is not None]
+    if not year or "all" in year or sorted(int(y) for y in year) == year_options:
+        year = ["all"]
+    else:
+        year = sorted(int(y) for y in year)
+    if not category or "all" in category:
+        category = ["all"]
+    else:
+        category = sorted(c.lower() for c in category)
+    return year, category
 
-SQL_QUERY = '''
-SELECT
-    i.ItemKey,
-    i.SKU,
-    i.Category,
-    SUM(
-        CASE
-            WHEN i.ObsoleteFlag = 1 
-            OR f.RequestedQty > f.StockOnHand THEN 1
-            ELSE 0
-        END
-    ) AS InventoryFailureFrequency
-FROM
-    Job_Request_Fact_Table f
-JOIN
-    Item_Dimension i ON f.ItemKey = i.ItemKey
-GROUP BY
-    i.SKU, i.Category, i.ItemKey
-ORDER BY
-    InventoryFailureFrequency DESC
-'''
+def inventory_item_totals(year=None, category=None):
+    """Sum the fact rows selected by normalized Inventory filters per (SKU, Category, ObsoleteFlag).
 
-def get_inventory_failure_data():
-    conn = get_db_connection()
-    df = pd.read_sql_query(SQL_QUERY, conn)
-    conn.close()
-    return df
+    The filters are answered from the fact bitmaps: one OR per selected value and an
+    AND across attributes. Each group maps to [RowCount, TotalStock, Shortfalls], in group order.
+    """
+    bitmaps = get_fact_bitmaps()
+    rows = bitmaps.select(
+        Year=None if not year or "all" in year else [int(y) for y in year],
+        Category=None if not category or "all" in category else [c.lower() for c in category],
+    )
+    with span("bitmap reduce"):
+        item_keys, counts, sums = bitmaps.item_totals(rows)
+    attributes = {key: (sku, cat, flag) for key, sku, cat, flag in query_all("SELECT ItemKey, SKU, Category, ObsoleteFlag FROM Item_Dimension")}
+    totals = {}
+    for key, count, stock, shortfalls in zip(item_keys.tolist(), counts.tolist(), sums["StockOnHand"].tolist(), sums["IsShortfall"].tolist()):
+        if count:
+            row = totals.setdefault(attributes[key], [0, 0, 0])
+            row[0] += count
+            row[1] += stock
+            row[2] += shortfalls
+    return dict(sorted(totals.items()))
 
-inv_df = get_inventory_failure_data()
+@cached(periods=('year',))
+def get_inventory_metrics(year=None, category=None):
+    """Return the four KPI counts from the bitmap-selected rows, without loading pandas."""
+    totals = inventory_item_totals(year, category)
+    return (
+        len({sku for sku, _, _ in totals}),
+        sum(row[1] for row in totals.values()),
+        sum(row[2] for row in totals.values()),
+        sum(row[0] for (_, _, obsolete), row in totals.items() if obsolete == 1),
+    )
 
+@cached(periods=('year',))
 def get_forecasted_demand_data(year=None, category=None):
     conn = get_db_connection()
     params = []
@@ -146,12 +99,10 @@ def get_forecasted_demand_data(year=None, category=None):
                 Job_Request_Fact_Table AS J
             JOIN
                 Item_Dimension AS I ON J.ItemKey = I.ItemKey
-            JOIN
-                Date_Dimension D ON J.DateKey = D.DateKey
             WHERE 1=1
         '''
         if year:
-            query += ' AND D.Year = ?'
+            query += ' AND J.Year = ?'
             params.append(year)
         query += ' AND LOWER(I.Category) = ?'
         params.append(category.lower())
@@ -181,12 +132,10 @@ def get_forecasted_demand_data(year=None, category=None):
                 Job_Request_Fact_Table AS J
             JOIN
                 Item_Dimension AS I ON J.ItemKey = I.ItemKey
-            JOIN
-                Date_Dimension D ON J.DateKey = D.DateKey
             WHERE 1=1
         '''
         if year:
-            query += ' AND D.Year = ?'
+            query += ' AND J.Year = ?'
             params.append(year)
         query += '''
             GROUP BY I.Category, I.SKU
@@ -203,425 +152,489 @@ def get_forecasted_demand_data(year=None, category=None):
         WHERE OverallRank <= 5
         ORDER BY OverallRank
         '''
-    df = pd.read_sql_query(query, conn, params=params)
+    df = read_sql_query(query, conn, params=params)
     conn.close()
     return df
 
+@cached(periods=('year',))
 def get_filtered_inventory_failure_data(year=None, category=None):
-    conn = get_db_connection()
+    """Return the ten SKUs with the most overstock or obsolescence failures, read from the monthly aggregate."""
     query = '''
-    SELECT
-        i.ItemKey,
-        i.SKU,
-        i.Category,
-        d.Year,
-        SUM(
-            CASE
-                WHEN i.ObsoleteFlag = 1 
-                OR f.StockOnHand > f.ForecastQty THEN 1
-                ELSE 0
-            END
-        ) AS InventoryFailureFrequency
-    FROM
-        Job_Request_Fact_Table f
-    JOIN
-        Item_Dimension i ON f.ItemKey = i.ItemKey
-    JOIN
-        Date_Dimension d ON f.DateKey = d.DateKey
-    WHERE 1=1
-    '''
-    params = []
-    if year and "all" not in year:
-        query += f" AND d.Year IN ({', '.join(['?' for _ in year])})"
-        params.extend(year)
-    if category and "all" not in category:
-        query += f" AND LOWER(i.Category) IN ({', '.join(['?' for _ in category])})"
-        params.extend([c.lower() for c in category])
-    query += '''
-    GROUP BY i.SKU, i.Category
-    ORDER BY InventoryFailureFrequency DESC
-    LIMIT 10
+        SELECT SKU, Category, SUM(InventoryFailures) AS InventoryFailureFrequency
+        FROM Monthly_SKU_Aggregate
+        WHERE 1=1
     '''
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
-
-initial_df = get_filtered_inventory_failure_data()
-bar_fig = px.bar(
-    initial_df,
-    x='InventoryFailureFrequency',
-    y='SKU',
-    color='Category',
-    orientation='h',
-    title='Overstocking and Obselescence Frequency by SKU and Category',
-    labels={'InventoryFailureFrequency': 'Failure Frequency'}
-)
-
-initial_forecast_df = get_forecasted_demand_data()
-forecast_fig = px.bar(
-    initial_forecast_df,
-    x='TotalForecastedQty',
-    y='SKU',
-    color='Category',
-    orientation='h',
-    title='Forecasted Demand by SKU and Category',
-    labels={'TotalForecastedQty': 'Forecasted Qty'}
-)
+    with borrow_connection() as conn:
+        params = []
+        if year and "all" not in year:
+            fragment, values = in_filter(conn, "Year", year)
+            query += fragment
+            params += values
+        if category and "all" not in category:
+            fragment, values = in_filter(conn, "LOWER(Category)", category)
+            query += fragment
+            params += values
+        query += '''
+            GROUP BY SKU, Category
+            ORDER BY InventoryFailureFrequency DESC, SKU, Category
+            LIMIT 10
+        '''
+        return read_sql_query(query, conn, params=params)
 
-layout = html.Div([
-    header,
-    dbc.Container([
-        dbc.Row([
-            dbc.Col([
-                html.H2("Dashboard", className="fw-bold mb-4 d-inline-block mb-0"),
-            ], md=6),
-            dbc.Col([
-                dbc.ButtonGroup([
-                    dbc.Button("Inventory", href="/inventory", color="primary", disabled=True),
-                    dbc.Button("Forecasting", href="/forecasting", color="primary", disabled=False),
-                    dbc.Button("Operations", href="/operations", color="primary", disabled=False),
-                    dbc.Button("Planning", href="/planning", color="primary", disabled=False),
-                ], size="md"),
-            ], md=6, className="d-flex align-items-center justify-content-end"),
-        ], className="mb-2", style={"paddingTop": "32px"}),
-        html.Div([
+def layout(**kwargs):
+    # Render the default filter state server-side so first paint needs no callback round trips.
+    total_skus, total_stock, total_stockouts, total_obsoletes = update_metrics(["all"], ["all"])
+    bar_fig = update_inventory_chart(["all"], ["all"])
+    forecast_fig = update_forecasted_demand_chart(2023, ["all"])
+    line_fig, pie_fig = update_line_and_pie_chart(2023, "buildings")
+    index = get_prefix_index()
+    range_fig, rolling_fig = update_inventory_range_charts([index.first, index.last], ["all"])
+    return html.Div([
+        header,
+        dbc.Container([
+            dbc.Row([
+                dbc.Col([
+                    html.H2("Dashboard", className="fw-bold mb-4 d-inline-block mb-0"),
+                ], md=6),
+                dbc.Col([
+                    dbc.ButtonGroup([
+                        dbc.Button("Inventory", href="/inventory", color="primary", disabled=True),
+                        dbc.Button("Forecasting", href="/forecasting", color="primary", disabled=False),
+                        dbc.Button("Operations", href="/operations", color="primary", disabled=False),
+                        dbc.Button("Planning", href="/planning", color="primary", disabled=False),
+                    ], size="md"),
+                ], md=6, className="d-flex align-items-center justify-content-end"),
+            ], className="mb-2", style={"paddingTop": "32px"}),
             html.Div([
-                html.Img(src="/assets/oblation.png", style={
-                    "width": "100vw",
-                    "height": "440px",
-                    "objectFit": "cover",
-                    "position": "relative",
-                    "left": "50%",
-                    "transform": "translateX(-50%)"
-                }),
-                html.Div(style={
-                    "position": "absolute",
-                    "top": "0",
-                    "left": "0",
-                    "width": "100vw",
-                    "height": "440px",
-                    "background": "rgba(0,0,0,0.65)",
-                    "zIndex": "1"
-                }),
                 html.Div([
-                    html.Div("INVENTORY", style={
-                        "color": "#fff",
-                        "fontSize": "3rem",
-                        "fontWeight": "bold",
-                        "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
-                        "letterSpacing": "0.12em",
-                        "width": "100%",
-                        "marginBottom": "12px",
-                        "display": "flex",
-                        "justifyContent": "center",
-                        "alignItems": "center",
-                        "textAlign": "center"
+                    responsive_image("oblation.png", sizes="100vw", style={
+                        "width": "100vw",
+                        "height": "440px",
+                        "objectFit": "cover",
+                        "position": "relative",
+                        "left": "50%",
+                        "transform": "translateX(-50%)"
                     }),
-                    html.Hr(style={
-                        "width": "60%",
-                        "borderColor": "#fff",
-                        "opacity": "0.7",
-                        "margin": "12px auto"
+                    html.Div(style={
+                        "position": "absolute",
+                        "top": "0",
+                        "left": "0",
+                        "width": "100vw",
+                        "height": "440px",
+                        "background": "rgba(0,0,0,0.65)",
+                        "zIndex": "1"
                     }),
                     html.Div([
-                        "Monitor inventory levels and procurement trends to ensure supply availability for UPLB operations.", html.Br(),
-                        "This dashboard provides actionable insights for efficient resource management."
-                    ],
-                        style={
+                        html.Div("INVENTORY", style={
                             "color": "#fff",
-                            "fontSize": "1.1rem",
-                            "width": "100%",
+                            "fontSize": "3rem",
+                            "fontWeight": "bold",
                             "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
+                            "letterSpacing": "0.12em",
+                            "width": "100%",
+                            "marginBottom": "12px",
                             "display": "flex",
                             "justifyContent": "center",
                             "alignItems": "center",
                             "textAlign": "center"
-                        }
-                    )
+                        }),
+                        html.Hr(style={
+                            "width": "60%",
+                            "borderColor": "#fff",
+                            "opacity": "0.7",
+                            "margin": "12px auto"
+                        }),
+                        html.Div([
+                            "Monitor inventory levels and procurement trends to ensure supply availability for UPLB operations.", html.Br(),
+                            "This dashboard provides actionable insights for efficient resource management."
+                        ],
+                            style={
+                                "color": "#fff",
+                                "fontSize": "1.1rem",
+                                "width": "100%",
+                                "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
+                                "display": "flex",
+                                "justifyContent": "center",
+                                "alignItems": "center",
+                                "textAlign": "center"
+                            }
+                        )
+                    ], style={
+                        "position": "absolute",
+                        "top": "0",
+                        "left": "0",
+                        "width": "100vw",
+                        "height": "440px",
+                        "display": "flex",
+                        "flexDirection": "column",
+                        "justifyContent": "center",
+                        "alignItems": "center",
+                        "zIndex": "2"
+                    })
                 ], style={
-                    "position": "absolute",
-                    "top": "0",
-                    "left": "0",
+                    "position": "relative",
                     "width": "100vw",
-                    "height": "440px",
-                    "display": "flex",
-                    "flexDirection": "column",
-                    "justifyContent": "center",
-                    "alignItems": "center",
-                    "zIndex": "2"
-                })
-            ], style={
-                "position": "relative",
-                "width": "100vw",
-                "marginBottom": "8px",
-                "left": "50%",
-                "transform": "translateX(-50%)"
-            }),
-        ]),
-        dbc.Card(
-            dbc.CardBody([
-                html.H4("Inventory", className="mt-4"),
-                dbc.Row([
-                    dbc.Col([
-                        html.Label("Filter by Year"),
-                        dbc.InputGroup([
-                            dcc.Dropdown(
-                                id="year-dropdown",
-                                options=[{"label": "All Years", "value": "all"}] + [{"label": x, "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
-                                value=["all"],
-                                multi=True,
-                                placeholder="Select Year",
-                                style={"width": "100%"}
-                            ),
-                            dbc.Button("Reset", id="reset-year-btn", color="secondary", size="sm", style={"minWidth": "70px"}),
-                        ], className="mb-2", style={"display": "flex", "flexWrap": "nowrap"}),
-                    ], md=6),
-                    dbc.Col([
-                        html.Label("Filter by Category"),
-                        dbc.InputGroup([
-                            dcc.Dropdown(
-                                id="category-dropdown",
-                                options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
-                                value=["all"],
-                                multi=True,
-                                placeholder="Select Category",
-                                style={"width": "100%"}
-                            ),
-                            dbc.Button("Reset", id="reset-category-btn", color="secondary", size="sm", style={"minWidth": "70px"}),
-                        ], className="mb-2", style={"display": "flex", "flexWrap": "nowrap"}),
-                    ], md=6),
-                ]),
-                html.Hr(),
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([
-                            html.H6("Total Unique SKUs", className="card-title text-muted"),
-                            html.H3(id="metric-total-skus", className="card-text fw-bold mb-0"),
-                        ])
-                    ], className="shadow-sm"), md=3),
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([
-                            html.H6("Total Stock (All Items)", className="card-title text-muted"),
-                            html.H3(id="metric-total-stock", className="card-text fw-bold mb-0"),
-                        ])
-                    ], className="shadow-sm"), md=3),
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([
-                            html.H6("Total Stockouts", className="card-title text-muted"),
-                            html.H3(id="metric-total-stockouts", className="card-text fw-bold mb-0"),
-                        ])
-                    ], className="shadow-sm"), md=3),
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([
-                            html.H6("Total Obsoletes", className="card-title text-muted"),
-                            html.H3(id="metric-total-obsoletes", className="card-text fw-bold mb-0"),
-                        ])
-                    ], className="shadow-sm"), md=3),
-                ], className="mb-4"),
-                html.Hr(),
-                dbc.Row([
-                    dbc.Col([
-                        dbc.Card([
+                    "marginBottom": "8px",
+                    "left": "50%",
+                    "transform": "translateX(-50%)"
+                }),
+            ]),
+            dbc.Card(
+                dbc.CardBody([
+                    html.H4("Inventory", className="mt-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Filter by Year"),
+                            dbc.InputGroup([
+                                dcc.Dropdown(
+                                    id="year-dropdown",
+                                    options=[{"label": "All Years", "value": "all"}] + [{"label": x, "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
+                                    value=["all"],
+                                    multi=True,
+                                    placeholder="Select Year",
+                                    style={"width": "100%"}
+                                ),
+                                dbc.Button("Reset", id="reset-year-btn", color="secondary", size="sm", style={"minWidth": "70px"}),
+                            ], className="mb-2", style={"display": "flex", "flexWrap": "nowrap"}),
+                        ], md=6),
+                        dbc.Col([
+                            html.Label("Filter by Category"),
+                            dbc.InputGroup([
+                                dcc.Dropdown(
+                                    id="category-dropdown",
+                                    options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                    value=["all"],
+                                    multi=True,
+                                    placeholder="Select Category",
+                                    style={"width": "100%"}
+                                ),
+                                dbc.Button("Reset", id="reset-category-btn", color="secondary", size="sm", style={"minWidth": "70px"}),
+                            ], className="mb-2", style={"display": "flex", "flexWrap": "nowrap"}),
+                        ], md=6),
+                    ]),
+                    html.Hr(),
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
                             dbc.CardBody([
-                                html.H4("Inventory Overstocking and Obselescence Frequency", className="mt-4"),
-                                dcc.Graph(id="inventory-bar-chart", figure=bar_fig, style={"height": "400px"})
+                                html.H6("Total Unique SKUs", className="card-title text-muted"),
+                                html.H3(total_skus, id="metric-total-skus", className="card-text fw-bold mb-0"),
                             ])
-                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                    ], width=12),
-                ], className="mb-4"),
-                dbc.Row([
-                    dbc.Col([
-                        dbc.Card([
+                        ], className="shadow-sm"), md=3),
+                        dbc.Col(dbc.Card([
                             dbc.CardBody([
-                                html.H4("Forecasted Demand", className="mt-4"),
-                                dbc.Row([
-                                    dbc.Col([
-                                        html.Label("Filter by Year", style={"fontSize": "0.9rem"}),
-                                        dcc.Dropdown(
-                                            id="forecasted-year-dropdown",
-                                            options=[{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
-                                            value=2023,
-                                            placeholder="Select Year",
-                                            style={"fontSize": "0.85rem"}
-                                        ),
-                                    ], md=3),
-                                    dbc.Col([
-                                        html.Label("Filter by Category", style={"fontSize": "0.9rem"}),
-                                        dcc.Dropdown(
-                                            id="forecasted-category-dropdown",
-                                            options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
-                                            value=["all"],
-                                            multi=True,
-                                            placeholder="Select Category",
-                                            style={"fontSize": "0.85rem"}
-                                        ),
-                                    ], md=4),
-                                ], className="mb-3"),
-                                dcc.Graph(id="forecasted-demand-chart", figure=forecast_fig, style={"height": "400px"})
+                                html.H6("Total Stock (All Items)", className="card-title text-muted"),
+                                html.H3(total_stock, id="metric-total-stock", className="card-text fw-bold mb-0"),
                             ])
-                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                    ], width=12),
-                ]),
-                html.Hr(),
-                dbc.Row([
-                    dbc.Col([
-                        dbc.Card([
+                        ], className="shadow-sm"), md=3),
+                        dbc.Col(dbc.Card([
                             dbc.CardBody([
-                                html.H4("Total Stock per Month & Obsolete vs Active Items", className="mt-4"),
-                                dbc.Row([
-                                    dbc.Col([
-                                        html.Label("Year"),
-                                        dcc.Dropdown(
-                                            id="chart-year-dropdown",
-                                            options=[{"label": x, "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
-                                            value=2023,
-                                            multi=False,
-                                            style={"marginBottom": "8px"}
-                                        ),
-                                    ], md=6),
-                                    dbc.Col([
-                                        html.Label("Category"),
-                                        dcc.Dropdown(
-                                            id="chart-category-dropdown",
-                                            options=[{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
-                                            value="buildings",
-                                            multi=False,
-                                            style={"marginBottom": "8px"}
-                                        ),
-                                    ], md=6),
-                                ], className="mb-3"),
-                                dbc.Row([
-                                    dbc.Col([
-                                        dbc.Card([
-                                            dbc.CardBody([
-                                                dcc.Graph(id="stock-line-chart", style={"height": "400px"})
-                                            ])
-                                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                                    ], md=6),
-                                    dbc.Col([
-                                        dbc.Card([
-                                            dbc.CardBody([
-                                                dcc.Graph(id="obsolete-pie-chart", style={"height": "400px"})
-                                            ])
-                                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                                    ], md=6),
-                                ])
+                                html.H6("Total Stockouts", className="card-title text-muted"),
+                                html.H3(total_stockouts, id="metric-total-stockouts", className="card-text fw-bold mb-0"),
+                            ])
+                        ], className="shadow-sm"), md=3),
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([
+                                html.H6("Total Obsoletes", className="card-title text-muted"),
+                                html.H3(total_obsoletes, id="metric-total-obsoletes", className="card-text fw-bold mb-0"),
                             ])
-                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                    ], width=12),
+                        ], className="shadow-sm"), md=3),
+                    ], className="mb-4"),
+                    html.Hr(),
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    html.H4("Inventory Overstocking and Obselescence Frequency", className="mt-4"),
+                                    dbc.Progress(id="inventory-progress", value=0, striped=True, animated=True, style={"visibility": "hidden", "height": "14px"}, className="mb-2"),
+                                    dcc.Graph(id="inventory-bar-chart", figure=bar_fig, style={"height": "400px"})
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                        ], width=12),
+                    ], className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    html.H4("Forecasted Demand", className="mt-4"),
+                                    dbc.Row([
+                                        dbc.Col([
+                                            html.Label("Filter by Year", style={"fontSize": "0.9rem"}),
+                                            dcc.Dropdown(
+                                                id="forecasted-year-dropdown",
+                                                options=[{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
+                                                value=2023,
+                                                placeholder="Select Year",
+                                                style={"fontSize": "0.85rem"}
+                                            ),
+                                        ], md=3),
+                                        dbc.Col([
+                                            html.Label("Filter by Category", style={"fontSize": "0.9rem"}),
+                                            dcc.Dropdown(
+                                                id="forecasted-category-dropdown",
+                                                options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                                value=["all"],
+                                                multi=True,
+                                                placeholder="Select Category",
+                                                style={"fontSize": "0.85rem"}
+                                            ),
+                                        ], md=4),
+                                    ], className="mb-3"),
+                                    dbc.Progress(id="forecasted-progress", value=0, striped=True, animated=True, style={"visibility": "hidden", "height": "14px"}, className="mb-2"),
+                                    dcc.Graph(id="forecasted-demand-chart", figure=forecast_fig, style={"height": "400px"})
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                        ], width=12),
+                    ]),
+                    html.Hr(),
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    html.H4("Total Stock per Month & Obsolete vs Active Items", className="mt-4"),
+                                    dbc.Row([
+                                        dbc.Col([
+                                            html.Label("Year"),
+                                            dcc.Dropdown(
+                                                id="chart-year-dropdown",
+                                                options=[{"label": x, "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
+                                                value=2023,
+                                                multi=False,
+                                                style={"marginBottom": "8px"}
+                                            ),
+                                        ], md=6),
+                                        dbc.Col([
+                                            html.Label("Category"),
+                                            dcc.Dropdown(
+                                                id="chart-category-dropdown",
+                                                options=[{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                                value="buildings",
+                                                multi=False,
+                                                style={"marginBottom": "8px"}
+                                            ),
+                                        ], md=6),
+                                    ], className="mb-3"),
+                                    dbc.Row([
+                                        dbc.Col([
+                                            dbc.Card([
+                                                dbc.CardBody([
+                                                    dcc.Graph(id="stock-line-chart", figure=line_fig, style={"height": "400px"})
+                                                ])
+                                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                                        ], md=6),
+                                        dbc.Col([
+                                            dbc.Card([
+                                                dbc.CardBody([
+                                                    dcc.Graph(id="obsolete-pie-chart", figure=pie_fig, style={"height": "400px"})
+                                                ])
+                                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                                        ], md=6),
+                                    ])
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                        ], width=12),
+                    ]),
+                    html.Hr(),
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    html.H4("Stock and Stockouts over a Date Range", className="mt-4"),
+                                    dbc.Row([
+                                        dbc.Col([
+                                            html.Label("Category"),
+                                            dcc.Dropdown(
+                                                id="inventory-range-category-dropdown",
+                                                options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                                value=["all"],
+                                                multi=True,
+                                                style={"marginBottom": "8px"}
+                                            ),
+                                        ], md=4),
+                                        dbc.Col([
+                                            html.Label("Months"),
+                                            dcc.RangeSlider(
+                                                id="inventory-range-slider",
+                                                min=index.first,
+                                                max=index.last,
+                                                step=1,
+                                                value=[index.first, index.last],
+                                                marks=slider_marks(index),
+                                                allowCross=False
+                                            ),
+                                        ], md=8),
+                                    ], className="mb-3"),
+                                    dbc.Row([
+                                        dbc.Col([
+                                            dbc.Card([
+                                                dbc.CardBody([
+                                                    dcc.Graph(id="inventory-range-chart", figure=range_fig, style={"height": "400px"})
+                                                ])
+                                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                                        ], md=7),
+                                        dbc.Col([
+                                            dbc.Card([
+                                                dbc.CardBody([
+                                                    dcc.Graph(id="inventory-rolling-chart", figure=rolling_fig, style={"height": "400px"})
+                                                ])
+                                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                                        ], md=5),
+                                    ])
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                        ], width=12),
+                    ])
                 ])
-            ])
-        )
-    ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px", "backgroundColor": "#eaeaea"}),
-    html.Footer([
-        dbc.Container([
-            dbc.Row([
-                dbc.Col([
-                    html.Div([
-                        html.Div("UPLB University Planning and Maintenance Office", className="fw-bold mb-1"),
-                        html.Div("UPMO Bldg, Rambutan Road,", className="mb-0"),
-                        html.Div("University of the Philippines Los Baños", className="mb-0"),
-                        html.Div("Batong Malake, Los Baños, Philippines 4031", className="mb-2"),
+            )
+        ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px", "backgroundColor": "#eaeaea"}),
+        html.Footer([
+            dbc.Container([
+                dbc.Row([
+                    dbc.Col([
                         html.Div([
-                            html.Span([
-                                html.I(className="bi bi-telephone-fill me-2"),
-                                "0917 882 2479"
-                            ], style={"marginRight": "24px"}),
-                            html.Span([
-                                html.I(className="bi bi-envelope-fill me-2"),
-                                "upmo.uplb@up.edu.ph"
-                            ])
-                        ], style={"display": "flex", "alignItems": "center"})
-                    ], style={"color": "#fff", "fontSize": "1rem"})
-                ], md=8),
-                dbc.Col([
-                    html.Div([
-                        html.Img(src="/assets/UPLB.png", height="120px", style={"marginRight": "16px"}),
-                        html.Img(src="/assets/upmo.png", height="120px"),
-                    ], style={"display": "flex", "justifyContent": "flex-end", "alignItems": "center", "height": "100%"})
-                ], md=4)
-            ], className="py-4")
-        ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px"})
-    ], style={"backgroundColor": "#00563F", "marginTop": "40px", "borderTop": "4px solid #eaeaea", "paddingLeft": "64px", "paddingRight": "64px"})
-    ], style={"backgroundColor": "#eaeaea", "minHeight": "100vh"})
+                            html.Div("UPLB University Planning and Maintenance Office", className="fw-bold mb-1"),
+                            html.Div("UPMO Bldg, Rambutan Road,", className="mb-0"),
+                            html.Div("University of the Philippines Los Baños", className="mb-0"),
+                            html.Div("Batong Malake, Los Baños, Philippines 4031", className="mb-2"),
+                            html.Div([
+                                html.Span([
+                                    html.I(className="bi bi-telephone-fill me-2"),
+                                    "0917 882 2479"
+                                ], style={"marginRight": "24px"}),
+                                html.Span([
+                                    html.I(className="bi bi-envelope-fill me-2"),
+                                    "upmo.uplb@up.edu.ph"
+                                ])
+                            ], style={"display": "flex", "alignItems": "center"})
+                        ], style={"color": "#fff", "fontSize": "1rem"})
+                    ], md=8),
+                    dbc.Col([
+                        html.Div([
+                            responsive_image("UPLB.png", sizes="120px", height="120px", style={"marginRight": "16px"}),
+                            responsive_image("upmo.png", sizes="120px", height="120px"),
+                        ], style={"display": "flex", "justifyContent": "flex-end", "alignItems": "center", "height": "100%"})
+                    ], md=4)
+                ], className="py-4")
+            ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px"})
+        ], style={"backgroundColor": "#00563F", "marginTop": "40px", "borderTop": "4px solid #eaeaea", "paddingLeft": "64px", "paddingRight": "64px"})
+        ], style={"backgroundColor": "#eaeaea", "minHeight": "100vh"})
 @callback(
     Output("stock-line-chart", "figure"),
     Output("obsolete-pie-chart", "figure"),
-    [Input("chart-year-dropdown", "value"), Input("chart-category-dropdown", "value")]
+    [Input("chart-year-dropdown", "value"), Input("chart-category-dropdown", "value")],
+    prevent_initial_call=True
 )
+@cached_figure(periods=('chart_year',))
 def update_line_and_pie_chart(chart_year, chart_category):
+    import plotly.express as px
     year_val = chart_year if chart_year else 2023
     cat_val = chart_category if chart_category else "buildings"
     conn = get_db_connection()
     line_query = '''
-        SELECT d.Month, SUM(f.StockOnHand) AS total_stock
+        SELECT f.Month, SUM(f.StockOnHand) AS total_stock
         FROM Job_Request_Fact_Table f
         JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
-        JOIN Date_Dimension d ON f.DateKey = d.DateKey
-        WHERE d.Year = ? AND LOWER(i.Category) = ?
-        GROUP BY d.Month
-        ORDER BY d.Month
+        WHERE f.Year = ? AND LOWER(i.Category) = ?
+        GROUP BY f.Month
+        ORDER BY f.Month
     '''
-    line_df = pd.read_sql_query(line_query, conn, params=[year_val, cat_val])
+    totals = dict(query_all(line_query, [year_val, cat_val], conn))
     months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    month_map = {i+1: m for i, m in enumerate(months)}
-    line_df["MonthName"] = line_df["Month"].map(month_map)
-    all_months_df = pd.DataFrame({"Month": range(1,13), "MonthName": months})
-    line_df = pd.merge(all_months_df, line_df, on=["Month", "MonthName"], how="left").fillna({"total_stock": 0})
-    line_fig = px.line(line_df, x="MonthName", y="total_stock", title=f"Total Stock per Month in {year_val} ({cat_val.title()})", markers=True, labels={"total_stock": "Total Stock", "MonthName": "Month"})
+    line_data = {"MonthName": months, "total_stock": [totals.get(month, 0) for month in range(1, 13)]}
+    with span("figure"):
+        line_fig = px.line(line_data, x="MonthName", y="total_stock", title=f"Total Stock per Month in {year_val} ({cat_val.title()})", markers=True, labels={"total_stock": "Total Stock", "MonthName": "Month"})
     pie_query = '''
         SELECT i.ObsoleteFlag, COUNT(DISTINCT i.SKU) AS count
         FROM Item_Dimension i
         JOIN Job_Request_Fact_Table f ON i.ItemKey = f.ItemKey
-        JOIN Date_Dimension d ON f.DateKey = d.DateKey
-        WHERE d.Year = ? AND LOWER(i.Category) = ?
+        WHERE f.Year = ? AND LOWER(i.Category) = ?
         GROUP BY i.ObsoleteFlag
     '''
-    pie_df = pd.read_sql_query(pie_query, conn, params=[year_val, cat_val])
-    conn.close()
     pie_labels = ["Active", "Obsolete"]
     pie_counts = [0, 0]
-    for _, row in pie_df.iterrows():
-        if row["ObsoleteFlag"] == 1:
-            pie_counts[1] = row["count"]
-        else:
-            pie_counts[0] = row["count"]
-    pie_fig = go.Figure(data=[go.Pie(labels=pie_labels, values=pie_counts, hole=0.4)])
-    pie_fig.update_layout(title=f"Obsolete vs Active Items in {year_val} ({cat_val.title()})")
+    for obsolete_flag, count in query_all(pie_query, [year_val, cat_val], conn):
+        pie_counts[1 if obsolete_flag == 1 else 0] = count
+    conn.close()
+    with span("figure"):
+        pie_fig = go.Figure(data=[go.Pie(labels=pie_labels, values=pie_counts, hole=0.4)])
+        pie_fig.update_layout(title=f"Obsolete vs Active Items in {year_val} ({cat_val.title()})")
     return line_fig, pie_fig
 
 @callback(
+    Output("inventory-range-chart", "figure"),
+    Output("inventory-rolling-chart", "figure"),
+    [Input("inventory-range-slider", "value"), Input("inventory-range-category-dropdown", "value")],
+    prevent_initial_call=True
+)
+@cached_figure
+def update_inventory_range_charts(period_range, selected_category):
+    """Chart stockouts for any month range from the prefix index, plus trailing stock and demand windows."""
+    import plotly.express as px
+    index = get_prefix_index()
+    start, end = index.clamp(*(period_range or [None, None]))
+    category = normalize_inventory_filters("all", selected_category)[1]
+    categories = None if "all" in category else category
+    mask = index.series_mask(categories)
+    # One category at a time is drilled down to its SKUs.
+    labels = index.skus if categories and len(categories) == 1 else index.categories
+    stockouts = PREFIX_METRICS.index("StockoutEvents")
+    totals = sorted(
+        ((str(label), int(row[stockouts])) for label, row in index.group_totals(labels, start, end, mask).items()),
+        key=lambda item: item[1]
+    )
+    series = "SKU" if labels is index.skus else "Category"
+    with span("figure"):
+        range_fig = px.bar(
+            {series: [label if series == "SKU" else label.title() for label, _ in totals], "Stockouts": [count for _, count in totals]},
+            x="Stockouts",
+            y=series,
+            orientation="h",
+            title=f"Stockout Events by {series}, {period_label(start)} to {period_label(end)}",
+            labels={"Stockouts": "Stockout Events"}
+        )
+        range_fig.update_yaxes(type="category")
+        rolling_fig = rolling_window_figure(
+            index, end, mask,
+            [("StockOnHand", "Stock on Hand"), ("ForecastQty", "Forecast Qty"), ("RequestedQty", "Requested Qty")],
+            "Trailing Stock and Demand"
+        )
+    return range_fig, rolling_fig
+
+@background_callback(
     Output("inventory-bar-chart", "figure"),
-    [Input("year-dropdown", "value"), Input("category-dropdown", "value")]
+    [Input("year-dropdown", "value"), Input("category-dropdown", "value")],
+    progress_id="inventory-progress",
+    prevent_initial_call=True
 )
+@cached_figure
 def update_inventory_chart(selected_year, selected_category):
-    year_options = [2019, 2020, 2021, 2022, 2023]
-    year = selected_year if isinstance(selected_year, list) else [selected_year]
-    category = selected_category if isinstance(selected_category, list) else [selected_category]
-    if sorted([int(y) for y in year if y != "all" and y is not None]) == year_options:
-        year = ["all"]
-    if not year or year == []:
-        year = ["all"]
-    if not category or category == []:
-        category = ["all"]
+    import plotly.express as px
+    year, category = normalize_inventory_filters(selected_year, selected_category)
+    report_progress(1, 2, "Loading inventory")
     df_failure = get_filtered_inventory_failure_data(year, category)
-    fig_failure = px.bar(
-        df_failure,
-        x='InventoryFailureFrequency',
-        y='SKU',
-        color='Category',
-        orientation='h',
-        title='Overstocking or Obselescence by SKU and Category',
-        labels={'InventoryFailureFrequency': 'Failure Frequency'}
-    )
-    fig_failure.update_yaxes(type='category')
+    report_progress(2, 2, "Drawing chart")
+    with span("figure"):
+        fig_failure = px.bar(
+            df_failure,
+            x='InventoryFailureFrequency',
+            y='SKU',
+            color='Category',
+            orientation='h',
+            title='Overstocking or Obselescence by SKU and Category',
+            labels={'InventoryFailureFrequency': 'Failure Frequency'}
+        )
+        fig_failure.update_yaxes(type='category')
     return fig_failure
 
-@callback(
+@background_callback(
     Output("forecasted-demand-chart", "figure"),
-    [Input("forecasted-year-dropdown", "value"), Input("forecasted-category-dropdown", "value")]
+    [Input("forecasted-year-dropdown", "value"), Input("forecasted-category-dropdown", "value")],
+    progress_id="forecasted-progress",
+    prevent_initial_call=True
 )
+@cached_figure(periods=('selected_year',))
 def update_forecasted_demand_chart(selected_year, selected_category):
+    import pandas as pd
+    import plotly.express as px
     category = selected_category if isinstance(selected_category, list) else [selected_category]
     if not category or category == []:
         category = ["all"]
@@ -635,23 +648,26 @@ def update_forecasted_demand_chart(selected_year, selected_category):
     else:
         if forecast_categories is None:
             forecast_categories = [None]
-        for c in forecast_categories:
+        for i, c in enumerate(forecast_categories):
+            report_progress(i, len(forecast_categories), f"Loading {c.title() if c else 'all categories'}")
             df = get_forecasted_demand_data(forecast_years, c)
             combined_forecast_df = pd.concat([combined_forecast_df, df], ignore_index=True)
         if not combined_forecast_df.empty:
-            combined_forecast_df = combined_forecast_df.groupby(["SKU", "Category"], as_index=False)["TotalForecastedQty"].sum()
-            combined_forecast_df = combined_forecast_df.sort_values("TotalForecastedQty", ascending=False).head(5)
+            with span("pandas"):
+                combined_forecast_df = combined_forecast_df.groupby(["SKU", "Category"], as_index=False)["TotalForecastedQty"].sum()
+                combined_forecast_df = combined_forecast_df.sort_values("TotalForecastedQty", ascending=False).head(5)
 
-    fig_forecast = px.bar(
-        combined_forecast_df,
-        x='TotalForecastedQty',
-        y='SKU',
-        color='Category',
-        orientation='h',
-        title='Forecasted Demand by SKU and Category',
-        labels={'TotalForecastedQty': 'Forecasted Qty'}
-    )
-    fig_forecast.update_yaxes(type='category')
+    with span("figure"):
+        fig_forecast = px.bar(
+            combined_forecast_df,
+            x='TotalForecastedQty',
+            y='SKU',
+            color='Category',
+            orientation='h',
+            title='Forecasted Demand by SKU and Category',
+            labels={'TotalForecastedQty': 'Forecasted Qty'}
+        )
+        fig_forecast.update_yaxes(type='category')
     return fig_forecast
 
 @callback(
@@ -659,15 +675,11 @@ def update_forecasted_demand_chart(selected_year, selected_category):
     Output("metric-total-stock", "children"),
     Output("metric-total-stockouts", "children"),
     Output("metric-total-obsoletes", "children"),
-    [Input("year-dropdown", "value"), Input("category-dropdown", "value")]
+    [Input("year-dropdown", "value"), Input("category-dropdown", "value")],
+    prevent_initial_call=True
 )
 def update_metrics(selected_year, selected_category):
-    year = selected_year if isinstance(selected_year, list) else [selected_year]
-    category = selected_category if isinstance(selected_category, list) else [selected_category]
-    if not year or year == []:
-        year = ["all"]
-    if not category or category == []:
-        category = ["all"]
+    year, category = normalize_inventory_filters(selected_year, selected_category)
     total_skus, total_stock, total_stockouts, total_obsoletes = get_inventory_metrics(year, category)
     return f"{total_skus:,}", f"{total_stock:,}", f"{total_stockouts:,}", f"{total_obsoletes:,}"
 
@@ -1,18 +1,36 @@
+import os
+
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
-from dash import Input, Output, callback
-from db_utils import get_db_connection
+from dash import ClientsideFunction, Input, Output, State, callback, clientside_callback
+from db_utils import AGGREGATE_TABLE, get_data_version, get_db_connection, borrow_connection, in_filter, query_all, query_column, query_one, read_sql_query
+from cache_utils import cached, cached_figure, data_context
+from background_utils import background_callback, report_progress
+from figure_utils import MAX_FIGURE_SERIES, top_n_with_other
+from range_utils import PREFIX_METRICS, get_prefix_index, period_label, rolling_window_figure, slider_marks
+from asset_utils import responsive_image
+from trace_utils import span
 
 dash.register_page(__name__, path="/operations", name="Operations Dashboard")
 
+# The Operations filters run in the browser (assets/operations.js) over the monthly aggregate,
+# unless it has more rows than this; then every change is answered by the server callbacks.
+CLIENTSIDE_MAX_ROWS = int(os.environ.get('DASHBOARD_CLIENTSIDE_MAX_ROWS', 20000))
+# How often an open page asks for the data version, so it stops filtering an aggregate
+# that a publish or an ingested batch has replaced.
+VERSION_POLL_SECONDS = 60
+RANKING_COLOR = "#8D1436"
+# Bars of the SKUs not picked on the consumption pie.
+RANKING_MUTED_COLOR = "#D9B3BE"
+# How far the picked pie slice is pulled out, as a fraction of the radius.
+SELECTED_SLICE_PULL = 0.1
+
 header = dbc.Navbar(
     dbc.Container([
         dbc.NavbarBrand(
             html.Div([
-                html.Img(src="/assets/upmo.png", height="40px", style={"marginRight": "12px"}),
+                responsive_image("upmo.png", sizes="40px", height="40px", style={"marginRight": "12px"}),
                 html.Span("UPMO Intelligence", className="fw-bold fs-3")
             ], style={"display": "flex", "alignItems": "center"})
         ),
@@ -28,20 +46,143 @@ header = dbc.Navbar(
     style={"position": "sticky", "top": "0", "zIndex": "1000"}
 )
 
-@callback(
-    Output("total-issued-qty-display", "children"),
-    [Input("ops-year-dropdown", "value"),
-     Input("ops-month-dropdown", "value"),
-     Input("ops-category-dropdown", "value")]
-)
 def display_total_issued_qty(selected_year, selected_month, selected_category):
     year = None if selected_year == "all" else selected_year
     month = None if selected_month == "all" else selected_month
     category = None if selected_category == "all" else selected_category
-    df = get_consumption_rate_data(year, month, category)
-    total = df["TotalIssuedQty"].sum() if not df.empty else 0
+    total = get_total_issued_qty(year, month, category)
     return f"Total Issued Qty: {total:,}" if total else "No data available."
 
+@cached(periods=('year', 'month'))
+def get_total_issued_qty(year=None, month=None, category=None):
+    """Return the issued quantity for the filters, summed from the monthly aggregate."""
+    params = []
+    query = '''
+        SELECT COALESCE(SUM(IssuedQty), 0)
+        FROM Monthly_SKU_Aggregate
+        WHERE 1=1
+    '''
+    if year:
+        query += ' AND Year = ?'
+        params.append(year)
+    if month and month != "all":
+        query += ' AND Month = ?'
+        params.append(month)
+    if category and category != "all":
+        query += ' AND LOWER(Category) = ?'
+        params.append(category.lower())
+    return query_one(query, params)[0]
+
+@cached
+def get_operations_aggregate(max_rows=CLIENTSIDE_MAX_ROWS):
+    """Return the monthly issued and requested totals per SKU for the browser to filter.
+
+    Rows are sent column by column, with each SKU as an index into items, so the
+    payload is a few integer arrays. Above max_rows only the version is
+    returned, with fallback set.
+    """
+    version = get_data_version()
+    if query_one(f"SELECT COUNT(*) FROM {AGGREGATE_TABLE}")[0] > max_rows:
+        return {"version": version, "fallback": True}
+    rows = query_all(f'''
+        SELECT Category, SKU, Year, Month, IssuedQty, RequestedQty
+        FROM {AGGREGATE_TABLE}
+        ORDER BY Category, SKU, Year, Month
+    ''')
+    categories = sorted({row[0] for row in rows})
+    category_codes = {category: code for code, category in enumerate(categories)}
+    items = list(dict.fromkeys((row[0], row[1]) for row in rows))
+    item_codes = {item: code for code, item in enumerate(items)}
+    return {
+        "version": version,
+        "maxSeries": MAX_FIGURE_SERIES,
+        "categories": categories,
+        "items": [[category_codes[category], sku] for category, sku in items],
+        "item": [item_codes[row[0], row[1]] for row in rows],
+        "year": [row[2] for row in rows],
+        "month": [row[3] for row in rows],
+        "issued": [row[4] for row in rows],
+        "requested": [int(row[5]) if float(row[5]).is_integer() else row[5] for row in rows],
+    }
+
+@callback(
+    Output("ops-aggregate-store", "data"),
+    Input("ops-aggregate-request", "data"),
+    prevent_initial_call=True
+)
+def load_operations_aggregate(version):
+    return get_operations_aggregate()
+
+@callback(
+    Output("ops-aggregate-version", "data"),
+    Input("ops-version-poll", "n_intervals"),
+    State("ops-aggregate-version", "data"),
+    prevent_initial_call=True
+)
+def poll_data_version(n_intervals, current):
+    version = get_data_version()
+    return dash.no_update if version == current else version
+
+clientside_callback(
+    ClientsideFunction(namespace="operations", function_name="requestAggregate"),
+    Output("ops-aggregate-request", "data"),
+    Input("ops-aggregate-version", "data"),
+    Input("ops-aggregate-store", "modified_timestamp"),
+    State("ops-aggregate-store", "data"),
+    State("ops-aggregate-request", "data"),
+)
+
+clientside_callback(
+    ClientsideFunction(namespace="operations", function_name="updateCharts"),
+    Output("consumption-rate-chart", "figure"),
+    Output("sku-ranking-chart", "figure"),
+    Output("total-issued-qty-display", "children"),
+    Output("ops-pie-selection", "data"),
+    Output("consumption-rate-chart", "clickData"),
+    Output("ops-server-filters", "data"),
+    Input("ops-year-dropdown", "value"),
+    Input("ops-month-dropdown", "value"),
+    Input("ops-category-dropdown", "value"),
+    Input("consumption-rate-chart", "clickData"),
+    Input("ops-aggregate-store", "data"),
+    State("ops-pie-selection", "data"),
+    State("ops-aggregate-version", "data"),
+    State("consumption-rate-chart", "figure"),
+    State("sku-ranking-chart", "figure"),
+    prevent_initial_call=True
+)
+
+clientside_callback(
+    ClientsideFunction(namespace="operations", function_name="applyServerResult"),
+    Output("consumption-rate-chart", "figure", allow_duplicate=True),
+    Output("sku-ranking-chart", "figure", allow_duplicate=True),
+    Output("total-issued-qty-display", "children", allow_duplicate=True),
+    Input("ops-server-charts", "data"),
+    Input("ops-server-total", "data"),
+    State("ops-server-filters", "data"),
+    State("ops-aggregate-store", "data"),
+    prevent_initial_call=True
+)
+
+def server_result(filters, **result):
+    """Tag a fallback result with the filters it answers and the data version current when it was answered.
+
+    The filters carry the page's data version, and the browser draws the result
+    only while they are still its filters and it has no aggregate to filter, so
+    an answer that lands after the filters changed or the aggregate arrived is dropped.
+    """
+    return {"filters": filters, "version": get_data_version(), **result}
+
+@callback(
+    Output("ops-server-total", "data"),
+    Input("ops-server-filters", "data"),
+    prevent_initial_call=True
+)
+def update_total_issued_on_server(filters):
+    """Fallback for the browser's total when it has no aggregate to filter."""
+    return server_result(filters, total=display_total_issued_qty(filters["year"], filters["month"], filters["category"]))
+
+@cached(periods=('year', 'month'))
 def get_section_requests_data(year=None, month=None, category=None, skus=None):
     conn = get_db_connection()
     params = []
@@ -50,34 +191,34 @@ def get_section_requests_data(year=None, month=None, category=None, skus=None):
         FROM Job_Request_Fact_Table F
         JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
         JOIN Section_Dimension S ON F.SectionKey = S.SectionKey
-        JOIN Date_Dimension D ON F.DateKey = D.DateKey
         WHERE 1=1
     '''
     if year:
-        query += ' AND D.Year = ?'
+        query += ' AND F.Year = ?'
         params.append(year)
     if month and month != "all":
-        query += ' AND D.Month = ?'
+        query += ' AND F.Month = ?'
         params.append(month)
     if category and category != "all":
         query += ' AND LOWER(I.Category) = ?'
         params.append(category.lower())
     if skus and skus != ["all"]:
-        sku_placeholders = ','.join(['?'] * len(skus))
-        query += f' AND I.SKU IN ({sku_placeholders})'
-        params.extend(skus)
+        sku_clause, sku_params = in_filter(conn, "I.SKU", skus)
+        query += sku_clause
+        params.extend(sku_params)
     query += '''
         GROUP BY S.Section, I.Category, I.SKU
         ORDER BY TotalRequestedQty DESC
     '''
-    df = pd.read_sql_query(query, conn, params=params)
+    df = read_sql_query(query, conn, params=params)
     conn.close()
     return df
 @callback(
     Output("section-sku-dropdown", "options"),
     Output("section-sku-dropdown", "value"),
     Output("section-sku-dropdown", "disabled"),
-    [Input("section-category-dropdown", "value")]
+    [Input("section-category-dropdown", "value")],
+    prevent_initial_call=True
 )
 def update_section_sku_dropdown(selected_category):
     conn = get_db_connection()
@@ -86,56 +227,54 @@ def update_section_sku_dropdown(selected_category):
         value = "all"
         disabled = True
     else:
-        df = pd.read_sql_query("SELECT SKU FROM Item_Dimension WHERE LOWER(Category) = ?", conn, params=[selected_category])
-        sku_list = sorted(set(df["SKU"].tolist()))
+        sku_list = sorted(set(query_column("SELECT SKU FROM Item_Dimension WHERE LOWER(Category) = ?", [selected_category], conn)))
         options = [{"label": sku, "value": sku} for sku in sku_list]
         value = sku_list
         disabled = False
     conn.close()
     return options, value, disabled
-@callback(
+@background_callback(
     Output("section-requests-chart", "figure"),
     [Input("section-year-dropdown", "value"),
      Input("section-month-dropdown", "value"),
      Input("section-category-dropdown", "value"),
-     Input("section-sku-dropdown", "value")]
+     Input("section-sku-dropdown", "value")],
+    progress_id="section-progress",
+    prevent_initial_call=True
 )
+@cached_figure(periods=('selected_year', 'selected_month'))
 def update_section_requests_chart(selected_year, selected_month, selected_category, selected_skus):
+    import plotly.express as px
     year = None if selected_year == "all" else selected_year
     month = None if selected_month == "all" else selected_month
     category = None if selected_category == "all" else selected_category
-    if selected_category == "all":
+    if selected_category == "all" or not selected_skus or selected_skus == "all":
+        # Every SKU of the category is already covered by the category filter.
         skus = ["all"]
-    elif not selected_skus or selected_skus == []:
-        conn = get_db_connection()
-        df = pd.read_sql_query("SELECT SKU FROM Item_Dimension WHERE LOWER(Category) = ?", conn, params=[selected_category])
-        skus = df["SKU"].tolist()
-        conn.close()
-    elif selected_skus == "all":
-        conn = get_db_connection()
-        df = pd.read_sql_query("SELECT SKU FROM Item_Dimension WHERE LOWER(Category) = ?", conn, params=[selected_category])
-        skus = df["SKU"].tolist()
-        conn.close()
     else:
-        skus = selected_skus if isinstance(selected_skus, list) else [selected_skus]
+        skus = sorted(selected_skus) if isinstance(selected_skus, list) else [selected_skus]
+    report_progress(1, 2, "Loading section requests")
     df = get_section_requests_data(year, month, category, skus)
-    if df.empty:
-        fig = px.bar(title="No data available for selected filters")
-    else:
-        fig = px.bar(
-            df,
-            x="TotalRequestedQty",
-            y="Section",
-            color="SKU" if category and category != "all" else "Category",
-            orientation="h",
-            title="Section Requests by Amount",
-            labels={"TotalRequestedQty": "Total Requested Qty"}
-        )
-        fig.update_yaxes(type="category")
+    report_progress(2, 2, "Drawing chart")
+    with span("figure"):
+        if df.empty:
+            fig = px.bar(title="No data available for selected filters")
+        else:
+            series = "SKU" if category and category != "all" else "Category"
+            df = top_n_with_other(df, series, "TotalRequestedQty", by=["Section", "Category"] if series == "SKU" else ["Section"])
+            fig = px.bar(
+                df,
+                x="TotalRequestedQty",
+                y="Section",
+                color=series,
+                orientation="h",
+                title="Section Requests by Amount",
+                labels={"TotalRequestedQty": "Total Requested Qty"}
+            )
+            fig.update_yaxes(type="category")
     return fig
 
-def get_consumption_rate_data(year=None, month=None, category=None):
-    conn = get_db_connection()
+def get_consumption_rate_data(year=None, month=None, category=None, conn=None):
     params = []
     if category and category != "all":
         query = '''
@@ -145,7 +284,6 @@ def get_consumption_rate_data(year=None, month=None, category=None):
             SUM(F.IssuedQty) AS TotalIssuedQty
         FROM Job_Request_Fact_Table F
         JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
-        JOIN Date_Dimension D ON F.DateKey = D.DateKey
         WHERE 1=1
         '''
     else:
@@ -155,14 +293,13 @@ def get_consumption_rate_data(year=None, month=None, category=None):
             SUM(F.IssuedQty) AS TotalIssuedQty
         FROM Job_Request_Fact_Table F
         JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
-        JOIN Date_Dimension D ON F.DateKey = D.DateKey
         WHERE 1=1
         '''
     if year:
-        query += ' AND D.Year = ?'
+        query += ' AND F.Year = ?'
         params.append(year)
     if month and month != "all":
-        query += ' AND D.Month = ?'
+        query += ' AND F.Month = ?'
         params.append(month)
     if category and category != "all":
         query += ' AND LOWER(I.Category) = ?'
@@ -176,12 +313,11 @@ def get_consumption_rate_data(year=None, month=None, category=None):
         GROUP BY I.Category
         ORDER BY TotalIssuedQty 
         '''
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    with borrow_connection(conn) as conn:
+        df = read_sql_query(query, conn, params=params)
     return df
 
-def get_ranked_sku_data(year=None, month=None, category=None):
-    conn = get_db_connection()
+def get_ranked_sku_data(year=None, month=None, category=None, conn=None):
     params = []
     if category and category != "all":
         query = '''
@@ -192,14 +328,13 @@ def get_ranked_sku_data(year=None, month=None, category=None):
             ROW_NUMBER() OVER(PARTITION BY I.Category ORDER BY SUM(F.RequestedQty) DESC) AS CategoryRank
         FROM Job_Request_Fact_Table F
         JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
-        JOIN Date_Dimension D ON F.DateKey = D.DateKey
         WHERE 1=1
         '''
         if year:
-            query += ' AND D.Year = ?'
+            query += ' AND F.Year = ?'
             params.append(year)
         if month and month != "all":
-            query += ' AND D.Month = ?'
+            query += ' AND F.Month = ?'
             params.append(month)
         query += ' AND LOWER(I.Category) = ?'
         params.append(category.lower())
@@ -216,312 +351,434 @@ def get_ranked_sku_data(year=None, month=None, category=None):
             ROW_NUMBER() OVER(ORDER BY SUM(F.RequestedQty) DESC) AS OverallRank
         FROM Job_Request_Fact_Table F
         JOIN Item_Dimension I ON F.ItemKey = I.ItemKey
-        JOIN Date_Dimension D ON F.DateKey = D.DateKey
         WHERE 1=1
         '''
         if year:
-            query += ' AND D.Year = ?'
+            query += ' AND F.Year = ?'
             params.append(year)
         if month and month != "all":
-            query += ' AND D.Month = ?'
+            query += ' AND F.Month = ?'
             params.append(month)
         query += '''
         GROUP BY I.Category, I.SKU
         ORDER BY OverallRank
         LIMIT 5
         '''
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
+    with borrow_connection(conn) as conn:
+        df = read_sql_query(query, conn, params=params)
     return df
 
-layout = html.Div([
-    header,
-    dbc.Container([
-        dbc.Row([
-            dbc.Col([
-                html.H2("Dashboard", className="fw-bold mb-4 d-inline-block mb-0"),
-            ], md=6),
-            dbc.Col([
-                dbc.ButtonGroup([
-                    dbc.Button("Inventory", href="/inventory", color="primary", disabled=False),
-                    dbc.Button("Forecasting", href="/forecasting", color="primary", disabled=False),
-                    dbc.Button("Operations", href="/operations", color="primary", disabled=True),
-                    dbc.Button("Planning", href="/planning", color="primary", disabled=False),
-                ], size="md"),
-            ], md=6, className="d-flex align-items-center justify-content-end"),
-        ], className="mb-2", style={"paddingTop": "32px"}),
-        html.Div([
+@data_context(periods=('year', 'month'))
+def load_operations_data(year=None, month=None, category=None):
+    """Fetch every dataset behind the Operations filters over one connection."""
+    with borrow_connection() as conn:
+        return {
+            "consumption": get_consumption_rate_data(year, month, category, conn),
+            "ranking": get_ranked_sku_data(year, month, category, conn),
+        }
+
+def layout(**kwargs):
+    # Render the default filter state server-side so first paint needs no callback round trips.
+    total_issued = display_total_issued_qty("all", "all", "all")
+    consumption_fig, ranking_fig = update_operations_charts("all", "all", "all")
+    section_fig = update_section_requests_chart("all", "all", "all", "all")
+    index = get_prefix_index()
+    range_fig, rolling_fig = update_ops_range_charts([index.first, index.last], "all")
+    return html.Div([
+        header,
+        dbc.Container([
+            dbc.Row([
+                dbc.Col([
+                    html.H2("Dashboard", className="fw-bold mb-4 d-inline-block mb-0"),
+                ], md=6),
+                dbc.Col([
+                    dbc.ButtonGroup([
+                        dbc.Button("Inventory", href="/inventory", color="primary", disabled=False),
+                        dbc.Button("Forecasting", href="/forecasting", color="primary", disabled=False),
+                        dbc.Button("Operations", href="/operations", color="primary", disabled=True),
+                        dbc.Button("Planning", href="/planning", color="primary", disabled=False),
+                    ], size="md"),
+                ], md=6, className="d-flex align-items-center justify-content-end"),
+            ], className="mb-2", style={"paddingTop": "32px"}),
             html.Div([
-                html.Img(src="/assets/kwek.jpg", style={
-                    "width": "100vw",
-                    "height": "440px",
-                    "objectFit": "cover",
-                    "position": "relative",
-                    "left": "50%",
-                    "transform": "translateX(-50%)"
-                }),
-                html.Div(style={
-                    "position": "absolute",
-                    "top": "0",
-                    "left": "0",
-                    "width": "100vw",
-                    "height": "440px",
-                    "background": "rgba(0,0,0,0.65)",
-                    "zIndex": "1"
-                }),
                 html.Div([
-                    html.Div("OPERATIONS", style={
-                        "color": "#fff",
-                        "fontSize": "3rem",
-                        "fontWeight": "bold",
-                        "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
-                        "letterSpacing": "0.12em",
-                        "width": "100%",
-                        "marginBottom": "12px",
-                        "display": "flex",
-                        "justifyContent": "center",
-                        "alignItems": "center",
-                        "textAlign": "center"
+                    responsive_image("kwek.jpg", sizes="100vw", style={
+                        "width": "100vw",
+                        "height": "440px",
+                        "objectFit": "cover",
+                        "position": "relative",
+                        "left": "50%",
+                        "transform": "translateX(-50%)"
                     }),
-                    html.Hr(style={
-                        "width": "60%",
-                        "borderColor": "#fff",
-                        "opacity": "0.7",
-                        "margin": "12px auto"
+                    html.Div(style={
+                        "position": "absolute",
+                        "top": "0",
+                        "left": "0",
+                        "width": "100vw",
+                        "height": "440px",
+                        "background": "rgba(0,0,0,0.65)",
+                        "zIndex": "1"
                     }),
                     html.Div([
-                        "Track service delivery, monitor material consumption, and analyze operational performance across units.", html.Br(),
-                        "This dashboard provides actionable insights for efficient resource management and continuous improvement."
-                    ],
-                        style={
+                        html.Div("OPERATIONS", style={
                             "color": "#fff",
-                            "fontSize": "1.1rem",
-                            "width": "100%",
+                            "fontSize": "3rem",
+                            "fontWeight": "bold",
                             "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
+                            "letterSpacing": "0.12em",
+                            "width": "100%",
+                            "marginBottom": "12px",
                             "display": "flex",
                             "justifyContent": "center",
                             "alignItems": "center",
                             "textAlign": "center"
-                        }
-                    )
+                        }),
+                        html.Hr(style={
+                            "width": "60%",
+                            "borderColor": "#fff",
+                            "opacity": "0.7",
+                            "margin": "12px auto"
+                        }),
+                        html.Div([
+                            "Track service delivery, monitor material consumption, and analyze operational performance across units.", html.Br(),
+                            "This dashboard provides actionable insights for efficient resource management and continuous improvement."
+                        ],
+                            style={
+                                "color": "#fff",
+                                "fontSize": "1.1rem",
+                                "width": "100%",
+                                "textShadow": "0 2px 8px rgba(0,0,0,0.32)",
+                                "display": "flex",
+                                "justifyContent": "center",
+                                "alignItems": "center",
+                                "textAlign": "center"
+                            }
+                        )
+                    ], style={
+                        "position": "absolute",
+                        "top": "0",
+                        "left": "0",
+                        "width": "100vw",
+                        "height": "440px",
+                        "display": "flex",
+                        "flexDirection": "column",
+                        "justifyContent": "center",
+                        "alignItems": "center",
+                        "zIndex": "2"
+                    })
                 ], style={
-                    "position": "absolute",
-                    "top": "0",
-                    "left": "0",
+                    "position": "relative",
                     "width": "100vw",
-                    "height": "440px",
-                    "display": "flex",
-                    "flexDirection": "column",
-                    "justifyContent": "center",
-                    "alignItems": "center",
-                    "zIndex": "2"
-                })
-            ], style={
-                "position": "relative",
-                "width": "100vw",
-                "marginBottom": "8px",
-                "left": "50%",
-                "transform": "translateX(-50%)"
-            }),
-        ]),
-        dbc.Card(
-            dbc.CardBody([
-                html.H4("Operations", className="mt-4"),
-                dbc.Row([
-                    dbc.Col([
-                        html.Label("Filter by Year"),
-                        dcc.Dropdown(
-                            id="ops-year-dropdown",
-                            options=[{"label": "All Years", "value": "all"}] + [{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
-                            value="all",
-                            placeholder="Select Year"
-                        ),
-                    ], md=4),
-                    dbc.Col([
-                        html.Label("Filter by Month"),
-                        dcc.Dropdown(
-                            id="ops-month-dropdown",
-                            options=[{"label": "All Months", "value": "all"}] + [
-                                {"label": name, "value": num} for num, name in enumerate([
-                                    "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"
-                                ], 1)
-                            ],
-                            value="all",
-                            multi=False,
-                            placeholder="Select Month"
-                        ),
-                    ], md=4),
-                    dbc.Col([
-                        html.Label("Filter by Category"),
-                        dcc.Dropdown(
-                            id="ops-category-dropdown",
-                            options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
-                            value="all",
-                            placeholder="Select Category"
-                        ),
-                    ], md=4),
-                ], className="mb-4"),
-                dbc.Row([
-                    dbc.Col([
-                        dbc.Card([
-                            dbc.CardBody([
-                                dcc.Graph(id="consumption-rate-chart", style={"height": "400px"}),
-                                html.Div(id="total-issued-qty-display", style={"fontSize": "1rm", "marginTop": "12px"})
-                            ])
-                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)", "minHeight": "480px"}),
-                    ], md=6),
-                    dbc.Col([
-                        dbc.Card([
-                            dbc.CardBody([
-                                dcc.Graph(id="sku-ranking-chart", style={"height": "400px"})
-                            ])
-                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)", "minHeight": "480px"}),
-                    ], md=6),
-                ]),
+                    "marginBottom": "8px",
+                    "left": "50%",
+                    "transform": "translateX(-50%)"
+                }),
+            ]),
+            dbc.Card(
+                dbc.CardBody([
+                    html.H4("Operations", className="mt-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Filter by Year"),
+                            dcc.Dropdown(
+                                id="ops-year-dropdown",
+                                options=[{"label": "All Years", "value": "all"}] + [{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
+                                value="all",
+                                placeholder="Select Year"
+                            ),
+                        ], md=4),
+                        dbc.Col([
+                            html.Label("Filter by Month"),
+                            dcc.Dropdown(
+                                id="ops-month-dropdown",
+                                options=[{"label": "All Months", "value": "all"}] + [
+                                    {"label": name, "value": num} for num, name in enumerate([
+                                        "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"
+                                    ], 1)
+                                ],
+                                value="all",
+                                multi=False,
+                                placeholder="Select Month"
+                            ),
+                        ], md=4),
+                        dbc.Col([
+                            html.Label("Filter by Category"),
+                            dcc.Dropdown(
+                                id="ops-category-dropdown",
+                                options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                value="all",
+                                placeholder="Select Category"
+                            ),
+                        ], md=4),
+                    ], className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    dbc.Progress(id="ops-progress", value=0, striped=True, animated=True, style={"visibility": "hidden", "height": "14px"}, className="mb-2"),
+                                    dcc.Store(id="ops-aggregate-version", data=get_data_version()),
+                                    dcc.Interval(id="ops-version-poll", interval=VERSION_POLL_SECONDS * 1000),
+                                    dcc.Store(id="ops-aggregate-request"),
+                                    dcc.Store(id="ops-aggregate-store", storage_type="session"),
+                                    dcc.Store(id="ops-pie-selection"),
+                                    dcc.Store(id="ops-server-filters", data={"year": "all", "month": "all", "category": "all", "selection": None, "version": None}),
+                                    dcc.Store(id="ops-server-charts"),
+                                    dcc.Store(id="ops-server-total"),
+                                    dcc.Graph(id="consumption-rate-chart", figure=consumption_fig, style={"height": "400px"}),
+                                    html.Div(total_issued, id="total-issued-qty-display", style={"fontSize": "1rm", "marginTop": "12px"})
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)", "minHeight": "480px"}),
+                        ], md=6),
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    dcc.Graph(id="sku-ranking-chart", figure=ranking_fig, style={"height": "400px"})
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)", "minHeight": "480px"}),
+                        ], md=6),
+                    ]),
+                ])
+            ),
+            dbc.Card([
+                dbc.CardBody([
+                    html.H4("Section Requests by Amount", className="mt-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Year"),
+                            dcc.Dropdown(
+                                id="section-year-dropdown",
+                                options=[{"label": "All Years", "value": "all"}] + [{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
+                                value="all",
+                                placeholder="Select Year"
+                            ),
+                        ], md=3),
+                        dbc.Col([
+                            html.Label("Month"),
+                            dcc.Dropdown(
+                                id="section-month-dropdown",
+                                options=[{"label": "All Months", "value": "all"}] + [
+                                    {"label": name, "value": num} for num, name in enumerate([
+                                        "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"
+                                    ], 1)
+                                ],
+                                value="all",
+                                multi=False,
+                                placeholder="Select Month"
+                            ),
+                        ], md=3),
+                        dbc.Col([
+                            html.Label("Category"),
+                            dcc.Dropdown(
+                                id="section-category-dropdown",
+                                options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                value="all",
+                                placeholder="Select Category"
+                            ),
+                        ], md=3),
+                        dbc.Col([
+                            html.Label("SKU"),
+                            dcc.Dropdown(
+                                id="section-sku-dropdown",
+                                options=[{"label": "All SKUs", "value": "all"}],
+                                value="all",
+                                multi=True,
+                                placeholder="Select SKU(s)",
+                                disabled=True
+                            ),
+                        ], md=3),
+                    ], className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    dbc.Progress(id="section-progress", value=0, striped=True, animated=True, style={"visibility": "hidden", "height": "14px"}, className="mb-2"),
+                                    dcc.Graph(id="section-requests-chart", figure=section_fig, style={"height": "400px"})
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                        ], md=12),
+                    ]),
+                ])
+            ]),
+            dbc.Card([
+                dbc.CardBody([
+                    html.H4("Requests and Issues over a Date Range", className="mt-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            html.Label("Category"),
+                            dcc.Dropdown(
+                                id="ops-range-category-dropdown",
+                                options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
+                                value="all",
+                                placeholder="Select Category"
+                            ),
+                        ], md=3),
+                        dbc.Col([
+                            html.Label("Months"),
+                            dcc.RangeSlider(
+                                id="ops-range-slider",
+                                min=index.first,
+                                max=index.last,
+                                step=1,
+                                value=[index.first, index.last],
+                                marks=slider_marks(index),
+                                allowCross=False
+                            ),
+                        ], md=9),
+                    ], className="mb-4"),
+                    dbc.Row([
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    dcc.Graph(id="ops-range-chart", figure=range_fig, style={"height": "400px"})
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                        ], md=7),
+                        dbc.Col([
+                            dbc.Card([
+                                dbc.CardBody([
+                                    dcc.Graph(id="ops-rolling-chart", figure=rolling_fig, style={"height": "400px"})
+                                ])
+                            ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
+                        ], md=5),
+                    ]),
+                ])
             ])
-        ),
-        dbc.Card([
-            dbc.CardBody([
-                html.H4("Section Requests by Amount", className="mt-4"),
+        ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px", "backgroundColor": "#eaeaea"}),
+        html.Footer([
+            dbc.Container([
                 dbc.Row([
                     dbc.Col([
-                        html.Label("Year"),
-                        dcc.Dropdown(
-                            id="section-year-dropdown",
-                            options=[{"label": "All Years", "value": "all"}] + [{"label": str(x), "value": x} for x in [2019, 2020, 2021, 2022, 2023]],
-                            value="all",
-                            placeholder="Select Year"
-                        ),
-                    ], md=3),
-                    dbc.Col([
-                        html.Label("Month"),
-                        dcc.Dropdown(
-                            id="section-month-dropdown",
-                            options=[{"label": "All Months", "value": "all"}] + [
-                                {"label": name, "value": num} for num, name in enumerate([
-                                    "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"
-                                ], 1)
-                            ],
-                            value="all",
-                            multi=False,
-                            placeholder="Select Month"
-                        ),
-                    ], md=3),
-                    dbc.Col([
-                        html.Label("Category"),
-                        dcc.Dropdown(
-                            id="section-category-dropdown",
-                            options=[{"label": "All Categories", "value": "all"}] + [{"label": x, "value": x.lower()} for x in ["Buildings", "Custodial", "Electrical", "Grounds", "Landscaping", "Motorpool", "Office", "Plumbing", "Refrigeration"]],
-                            value="all",
-                            placeholder="Select Category"
-                        ),
-                    ], md=3),
-                    dbc.Col([
-                        html.Label("SKU"),
-                        dcc.Dropdown(
-                            id="section-sku-dropdown",
-                            options=[{"label": "All SKUs", "value": "all"}],
-                            value="all",
-                            multi=True,
-                            placeholder="Select SKU(s)",
-                            disabled=True
-                        ),
-                    ], md=3),
-                ], className="mb-4"),
-                dbc.Row([
+                        html.Div([
+                            html.Div("UPLB University Planning and Maintenance Office", className="fw-bold mb-1"),
+                            html.Div("UPMO Bldg, Rambutan Road,", className="mb-0"),
+                            html.Div("University of the Philippines Los Baños", className="mb-0"),
+                            html.Div("Batong Malake, Los Baños, Philippines 4031", className="mb-2"),
+                            html.Div([
+                                html.Span([
+                                    html.I(className="bi bi-telephone-fill me-2"),
+                                    "0917 882 2479"
+                                ], style={"marginRight": "24px"}),
+                                html.Span([
+                                    html.I(className="bi bi-envelope-fill me-2"),
+                                    "upmo.uplb@up.edu.ph"
+                                ])
+                            ], style={"display": "flex", "alignItems": "center"})
+                        ], style={"color": "#fff", "fontSize": "1rem"})
+                    ], md=8),
                     dbc.Col([
-                        dbc.Card([
-                            dbc.CardBody([
-                                dcc.Graph(id="section-requests-chart", style={"height": "400px"})
-                            ])
-                        ], style={"border": "3px solid #eaeaea", "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"}),
-                    ], md=12),
-                ]),
-            ])
-        ])
-    ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px", "backgroundColor": "#eaeaea"}),
-    html.Footer([
-        dbc.Container([
-            dbc.Row([
-                dbc.Col([
-                    html.Div([
-                        html.Div("UPLB University Planning and Maintenance Office", className="fw-bold mb-1"),
-                        html.Div("UPMO Bldg, Rambutan Road,", className="mb-0"),
-                        html.Div("University of the Philippines Los Baños", className="mb-0"),
-                        html.Div("Batong Malake, Los Baños, Philippines 4031", className="mb-2"),
                         html.Div([
-                            html.Span([
-                                html.I(className="bi bi-telephone-fill me-2"),
-                                "0917 882 2479"
-                            ], style={"marginRight": "24px"}),
-                            html.Span([
-                                html.I(className="bi bi-envelope-fill me-2"),
-                                "upmo.uplb@up.edu.ph"
-                            ])
-                        ], style={"display": "flex", "alignItems": "center"})
-                    ], style={"color": "#fff", "fontSize": "1rem"})
-                ], md=8),
-                dbc.Col([
-                    html.Div([
-                        html.Img(src="/assets/UPLB.png", height="120px", style={"marginRight": "16px"}),
-                        html.Img(src="/assets/upmo.png", height="120px"),
-                    ], style={"display": "flex", "justifyContent": "flex-end", "alignItems": "center", "height": "100%"})
-                ], md=4)
-            ], className="py-4")
-        ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px"})
-    ], style={"backgroundColor": "#00563F", "marginTop": "40px", "borderTop": "4px solid #eaeaea", "paddingLeft": "64px", "paddingRight": "64px"})
-    ], style={"backgroundColor": "#eaeaea", "minHeight": "100vh"})
+                            responsive_image("UPLB.png", sizes="120px", height="120px", style={"marginRight": "16px"}),
+                            responsive_image("upmo.png", sizes="120px", height="120px"),
+                        ], style={"display": "flex", "justifyContent": "flex-end", "alignItems": "center", "height": "100%"})
+                    ], md=4)
+                ], className="py-4")
+            ], fluid=True, style={"paddingLeft": "32px", "paddingRight": "32px"})
+        ], style={"backgroundColor": "#00563F", "marginTop": "40px", "borderTop": "4px solid #eaeaea", "paddingLeft": "64px", "paddingRight": "64px"})
+        ], style={"backgroundColor": "#eaeaea", "minHeight": "100vh"})
 
-@callback(
-	Output("consumption-rate-chart", "figure"),
-	Output("sku-ranking-chart", "figure"),
-	[Input("ops-year-dropdown", "value"),
-	 Input("ops-month-dropdown", "value"),
-	 Input("ops-category-dropdown", "value")]
-)
+@cached_figure(periods=('selected_year', 'selected_month'))
+def update_operations_charts(selected_year, selected_month, selected_category, selected_slice=None):
+    """Draw the consumption pie and demand ranking; selected_slice is the pie label picked, if any.
 
-def update_operations_charts(selected_year, selected_month, selected_category):
+    Picking a category narrows the ranking to it; picking a SKU highlights its bar.
+    """
+    import plotly.express as px
     year = None if selected_year == "all" else selected_year
     month = None if selected_month == "all" else selected_month
     category = None if selected_category == "all" else selected_category
-    df = get_consumption_rate_data(year, month, category)
-    if category:
-        fig1 = px.pie(
-            df,
-            names="SKU",
-            values="TotalIssuedQty",
-            title=f"Material Consumption Rate by SKU in {category.capitalize()}",
-        )
-    else:
-        fig1 = px.pie(
-            df,
-            names="Category",
-            values="TotalIssuedQty",
-            title="Material Consumption Rate by Category",
-        )
-    df2 = get_ranked_sku_data(year, month, category)
-    if category:
-        fig2 = px.bar(
-            df2,
-            x="TotalRequestedQty",
-            y="SKU",
-            orientation="h",
-            title=f"SKU Demand Ranking in {category.capitalize()}",
-            text="TotalRequestedQty",
-            labels={"TotalRequestedQty": "Total Requested Qty"},
-            color_discrete_sequence=["#8D1436"]
+    report_progress(1, 3, "Loading consumption")
+    data = load_operations_data(year, month, category)
+    df = data["consumption"]
+    ranking_category = category or (selected_slice.lower() if selected_slice else None)
+    report_progress(2, 3, "Drawing consumption chart")
+    with span("figure"):
+        if category:
+            fig1 = px.pie(
+                top_n_with_other(df, "SKU", "TotalIssuedQty"),
+                names="SKU",
+                values="TotalIssuedQty",
+                title=f"Material Consumption Rate by SKU in {category.capitalize()}",
+            )
+        else:
+            fig1 = px.pie(
+                df,
+                names="Category",
+                values="TotalIssuedQty",
+                title="Material Consumption Rate by Category",
+            )
+        if selected_slice and fig1.data and fig1.data[0].labels is not None:
+            fig1.update_traces(pull=[SELECTED_SLICE_PULL if label == selected_slice else 0 for label in fig1.data[0].labels])
+    report_progress(3, 3, "Drawing demand ranking")
+    df2 = data["ranking"] if ranking_category == category else get_ranked_sku_data(year, month, ranking_category)
+    with span("figure"):
+        if ranking_category:
+            fig2 = px.bar(
+                df2,
+                x="TotalRequestedQty",
+                y="SKU",
+                orientation="h",
+                title=f"SKU Demand Ranking in {ranking_category.capitalize()}",
+                text="TotalRequestedQty",
+                labels={"TotalRequestedQty": "Total Requested Qty"},
+                color_discrete_sequence=[RANKING_COLOR]
+            )
+            fig2.update_yaxes(type="category")
+            if category and selected_slice:
+                fig2.update_traces(marker_color=[RANKING_COLOR if sku == selected_slice else RANKING_MUTED_COLOR for sku in df2["SKU"]])
+        else:
+            fig2 = px.bar(
+                df2,
+                x="TotalRequestedQty",
+                y="SKU",
+                orientation="h",
+                title="Top 5 SKUs Overall by Demand",
+                text="TotalRequestedQty",
+                labels={"TotalRequestedQty": "Total Requested Qty"},
+                color_discrete_sequence=[RANKING_COLOR]
+            )
+            fig2.update_yaxes(type="category")
+    return fig1, fig2
+
+@background_callback(
+    Output("ops-server-charts", "data"),
+    Input("ops-server-filters", "data"),
+    progress_id="ops-progress",
+    prevent_initial_call=True
+)
+def update_operations_charts_on_server(filters):
+    """Fallback for the browser's charts when it has no aggregate to filter."""
+    figures = update_operations_charts(filters["year"], filters["month"], filters["category"], filters["selection"])
+    return server_result(filters, figures=list(figures))
+
+@callback(
+    Output("ops-range-chart", "figure"),
+    Output("ops-rolling-chart", "figure"),
+    [Input("ops-range-slider", "value"),
+     Input("ops-range-category-dropdown", "value")],
+    prevent_initial_call=True
+)
+@cached_figure
+def update_ops_range_charts(period_range, selected_category):
+    """Chart section requests and issues for any month range from the prefix index, plus trailing windows."""
+    import plotly.graph_objects as go
+    index = get_prefix_index()
+    start, end = index.clamp(*(period_range or [None, None]))
+    category = None if selected_category in (None, "all") else selected_category
+    mask = index.series_mask([category] if category else None)
+    requested = PREFIX_METRICS.index("RequestedQty")
+    totals = sorted(index.group_totals(index.sections, start, end, mask).items(), key=lambda item: item[1][requested])
+    label = f"{category.capitalize()} " if category else ""
+    with span("figure"):
+        range_fig = go.Figure([
+            go.Bar(name=name, y=[section for section, _ in totals], x=[round(float(row[PREFIX_METRICS.index(metric)])) for _, row in totals], orientation="h")
+            for metric, name in [("RequestedQty", "Requested Qty"), ("IssuedQty", "Issued Qty")]
+        ])
+        range_fig.update_layout(
+            title=f"{label}Requests and Issues by Section, {period_label(start)} to {period_label(end)}",
+            barmode="group"
         )
-        fig2.update_yaxes(type="category")
-    else:
-        fig2 = px.bar(
-            df2,
-            x="TotalRequestedQty",
-            y="SKU",
-            orientation="h",
-            title="Top 5 SKUs Overall by Demand",
-            text="TotalRequestedQty",
-            labels={"TotalRequestedQty": "Total Requested Qty"},
-            color_discrete_sequence=["#8D1436"]
+        range_fig.update_yaxes(type="category")
+        rolling_fig = rolling_window_figure(
+            index, end, mask, [("RequestedQty", "Requested Qty"), ("IssuedQty", "Issued Qty")], f"{label}Trailing Totals"
         )
-        fig2.update_yaxes(type="category")
-    return fig1, fig2
+    return range_fig, rolling_fig
@@ -0,0 +1,141 @@
+import time
+
+import dash
+from dash import html, dcc
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+from dash import Input, Output, callback
+from asset_utils import responsive_image
+from trace_utils import read_traces, self_times
+
+# Not linked from any page; open /diagnostics directly.
+dash.register_page(__name__, path="/diagnostics", name="Diagnostics")
+
+# Traces listed in the picker, newest first.
+MAX_LISTED_TRACES = 200
+DEFAULT_MIN_MS = 250
+
+header = dbc.Navbar(
+    dbc.Container([
+        dbc.NavbarBrand(
+            html.Div([
+                responsive_image("upmo.png", sizes="40px", height="40px", style={"marginRight": "12px"}),
+                html.Span("UPMO Intelligence", className="fw-bold fs-3")
+            ], style={"display": "flex", "alignItems": "center"})
+        ),
+
+        dbc.Nav([
+            dbc.NavItem(dbc.NavLink("Home", href="/")),
+            dbc.NavItem(dbc.NavLink("About", href="/about")),
+        ], className="ms-auto")
+    ]),
+    color="primary",
+    dark=True,
+    className="mb-4",
+    style={"position": "sticky", "top": "0", "zIndex": "1000"}
+)
+
+def trace_label(record):
+    stamp = time.strftime("%H:%M:%S", time.localtime(record["ts"]))
+    return f"{stamp}  {record['ms']:,.0f} ms  {record['name']}"
+
+def span_hover(record):
+    attrs = ", ".join(f"{k}={v}" for k, v in record.get("attrs", {}).items())
+    return f"{record['name']}: {record.get('ms', 0):,.1f} ms" + (f"<br>{attrs}" if attrs else "")
+
+def waterfall_figure(record):
+    """Draw one trace as a waterfall: a bar per span, offset by its start and indented by nesting."""
+    if record is None:
+        return go.Figure(layout={"title": "No trace selected"})
+    rows = [{"name": "request", "depth": 0, "start_ms": 0, "ms": record["ms"], "attrs": record.get("attrs", {})}]
+    rows += [dict(span, depth=span["depth"] + 1) for span in record["spans"]]
+    fig = go.Figure()
+    for stage in dict.fromkeys(row["name"] for row in rows):
+        index = [i for i, row in enumerate(rows) if row["name"] == stage]
+        fig.add_trace(go.Bar(
+            name=stage,
+            orientation="h",
+            y=index,
+            x=[rows[i].get("ms", 0) for i in index],
+            base=[rows[i]["start_ms"] for i in index],
+            hovertext=[span_hover(rows[i]) for i in index],
+            hoverinfo="text",
+        ))
+    fig.update_yaxes(
+        tickvals=list(range(len(rows))),
+        ticktext=["· " * row["depth"] + row["name"] for row in rows],
+        autorange="reversed",
+    )
+    fig.update_layout(
+        title=f"{record['name']} ({record['ms']:,.0f} ms, pid {record['pid']})",
+        xaxis_title="Milliseconds since the request started",
+        barmode="overlay",
+        height=160 + 24 * len(rows),
+    )
+    return fig
+
+def stage_totals_figure(records, min_ms):
+    totals = {}
+    for record in records:
+        for stage, ms in self_times(record).items():
+            totals[stage] = totals.get(stage, 0) + ms
+    stages = sorted(totals, key=totals.get)
+    fig = go.Figure(go.Bar(x=[totals[s] for s in stages], y=stages, orientation="h", marker_color="#8D1436"))
+    fig.update_layout(
+        title=f"Where the time went in {len(records)} requests slower than {min_ms:,.0f} ms",
+        xaxis_title="Milliseconds, excluding nested spans",
+        height=160 + 28 * len(stages),
+    )
+    return fig
+
+def update_trace_list(min_ms):
+    min_ms = min_ms or 0
+    records = read_traces(limit=MAX_LISTED_TRACES, min_ms=min_ms)
+    options = [{"label": trace_label(record), "value": record["id"]} for record in records]
+    return options, options[0]["value"] if options else None, stage_totals_figure(records, min_ms)
+
+def update_waterfall(trace_id, min_ms):
+    records = read_traces(limit=MAX_LISTED_TRACES, min_ms=min_ms or 0)
+    return waterfall_figure(next((record for record in records if record["id"] == trace_id), None))
+
+def layout(**kwargs):
+    options, value, stage_fig = update_trace_list(DEFAULT_MIN_MS)
+    return html.Div([
+        header,
+        dbc.Container([
+            html.H2("Request traces", className="fw-bold mb-4", style={"paddingTop": "32px"}),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Label("Slower than (ms)"),
+                    dcc.Input(id="diag-min-ms", type="number", min=0, step=50, value=DEFAULT_MIN_MS, debounce=True, className="form-control"),
+                ], md=2),
+                dbc.Col([
+                    dbc.Label("Trace"),
+                    dcc.Dropdown(id="diag-trace-dropdown", options=options, value=value, clearable=False),
+                ], md=8),
+                dbc.Col([
+                    dbc.Button("Refresh", id="diag-refresh", color="primary", n_clicks=0),
+                ], md=2, className="d-flex align-items-end"),
+            ], className="mb-4"),
+            dcc.Graph(id="diag-waterfall", figure=update_waterfall(value, DEFAULT_MIN_MS)),
+            dcc.Graph(id="diag-stage-chart", figure=stage_fig),
+        ], fluid=True, style={"paddingLeft": "64px", "paddingRight": "64px", "paddingBottom": "40px"}),
+    ], style={"backgroundColor": "#eaeaea", "minHeight": "100vh"})
+
+@callback(
+    Output("diag-trace-dropdown", "options"),
+    Output("diag-trace-dropdown", "value"),
+    Output("diag-stage-chart", "figure"),
+    [Input("diag-min-ms", "value"), Input("diag-refresh", "n_clicks")],
+    prevent_initial_call=True
+)
+def refresh_trace_list(min_ms, n_clicks):
+    return update_trace_list(min_ms)
+
+@callback(
+    Output("diag-waterfall", "figure"),
+    [Input("diag-trace-dropdown", "value"), Input("diag-min-ms", "value")],
+    prevent_initial_call=True
+)
+def refresh_waterfall(trace_id, min_ms):
+    return update_waterfall(trace_id, min_ms)
@@ -1,6 +1,7 @@
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
+from asset_utils import responsive_image
 
 dash.register_page(__name__, path="/", name="Home")
 
@@ -8,7 +9,7 @@ header = dbc.Navbar(
     dbc.Container([
         dbc.NavbarBrand(
             html.Div([
-                html.Img(src="/assets/upmo.png", height="40px", style={"marginRight": "12px"}),
+                responsive_image("upmo.png", sizes="40px", height="40px", style={"marginRight": "12px"}),
                 html.Span("UPMO Intelligence", className="fw-bold fs-3")
             ], style={"display": "flex", "alignItems": "center"})
         ),
@@ -90,7 +91,7 @@ layout = html.Div([
     header,
     dbc.Container([
         html.Div([
-            html.Img(src="/assets/hero-bg.jpg", style={
+            responsive_image("hero-bg.jpg", sizes="100vw", style={
                 "width": "100vw",
                 "height": "440px",
                 "objectFit": "cover",
@@ -186,8 +187,8 @@ layout = html.Div([
                 ], md=8),
                 dbc.Col([
                     html.Div([
-                        html.Img(src="/assets/UPLB.png", height="120px", style={"marginRight": "16px"}),
-                        html.Img(src="/assets/upmo.png", height="120px"),
+                        responsive_image("UPLB.png", sizes="120px", height="120px", style={"marginRight": "16px"}),
+                        responsive_image("upmo.png", sizes="120px", height="120px"),
                     ], style={"display": "flex", "justifyContent": "flex-end", "alignItems": "center", "height": "100%"})
                 ], md=4)
             ], className="py-4")
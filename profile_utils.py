@@ -0,0 +1,164 @@
+import collections
+import hmac
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+# Bearer token for the admin routes; they answer 404 when it is not set.
+ADMIN_TOKEN = os.environ.get('DASHBOARD_ADMIN_TOKEN')
+PROFILE_URL = '/_admin/profile'
+DEFAULT_PROFILE_SECONDS = 10
+MAX_PROFILE_SECONDS = 60
+SAMPLE_INTERVAL_MS = 5
+PROFILE_FORMATS = ('collapsed', 'speedscope')
+
+# Threads serving a request right now; only their stacks are sampled.
+_active_threads = set()
+_finished_requests = 0
+_counter_lock = threading.Lock()
+# One profile per worker at a time.
+_profile_lock = threading.Lock()
+
+
+def _frame_name(code):
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def _stack(frame):
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def record_profile(seconds, max_requests=None, interval_ms=SAMPLE_INTERVAL_MS):
+    """Sample the stacks of request threads until seconds pass or max_requests more requests finish.
+
+    Runs in the calling thread, which is left out of the samples. Returns a
+    Counter of root-first stacks, plus the elapsed seconds and finished request count.
+    """
+    me = threading.get_ident()
+    counts = collections.Counter()
+    started = time.perf_counter()
+    deadline = started + seconds
+    first_finished = _finished_requests
+    while time.perf_counter() < deadline:
+        if max_requests is not None and _finished_requests - first_finished >= max_requests:
+            break
+        frames = sys._current_frames()
+        for ident in list(_active_threads):
+            if ident != me and ident in frames:
+                counts[_stack(frames[ident])] += 1
+        del frames
+        time.sleep(interval_ms / 1000)
+    return counts, time.perf_counter() - started, _finished_requests - first_finished
+
+
+def to_collapsed(counts):
+    """Format stacks as collapsed-stack lines ("root;child;leaf count") for flamegraph.pl or speedscope."""
+    lines = (
+        ';'.join(frame.replace(';', ':') for frame in stack) + f' {count}'
+        for stack, count in counts.most_common()
+    )
+    return '\n'.join(lines) + '\n'
+
+
+def to_speedscope(counts, interval_ms, name):
+    """Format stacks as a speedscope sampled profile, weighted in milliseconds."""
+    frames = {}
+    samples = []
+    weights = []
+    for stack, count in counts.most_common():
+        samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+        weights.append(count * interval_ms)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': [{'name': frame} for frame in frames]},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights,
+        }],
+        'name': name,
+        'activeProfileIndex': 0,
+        'exporter': 'profile_utils',
+    }
+
+
+def is_authorized(request, token):
+    """Return True if the request carries token as its Bearer credential."""
+    supplied = request.headers.get('Authorization', '')
+    if not supplied.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(supplied[len('Bearer '):].encode('utf-8'), token.encode('utf-8'))
+
+
+def register_profiler(server, token=ADMIN_TOKEN):
+    """Add the admin sampling-profiler route to the Flask server.
+
+    GET /_admin/profile?seconds=10&requests=50&format=speedscope profiles this
+    worker's request threads for the given time, or until that many other
+    requests finish, and returns the stacks as a download. Background jobs run
+    in their own processes and are not sampled. The admin request holds one
+    worker thread while it records.
+    """
+    from flask import Response, abort, request
+
+    @server.before_request
+    def _track_request_thread():
+        _active_threads.add(threading.get_ident())
+
+    @server.teardown_request
+    def _untrack_request_thread(error=None):
+        global _finished_requests
+        _active_threads.discard(threading.get_ident())
+        with _counter_lock:
+            _finished_requests += 1
+
+    @server.route(PROFILE_URL)
+    def profile():
+        if not token:
+            abort(404)
+        if not is_authorized(request, token):
+            return Response('Unauthorized\n', 401, {'WWW-Authenticate': 'Bearer'}, mimetype='text/plain')
+        seconds = request.args.get('seconds', DEFAULT_PROFILE_SECONDS, type=float)
+        max_requests = request.args.get('requests', type=int)
+        interval_ms = request.args.get('interval', SAMPLE_INTERVAL_MS, type=float)
+        # NaN slips past min() and max(), and time.sleep() rejects it and infinity alike.
+        if not (math.isfinite(seconds) and math.isfinite(interval_ms)):
+            return Response('seconds and interval must be finite numbers\n', 400, mimetype='text/plain')
+        seconds = min(seconds, MAX_PROFILE_SECONDS)
+        interval_ms = max(interval_ms, 1)
+        fmt = request.args.get('format', PROFILE_FORMATS[0])
+        if fmt not in PROFILE_FORMATS:
+            abort(400)
+        if not _profile_lock.acquire(blocking=False):
+            return Response('A profile is already running on this worker\n', 409, mimetype='text/plain')
+        try:
+            counts, elapsed, finished = record_profile(seconds, max_requests, interval_ms)
+        finally:
+            _profile_lock.release()
+        name = f'pid {os.getpid()}, {elapsed:.1f}s, {finished} requests'
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        if fmt == 'speedscope':
+            body = json.dumps(to_speedscope(counts, interval_ms, name))
+            mimetype, filename = 'application/json', f'profile-{os.getpid()}-{stamp}.speedscope.json'
+        else:
+            body = to_collapsed(counts)
+            mimetype, filename = 'text/plain', f'profile-{os.getpid()}-{stamp}.collapsed.txt'
+        return Response(body, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'no-store',
+            'X-Profile-Samples': str(sum(counts.values())),
+            'X-Profile-Requests': str(finished),
+            'X-Profile-Seconds': f'{elapsed:.3f}',
+        })
@@ -0,0 +1,155 @@
+import copy
+
+from db_utils import FACT_TABLE, per_version_memo, read_fact_rows
+from trace_utils import span
+
+# Monthly totals kept as running sums; StockoutEvents counts rows flagged IsStockout.
+PREFIX_METRICS = ('RequestedQty', 'IssuedQty', 'ForecastQty', 'StockOnHand', 'StockoutEvents')
+ROLLING_WINDOWS = (3, 6, 12)
+PREFIX_SELECT = f'''
+    SELECT i.Category, i.SKU, s.Section, f.Year, f.Month,
+        COALESCE(SUM(f.RequestedQty), 0), SUM(f.IssuedQty), SUM(f.ForecastQty),
+        SUM(f.StockOnHand), SUM(f.IsStockout)
+    FROM {FACT_TABLE} f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    JOIN Section_Dimension s ON f.SectionKey = s.SectionKey
+    {{where}}
+    GROUP BY i.Category, i.SKU, s.Section, f.Year, f.Month
+'''
+
+
+def to_period(year, month):
+    """Return the month number used by the range sliders: months since January of year 0."""
+    return int(year) * 12 + int(month) - 1
+
+
+def period_label(period):
+    """Format a slider month number as "Mar 2022"."""
+    year, month = divmod(int(period), 12)
+    return f"{['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'][month]} {year}"
+
+
+class PrefixIndex:
+    """Running monthly totals of PREFIX_METRICS for every (Category, SKU, Section) series.
+
+    sums[k, t] holds series k's totals over every month before month t, so the
+    totals for any range of months are one subtraction of two rows, however
+    long the range is.
+    """
+
+    def __init__(self, rows, state=None):
+        import numpy as np
+        self.state = state
+        rows = [row for row in rows if row[3] is not None]
+        periods = [to_period(row[3], row[4]) for row in rows]
+        self.first = min(periods, default=0)
+        self.last = max(periods, default=-1)
+        self._set_series(sorted({row[:3] for row in rows}))
+        positions = {key: k for k, key in enumerate(self.keys)}
+        sums = np.zeros((len(self.keys), self.last - self.first + 2, len(PREFIX_METRICS)))
+        for row, period in zip(rows, periods):
+            sums[positions[row[:3]], period - self.first + 1] = row[5:]
+        self.sums = np.cumsum(sums, axis=1)
+
+    def _set_series(self, keys):
+        import numpy as np
+        self.keys = keys
+        self.categories = np.array([key[0].lower() for key in keys], dtype=object)
+        self.skus = np.array([key[1] for key in keys], dtype=object)
+        self.sections = np.array([key[2] for key in keys], dtype=object)
+
+    def extended(self, rows, state):
+        """Return a new index adding rows, grouped as PREFIX_SELECT groups them, to these totals.
+
+        The two sets of running totals are merged as arrays, so the cost follows
+        the size of the index and of the new rows, not of the fact history.
+        """
+        import numpy as np
+        added = PrefixIndex(rows, state)
+        parts = [index for index in (self, added) if index.keys]
+        result = copy.copy(added)
+        if not parts:
+            return result
+        result.first = min(part.first for part in parts)
+        result.last = max(part.last for part in parts)
+        result._set_series(sorted(set().union(*(part.keys for part in parts))))
+        positions = {key: k for k, key in enumerate(result.keys)}
+        sums = np.zeros((len(result.keys), result.last - result.first + 2, len(PREFIX_METRICS)))
+        for part in parts:
+            at = [positions[key] for key in part.keys]
+            start = part.first - result.first
+            stop = start + part.sums.shape[1]
+            sums[at, start:stop] += part.sums
+            # Months after the part's last one carry its final running total.
+            sums[at, stop:] += part.sums[:, -1:]
+        result.sums = sums
+        return result
+
+    def clamp(self, start, end):
+        """Limit a from-to pair of slider month numbers to the months the index covers."""
+        start = self.first if start is None else max(int(start), self.first)
+        end = self.last if end is None else min(int(end), self.last)
+        return start, end
+
+    def series_mask(self, categories=None, skus=None):
+        """Return a boolean mask over series for lowercase categories and SKUs; None keeps all."""
+        import numpy as np
+        mask = np.ones(len(self.skus), dtype=bool)
+        if categories:
+            mask &= np.isin(self.categories, [c.lower() for c in categories])
+        if skus:
+            mask &= np.isin(self.skus, list(skus))
+        return mask
+
+    def range_totals(self, start=None, end=None, mask=None):
+        """Return per-series totals over months start..end inclusive, one column per metric."""
+        import numpy as np
+        start, end = self.clamp(start, end)
+        if start > end:
+            return np.zeros((len(self.skus) if mask is None else int(mask.sum()), len(PREFIX_METRICS)))
+        sums = self.sums if mask is None else self.sums[mask]
+        return sums[:, end - self.first + 1] - sums[:, start - self.first]
+
+    def rolling_totals(self, end=None, windows=ROLLING_WINDOWS, mask=None):
+        """Return {window: metric totals} for the trailing windows of months ending at end."""
+        end = self.clamp(None, end)[1]
+        return {window: self.range_totals(end - window + 1, end, mask).sum(axis=0) for window in windows}
+
+    def group_totals(self, labels, start=None, end=None, mask=None):
+        """Sum range totals per label, where labels is one of the series label arrays."""
+        totals = self.range_totals(start, end, mask)
+        labels = labels if mask is None else labels[mask]
+        grouped = {}
+        for label, row in zip(labels, totals):
+            grouped[label] = grouped[label] + row if label in grouped else row
+        return grouped
+
+
+@per_version_memo
+def get_prefix_index(previous):
+    """Return this process's prefix index for the current data version, building it on first use.
+
+    Rows appended since the previous version are folded into that version's index.
+    """
+    with span('prefix index build') as attrs:
+        state, rows, attrs['appended'] = read_fact_rows(PREFIX_SELECT, previous and previous.state)
+        return previous.extended(rows, state) if attrs['appended'] else PrefixIndex(rows, state)
+
+
+def slider_marks(index):
+    """Return RangeSlider marks labelling January of each year the index covers."""
+    first_year, last_year = index.first // 12, index.last // 12
+    return {year * 12: str(year) for year in range(first_year, last_year + 1) if year * 12 >= index.first}
+
+
+def rolling_window_figure(index, end, mask, metrics, title):
+    """Draw grouped bars of the chosen metrics over the trailing ROLLING_WINDOWS ending at end."""
+    import plotly.graph_objects as go
+    rolling = index.rolling_totals(end, mask=mask)
+    windows = [f"Last {window} months" for window in rolling]
+    fig = go.Figure([
+        go.Bar(name=label, x=windows, y=[round(float(totals[PREFIX_METRICS.index(metric)])) for totals in rolling.values()])
+        for metric, label in metrics
+    ])
+    fig.update_layout(title=f"{title} to {period_label(index.clamp(None, end)[1])}", barmode="group")
+    return fig
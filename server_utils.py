@@ -0,0 +1,178 @@
+import copy
+import gzip
+import importlib
+
+import flask
+
+from asset_utils import BUILD_URL
+from trace_utils import span
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # stdlib json through plotly
+    orjson = None
+
+# Responses smaller than this are sent as-is; compressing them costs more than it saves.
+MIN_COMPRESS_BYTES = 500
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+# Same escaping plotly applies, so JSON stays safe to embed in the index page's <script> tags.
+JSON_ESCAPES = (
+    ("<", "\\u003c"),
+    (">", "\\u003e"),
+    ("/", "\\u002f"),
+    ("\u2028", "\\u2028"),
+    ("\u2029", "\\u2029"),
+)
+# Built assets carry a content hash in their name, so browsers may keep them forever.
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "text/html",
+    "text/css",
+    "application/javascript",
+    "text/javascript",
+}
+
+
+_plotly_encoder = None
+
+
+def _encode_default(obj):
+    # Dash components, figures, pandas and datetime objects go through plotly's encoder.
+    global _plotly_encoder
+    if _plotly_encoder is None:
+        from _plotly_utils.utils import PlotlyJSONEncoder
+        _plotly_encoder = PlotlyJSONEncoder()
+    return _plotly_encoder.default(obj)
+
+
+def fast_to_json(value):
+    """Serialize a Dash layout or callback response with orjson.
+
+    Native types and NumPy arrays are encoded by orjson directly; only the
+    objects it does not know are handed to plotly's encoder, so the whole tree
+    is not walked in Python first.
+    """
+    with span("serialize"):
+        out = orjson.dumps(
+            value,
+            default=_encode_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        ).decode("utf-8")
+        for char, escaped in JSON_ESCAPES:
+            if char in out:
+                out = out.replace(char, escaped)
+    return out
+
+
+def use_fast_json():
+    """Serialize layouts, callback responses and figures with orjson when it is installed."""
+    if orjson is None:
+        return False
+    import plotly.io as pio
+    pio.json.config.default_engine = "orjson"
+    for module in ("dash._callback", "dash.dash"):
+        importlib.import_module(module).to_json = fast_to_json
+    return True
+
+
+def choose_encoding(accept_encoding):
+    """Return the best supported content coding for an Accept-Encoding header, or None."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    """Compress JSON, HTML and script responses for clients that accept it."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(flask.request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+    with span("compress", encoding=encoding, bytes=len(data)):
+        if encoding == "br":
+            data = brotli.compress(data, quality=BROTLI_QUALITY)
+        else:
+            data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def register_compression(server):
+    """Compress responses from the Flask server, including callback and layout JSON."""
+    server.after_request(compress_response)
+
+
+def cache_built_assets(response):
+    """Mark fingerprinted build outputs as cacheable for a year without revalidation."""
+    if response.status_code in (200, 304) and flask.request.path.startswith(BUILD_URL):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def register_asset_caching(server):
+    """Send far-future cache headers for fingerprinted assets."""
+    server.after_request(cache_built_assets)
+
+
+def strip_values(layout):
+    """Return a copy of layout without its graphs' figures and its dropdowns' options."""
+    from dash import dcc
+    props = {dcc.Graph: "figure", dcc.Dropdown: "options"}
+    layout = copy.deepcopy(layout)
+    for component in [layout, *layout._traverse()]:
+        prop = props.get(type(component))
+        if prop and hasattr(component, prop):
+            delattr(component, prop)
+    return layout
+
+
+def register_validation_layout(app):
+    """Ship a slimmed copy of the layout Dash pages validates callbacks against.
+
+    Dash pages builds its validation layout from every page's layout on the first
+    request and embeds it in each page load. The renderer only checks its ids, so
+    the default figures and dropdown options rendered into the layouts are dropped.
+    """
+    slimmed = {"layout": None}
+
+    # Registered after Dash's own first-request hook, which builds the layout this replaces.
+    @app.server.before_request
+    def slim_validation_layout():
+        layout = app.validation_layout
+        if layout is None or layout is slimmed["layout"]:
+            return
+        slimmed["layout"] = app.validation_layout = strip_values(layout)
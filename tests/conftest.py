@@ -0,0 +1,75 @@
+"""Fixtures shared by the tests: the dashboard database built from the CSV files in a scratch directory."""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix='dashboard-tests-')
+# The modules read these when they are imported, so they are set before any test imports one.
+os.environ.update({
+    'DASHBOARD_DATA_DIR': os.path.join(SCRATCH, 'data'),
+    'DASHBOARD_CACHE_DIR': os.path.join(SCRATCH, 'cache'),
+    'DASHBOARD_CACHE': '0',
+    'DASHBOARD_SINGLE_FLIGHT_LOCKFILE': '0',
+    'DASHBOARD_TRACE': '0',
+})
+sys.path.insert(0, ROOT)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def db_path():
+    """The published database, built once per test run."""
+    import db_utils
+    db_utils.import_csvs_to_sqlite()
+    return db_utils.current_db_path()
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def appendable_db(db_path, tmp_path, monkeypatch):
+    """A copy of the published database, published in its place for one test, to append batches to."""
+    import db_utils
+    path = str(tmp_path / 'dashboard.db')
+    source, target = sqlite3.connect(db_path), sqlite3.connect(path)
+    source.backup(target)
+    source.close()
+    target.close()
+    monkeypatch.setattr(db_utils, 'current_db_path', lambda pointer=None: path)
+    return path
+
+
+def last_periods(conn, count):
+    """The latest count (Year, Month) pairs of the date dimension, newest first."""
+    return conn.execute(
+        'SELECT DISTINCT Year, Month FROM Date_Dimension ORDER BY Year DESC, Month DESC LIMIT ?', (count,)
+    ).fetchall()
+
+
+def make_batch(conn, periods, rows_per_period=3):
+    """Fact tuples for ingest_utils.append_values, over existing items and sections in each (Year, Month)."""
+    items = [row[0] for row in conn.execute('SELECT ItemKey FROM Item_Dimension ORDER BY ItemKey')]
+    sections = [row[0] for row in conn.execute('SELECT SectionKey FROM Section_Dimension ORDER BY SectionKey')]
+    batch = []
+    for year, month in periods:
+        date_key = conn.execute('SELECT DateKey FROM Date_Dimension WHERE Year = ? AND Month = ?', (year, month)).fetchone()[0]
+        for n in range(rows_per_period):
+            k = len(batch)
+            batch.append((
+                f'TEST-{year}-{month}-{n}', items[k * 7 % len(items)], sections[k % len(sections)], date_key,
+                None if k % 4 == 3 else 10.0 + k, 5 + k, 3 * k, 8 + k, k % 2, 'Fulfilled', 1.5, 2,
+            ))
+    return batch
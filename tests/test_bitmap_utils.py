@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from bitmap_utils import BITMAP_COLUMNS, BITMAP_SELECT, ROW_MEASURES, Bitmap, FactBitmaps, get_fact_bitmaps
+from conftest import last_periods, make_batch
+from db_utils import read_fact_rows
+from ingest_utils import append_values
+
+# Row counts and ROW_MEASURES per ItemKey over the fact rows matching {where}.
+ITEM_TOTALS_SQL = f'''
+    SELECT f.ItemKey, COUNT(*), {', '.join(f'SUM({expr})' for expr in ROW_MEASURES.values())}
+    FROM Job_Request_Fact_Table f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    JOIN Section_Dimension s ON f.SectionKey = s.SectionKey
+    WHERE {{where}}
+    GROUP BY f.ItemKey
+'''
+
+
+@pytest.fixture
+def bitmaps(db_path):
+    return get_fact_bitmaps()
+
+
+def sql_item_totals(conn, filters):
+    clauses, params = ['1'], []
+    for name, values in filters.items():
+        if values is not None:
+            clauses.append(f"{BITMAP_COLUMNS[name]} IN ({', '.join('?' * len(values))})")
+            params += values
+    query = ITEM_TOTALS_SQL.format(where=' AND '.join(clauses))
+    return {row[0]: row[1:] for row in conn.execute(query, params)}
+
+
+def filter_cases(conn):
+    years = [row[0] for row in conn.execute('SELECT DISTINCT Year FROM Job_Request_Fact_Table ORDER BY Year')]
+    categories = [row[0] for row in conn.execute('SELECT DISTINCT LOWER(Category) FROM Item_Dimension ORDER BY 1')]
+    skus = [row[0] for row in conn.execute('SELECT DISTINCT SKU FROM Item_Dimension ORDER BY SKU')]
+    sections = [row[0] for row in conn.execute('SELECT DISTINCT Section FROM Section_Dimension ORDER BY Section')]
+    return [
+        {},
+        {'Year': years[:1]},
+        {'Year': years[-2:], 'Month': [1, 7, 12]},
+        {'Category': categories[:1]},
+        {'Year': years[1:2], 'Category': categories[1:3]},
+        {'SKU': skus[::7], 'Section': sections[:2]},
+        {'Year': years, 'Category': None, 'Section': sections[-1:]},
+        {'Year': [1900]},
+        {'Category': ['no such category'], 'Month': [3]},
+    ]
+
+
+def item_totals(bitmaps, filters):
+    item_keys, counts, sums = bitmaps.item_totals(bitmaps.select(**filters))
+    return {
+        key: (count, *(int(sums[name][k]) for name in ROW_MEASURES))
+        for k, (key, count) in enumerate(zip(item_keys.tolist(), counts.tolist())) if count
+    }
+
+
+def test_item_totals_match_sql(bitmaps, conn):
+    for filters in filter_cases(conn):
+        assert item_totals(bitmaps, filters) == sql_item_totals(conn, filters), filters
+
+
+def test_append_extends_bitmaps_like_a_rebuild(appendable_db, conn, monkeypatch):
+    (year, month), = last_periods(conn, 1)
+    # The copy has the published database's version until a batch is appended to it.
+    append_values(make_batch(conn, [(year, month)]), db_path=appendable_db)
+    get_fact_bitmaps()
+    extended, extend = [], FactBitmaps.extended
+    monkeypatch.setattr(FactBitmaps, 'extended', lambda self, *args: extended.append(args) or extend(self, *args))
+    append_values(make_batch(conn, [(year - 2, 6), (year - 1, 9)], rows_per_period=40), db_path=appendable_db)
+    bitmaps = get_fact_bitmaps()
+    assert extended
+    rebuilt = FactBitmaps(*reversed(read_fact_rows(BITMAP_SELECT)[:2]))
+    assert (bitmaps.state, bitmaps.size) == (rebuilt.state, rebuilt.size)
+    # Appended rows follow the rows already indexed instead of taking their place in key order.
+    for filters in filter_cases(conn) + [{'Year': [year - 1], 'Month': [9]}]:
+        assert item_totals(bitmaps, filters) == item_totals(rebuilt, filters), filters
+
+
+def test_bitmap_set_operations_match_masks():
+    rng = np.random.default_rng(0)
+    size = 3 * (1 << 16) + 123
+    runs = np.zeros(size, dtype=bool)
+    runs[1000:90000] = True
+    runs[size - 50:] = True
+    scattered = rng.random(size) < 0.3
+    for a, b in [(runs, scattered), (scattered, ~scattered), (runs, runs), (runs, np.zeros(size, dtype=bool))]:
+        for result, expected in [
+            (Bitmap.from_mask(a) | Bitmap.from_mask(b), a | b),
+            (Bitmap.from_mask(a) & Bitmap.from_mask(b), a & b),
+            (Bitmap.full(size) & Bitmap.from_mask(b), b),
+        ]:
+            mask = np.zeros(size, dtype=bool)
+            for rows, part in result.row_slices():
+                mask[rows] = True if part is None else part
+            assert np.array_equal(mask, expected)
+
+
+def test_extended_bitmap_matches_concatenated_masks():
+    rng = np.random.default_rng(1)
+    size, added = (1 << 16) + 5000, 70000
+    for a, b in [
+        (rng.random(size) < 0.3, rng.random(added) < 0.3),
+        (rng.random(size) < 0.3, np.zeros(added, dtype=bool)),
+        (np.ones(size, dtype=bool), np.ones(added, dtype=bool)),
+        (np.zeros(size, dtype=bool), rng.random(added) < 0.5),
+    ]:
+        other = rng.random(size + added) < 0.1
+        result = Bitmap.from_mask(a).extended(Bitmap.from_mask(b)) | Bitmap.from_mask(other)
+        mask = np.zeros(size + added, dtype=bool)
+        for rows, part in result.row_slices():
+            mask[rows] = True if part is None else part
+        assert np.array_equal(mask, np.concatenate([a, b]) | other)
@@ -0,0 +1,41 @@
+import sqlite3
+
+import pytest
+
+import cache_utils
+from conftest import last_periods, make_batch
+from db_utils import AGGREGATE_SELECT, AGGREGATE_TABLE, FACT_TABLE, get_data_version
+from ingest_utils import append_values
+
+
+def test_aggregate_after_append_matches_rebuild(appendable_db, conn):
+    append_values(make_batch(conn, last_periods(conn, 2)), db_path=appendable_db)
+    appended = sqlite3.connect(appendable_db)
+    kept = appended.execute(f'SELECT * FROM {AGGREGATE_TABLE} ORDER BY Year, Month, Category, SKU').fetchall()
+    rebuilt = appended.execute(AGGREGATE_SELECT.format(source=FACT_TABLE) + ' ORDER BY 1, 2, 3, 4').fetchall()
+    appended.close()
+    assert [row[:4] for row in kept] == [row[:4] for row in rebuilt]
+    for kept_row, rebuilt_row in zip(kept, rebuilt):
+        assert kept_row[4:] == pytest.approx(rebuilt_row[4:]), kept_row[:4]
+
+
+def test_append_carries_over_cache_entries_outside_its_periods(appendable_db, conn, monkeypatch):
+    monkeypatch.setattr(cache_utils, 'CACHE_ENABLED', True)
+    (year, month), (other_year, other_month) = last_periods(conn, 1)[0], (1900, 1)
+    before = get_data_version()
+    entries = {
+        'same month': [(year, month)],
+        'same year': [(year, None)],
+        'other month of the year': [(year, month % 12 + 1)],
+        'other year': [(other_year, None)],
+        'other month': [(other_year, other_month)],
+        'no periods': None,
+    }
+    for key, periods in entries.items():
+        cache_utils.cache_set(key, key.encode(), namespace=before, periods=periods)
+    append_values(make_batch(conn, [(year, month)]), db_path=appendable_db)
+    after = get_data_version()
+    assert after != before
+    kept = {key for key in entries if cache_utils.cache_get(key, namespace=after) is not None}
+    assert kept == {'other month of the year', 'other year', 'other month'}
+    assert all(cache_utils.cache_get(key, namespace=before) is None for key in entries)
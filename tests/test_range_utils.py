@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from conftest import last_periods, make_batch
+from db_utils import read_fact_rows
+from ingest_utils import append_values
+from range_utils import PREFIX_METRICS, PREFIX_SELECT, PrefixIndex, get_prefix_index
+
+# PREFIX_METRICS per (Category, SKU, Section) series over a range of slider months, summed row by row.
+RANGE_SQL = '''
+    SELECT LOWER(i.Category), i.SKU, s.Section,
+        COALESCE(SUM(f.RequestedQty), 0), SUM(f.IssuedQty), SUM(f.ForecastQty),
+        SUM(f.StockOnHand), SUM(f.IsStockout)
+    FROM Job_Request_Fact_Table f
+    JOIN Item_Dimension i ON f.ItemKey = i.ItemKey
+    JOIN Section_Dimension s ON f.SectionKey = s.SectionKey
+    WHERE f.Year * 12 + f.Month - 1 BETWEEN ? AND ?
+    GROUP BY LOWER(i.Category), i.SKU, s.Section
+'''
+
+
+@pytest.fixture
+def index(db_path):
+    return get_prefix_index()
+
+
+def sql_range_totals(conn, start, end):
+    return {row[:3]: row[3:] for row in conn.execute(RANGE_SQL, (start, end))}
+
+
+def ranges(index):
+    first, last = index.first, index.last
+    middle = (first + last) // 2
+    return [
+        (first, last), (first, first), (last, last), (middle, middle),
+        (first, middle), (middle + 1, last), (first + 5, last - 7), (first - 24, first + 2),
+    ]
+
+
+def test_range_totals_match_sql(index, conn):
+    for start, end in ranges(index):
+        expected = sql_range_totals(conn, start, end)
+        totals = index.range_totals(start, end)
+        for series, row in zip(zip(index.categories, index.skus, index.sections), totals):
+            assert row == pytest.approx(expected.get(series, [0] * len(PREFIX_METRICS))), (start, end, series)
+        assert sum(1 for row in totals if row.any()) == len(expected)
+
+
+def test_group_totals_match_sql_for_a_category(index, conn):
+    category = index.categories[0]
+    start, end = index.first + 3, index.last - 3
+    mask = index.series_mask(categories=[category.upper()])
+    expected = {}
+    for (row_category, sku, _), row in sql_range_totals(conn, start, end).items():
+        if row_category == category:
+            expected[sku] = [a + b for a, b in zip(expected.get(sku, [0] * len(PREFIX_METRICS)), row)]
+    grouped = index.group_totals(index.skus, start, end, mask)
+    assert set(grouped) >= set(expected)
+    for sku, row in grouped.items():
+        assert row == pytest.approx(expected.get(sku, [0] * len(PREFIX_METRICS))), sku
+
+
+def test_empty_range_is_zero(index):
+    assert not index.range_totals(index.last, index.first).any()
+    assert not index.range_totals(index.last + 1, index.last + 12).any()
+
+
+def test_append_extends_index_like_a_rebuild(appendable_db, conn, monkeypatch):
+    (year, month), = last_periods(conn, 1)
+    # The copy has the published database's version until a batch is appended to it.
+    append_values(make_batch(conn, [(year, month)]), db_path=appendable_db)
+    get_prefix_index()
+    extended, extend = [], PrefixIndex.extended
+    monkeypatch.setattr(PrefixIndex, 'extended', lambda self, *args: extended.append(args) or extend(self, *args))
+    append_values(make_batch(conn, [(year - 2, 6), (year - 1, 9)], rows_per_period=40), db_path=appendable_db)
+    index = get_prefix_index()
+    assert extended
+    rebuilt = PrefixIndex(*reversed(read_fact_rows(PREFIX_SELECT)[:2]))
+    assert index.state == rebuilt.state
+    assert (index.first, index.last) == (rebuilt.first, rebuilt.last)
+    assert index.keys == rebuilt.keys
+    for name in ('categories', 'skus', 'sections'):
+        assert np.array_equal(getattr(index, name), getattr(rebuilt, name)), name
+    assert np.allclose(index.sums, rebuilt.sums)
+
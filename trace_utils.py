@@ -0,0 +1,207 @@
+import collections
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+TRACE_PATH = os.environ.get(
+    'DASHBOARD_TRACE_PATH', os.path.join(os.path.dirname(__file__), 'cache', 'traces.jsonl')
+)
+TRACE_ENABLED = os.environ.get('DASHBOARD_TRACE', '1') != '0'
+# Traces faster than this are dropped, so the file holds the requests worth looking at.
+TRACE_MIN_MS = float(os.environ.get('DASHBOARD_TRACE_MIN_MS', 50))
+# Past this size the file is moved to TRACE_PATH + '.1', replacing the previous one.
+TRACE_MAX_BYTES = int(os.environ.get('DASHBOARD_TRACE_MAX_BYTES', 8 * 1024 * 1024))
+# Static files are served without touching the app's code, and admin routes run for seconds by design.
+UNTRACED_PREFIXES = ('/assets/', '/_dash-component-suites/', '/_favicon', '/_reload-hash', '/_admin/')
+
+_current = contextvars.ContextVar('trace', default=None)
+_write_lock = threading.Lock()
+
+
+class Trace:
+    """The spans recorded while serving one request or running one background job."""
+
+    def __init__(self, name, **attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.depth = 0
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'ts': round(self.timestamp, 3),
+            'ms': round(self.elapsed_ms(), 3),
+            'pid': os.getpid(),
+            'attrs': self.attrs,
+            'spans': self.spans,
+        }
+
+
+def current_trace():
+    """Return the trace being recorded in this context, or None."""
+    return _current.get()
+
+
+def start_trace(name, **attrs):
+    """Start recording a trace in this context and return the token for finish_trace."""
+    return _current.set(Trace(name, **attrs))
+
+
+def finish_trace(token, **attrs):
+    """Stop the trace started with token and write it out if it was slow enough."""
+    trace = _current.get()
+    _current.reset(token)
+    if trace is not None:
+        trace.attrs.update(attrs)
+        write_trace(trace)
+
+
+@contextlib.contextmanager
+def trace(name, **attrs):
+    """Record the spans of the enclosed block as one trace."""
+    if not TRACE_ENABLED:
+        yield None
+        return
+    token = start_trace(name, **attrs)
+    try:
+        yield _current.get()
+    finally:
+        finish_trace(token)
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as one stage of the current trace; a no-op outside a trace.
+
+    Yields the span's attrs dict, so the block can annotate it (e.g. hit=True).
+    """
+    trace = _current.get()
+    if trace is None:
+        yield attrs
+        return
+    record = {'name': name, 'depth': trace.depth, 'start_ms': round(trace.elapsed_ms(), 3)}
+    trace.spans.append(record)
+    trace.depth += 1
+    try:
+        yield attrs
+    finally:
+        trace.depth -= 1
+        record['ms'] = round(trace.elapsed_ms() - record['start_ms'], 3)
+        if attrs:
+            record['attrs'] = attrs
+
+
+def traced(name):
+    """Decorate a function so every call is recorded as a span called name."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def write_trace(trace, path=TRACE_PATH, min_ms=TRACE_MIN_MS):
+    """Append trace to the JSONL file at path, rotating it once it is too large."""
+    record = trace.to_dict()
+    if record['ms'] < min_ms:
+        return
+    line = (json.dumps(record, separators=(',', ':'), default=str) + '\n').encode('utf-8')
+    with _write_lock:
+        try:
+            if os.path.getsize(path) > TRACE_MAX_BYTES:
+                os.replace(path, path + '.1')
+        except OSError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One O_APPEND write per trace, so lines from concurrent workers never interleave.
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def read_traces(path=TRACE_PATH, limit=500, min_ms=0):
+    """Return up to limit of the most recent traces of at least min_ms, newest first."""
+    recent = collections.deque(maxlen=limit)
+    for name in (path + '.1', path):
+        try:
+            with open(name, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:  # a line cut short by a crash or a rotation
+                        continue
+                    if record.get('ms', 0) >= min_ms:
+                        recent.append(record)
+        except OSError:
+            continue
+    return list(reversed(recent))
+
+
+def self_times(record):
+    """Return the time of each span name in a trace record, excluding its nested spans."""
+    spans = record['spans']
+    totals = collections.defaultdict(float)
+    for i, s in enumerate(spans):
+        nested = 0.0
+        for child in spans[i + 1:]:
+            if child['depth'] <= s['depth']:
+                break
+            if child['depth'] == s['depth'] + 1:
+                nested += child.get('ms', 0)
+        totals[s['name']] += max(s.get('ms', 0) - nested, 0)
+    untraced = record['ms'] - sum(s.get('ms', 0) for s in spans if s['depth'] == 0)
+    if untraced > 0:
+        totals['other'] += untraced
+    return dict(totals)
+
+
+def _request_name(request):
+    if request.path == '/_dash-update-component':
+        body = request.get_json(silent=True) or {}
+        output = body.get('output', '?').strip('.').split('...')[0]
+        return f"{'poll' if 'cacheKey' in request.args else 'callback'} {output}"
+    return f'{request.method} {request.path}'
+
+
+def register_tracing(server):
+    """Trace every request the Flask server handles, except static files and admin routes."""
+    from flask import g, request
+
+    if not TRACE_ENABLED:
+        return
+
+    @server.before_request
+    def _start_request_trace():
+        if not request.path.startswith(UNTRACED_PREFIXES):
+            g._trace_token = start_trace(_request_name(request))
+
+    @server.after_request
+    def _record_status(response):
+        trace = _current.get()
+        if trace is not None:
+            trace.attrs['status'] = response.status_code
+        return response
+
+    @server.teardown_request
+    def _finish_request_trace(error=None):
+        token = g.pop('_trace_token', None)
+        if token is not None:
+            finish_trace(token, **({'error': repr(error)} if error is not None else {}))